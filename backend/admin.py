@@ -1,54 +1,128 @@
 from django.contrib import admin
-from .models import Vendor, Equipment, Part, Task, Schedule
+from django.contrib.auth.models import User
+from django.db.models import Prefetch
 from django.utils import timezone
+from .caching import invalidate_after_bulk
+from .history import record_events, record_reassignment
+from .models import Vendor, Equipment, Part, Task, Schedule
+from .pagination import EstimatedCountPaginator
+from .scheduling import complete_schedules
+from .sync import batched_deletions
+
+class SyncedModelAdmin(admin.ModelAdmin):
+    """Bulk deletes write their sync tombstones in one batch."""
+
+    def delete_queryset(self, request, queryset):
+        with batched_deletions():
+            super().delete_queryset(request, queryset)
+
+class LargeTableAdmin(SyncedModelAdmin):
+    """Changelists that never count the whole table."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+class ActiveFlagActions:
+    """Bulk (de)activation in a single UPDATE per action."""
+    actions = ['activate', 'deactivate']
+
+    def set_active(self, request, queryset, active):
+        model = queryset.model
+        # update() skips auto_now, so stamp the rows for delta sync
+        stamp = next(field.name for field in model._meta.concrete_fields if getattr(field, 'auto_now', False))
+        count = queryset.exclude(is_active=active).update(is_active=active, **{stamp: timezone.now()})
+        invalidate_after_bulk(model._meta.model_name)
+        self.message_user(request, f"{count} {model._meta.verbose_name_plural} {'activated' if active else 'deactivated'}.")
+
+    @admin.action(description='Activate selected %(verbose_name_plural)s')
+    def activate(self, request, queryset):
+        self.set_active(request, queryset, True)
+
+    @admin.action(description='Deactivate selected %(verbose_name_plural)s')
+    def deactivate(self, request, queryset):
+        self.set_active(request, queryset, False)
 
 @admin.register(Vendor)
-class VendorAdmin(admin.ModelAdmin):
+class VendorAdmin(ActiveFlagActions, SyncedModelAdmin):
     list_display = ('name', 'is_active')
     list_filter = ('is_active',)
 
 @admin.register(Equipment)
-class EquipmentAdmin(admin.ModelAdmin):
+class EquipmentAdmin(ActiveFlagActions, LargeTableAdmin):
     list_display = ('name', 'model', 'serial', 'location_status', 'manufacturer', 'is_active')
     list_filter = ('location_status', 'is_active', 'manufacturer')
+    list_select_related = ('manufacturer',)
+    # Prefix lookups, served on Postgres by the serial column's pattern index
+    search_fields = ('serial__startswith',)
 
 @admin.register(Part)
-class PartAdmin(admin.ModelAdmin):
+class PartAdmin(ActiveFlagActions, LargeTableAdmin):
     list_display = ('part_number', 'part_name', 'status', 'get_equipment', 'get_suppliers', 'is_active')
     list_filter = ('is_active', 'status')
+    search_fields = ('part_number__startswith', 'part_name__startswith')
+
+    def get_queryset(self, request):
+        # One query per relation for the whole page
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('equipment', queryset=Equipment.objects.only('id', 'name')),
+            Prefetch('suppliers', queryset=Vendor.objects.only('id', 'name')),
+        )
 
+    @admin.display(description='Equipment')
     def get_equipment(self, obj):
-        return ', '.join(equip.name for equip in obj.equipment.all()) if obj.equipment.exists() else 'None'
-    get_equipment.short_description = 'Equipment'
+        return ', '.join(equip.name for equip in obj.equipment.all()) or 'None'
 
+    @admin.display(description='Suppliers')
     def get_suppliers(self, obj):
-        return ', '.join(vendor.name for vendor in obj.suppliers.all()) if obj.suppliers.exists() else 'None'
-    get_suppliers.short_description = 'Suppliers'
+        return ', '.join(vendor.name for vendor in obj.suppliers.all()) or 'None'
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(LargeTableAdmin):
     list_display = ('description', 'frequency', 'equipment', 'task_type', 'priority', 'assigned_to')
     list_filter = ('frequency', 'task_type', 'priority')
+    list_select_related = ('equipment', 'assigned_to')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and 'assigned_to' in form.changed_data:
+            previous = form.initial.get('assigned_to')
+            record_reassignment(obj, User.objects.filter(pk=previous).first() if previous else None, request.user)
 
 @admin.register(Schedule)
-class ScheduleAdmin(admin.ModelAdmin):
+class ScheduleAdmin(LargeTableAdmin):
     list_display = ('task', 'due_date', 'status', 'is_overdue')
     list_filter = ('status',)
+    list_select_related = ('task',)
+    # Prefix lookups, served on Postgres by the UPPER() pattern indexes on both columns
+    search_fields = ('^task__description', '^task__equipment__name')
+    actions = ['complete']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_overdue()
+
+    @admin.display(boolean=True, ordering='overdue', description='Is overdue')
+    def is_overdue(self, obj):
+        return obj.is_overdue
+
+    @admin.action(description='Complete selected schedules')
+    def complete(self, request, queryset):
+        # The locking service completes the pending ones in a single UPDATE
+        completed = complete_schedules(list(queryset.values_list('pk', flat=True)), actor=request.user)
+        self.message_user(request, f"{len(completed)} schedules completed.")
 
     def save_model(self, request, obj, form, change):
-        print(f"Saving schedule ID={obj.pk}, status={obj.status}, due_date={obj.due_date}, completion_date={obj.completion_date}")
-        if obj.status == 'completed' and not obj.completion_date:
-            print("Setting completion date and checking for next schedule...")
-            obj.completion_date = timezone.now().date()
-            next_due_date = obj.task.calculate_next_due_date(obj.due_date)
-            print(f"Next due date: {next_due_date}")
-            if next_due_date:
-                print("Creating new schedule...")
-                Schedule.objects.create(
-                    task=obj.task,
-                    due_date=next_due_date,
-                    status='pending'
-                )
-            else:
-                print("No next due date, skipping new schedule.")
-        obj.save()
\ No newline at end of file
+        completing = obj.status == 'completed' and (not change or 'status' in form.changed_data)
+        if not completing:
+            obj.save()
+            if change and 'status' in form.changed_data:
+                record_events([obj.pk], 'status', request.user, from_value=form.initial['status'], to_value=obj.status)
+            return
+        # Completion always goes through the locking service, for new rows too
+        if change:
+            fields = [name for name in form.changed_data if name not in ('status', 'completion_date')]
+            if fields:
+                obj.save(update_fields=[*fields, 'updated_at'])
+        else:
+            obj.status = 'pending'
+            obj.save()
+        complete_schedules([obj.pk], obj.completion_date, request.user)
+        obj.refresh_from_db()
\ No newline at end of file
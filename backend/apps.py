@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CmmsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cmms'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401 (registers checks and receivers)
@@ -0,0 +1,458 @@
+"""
+Endpoint benchmarks: fixed datasets, one case per route and method, budgets.
+
+Every case runs inside a transaction that is rolled back, so writes leave
+the dataset as they found it and each iteration sees the same rows. Query
+counts and peak memory come from one instrumented run; latency percentiles
+come from the timed iterations, which run without instrumentation.
+
+``run_throughput`` compares the read endpoints with their async twins under
+concurrent load: requests go straight into Django's WSGI handler from a
+thread pool, as a threaded WSGI server would send them, and into its ASGI
+handler from one event loop.
+"""
+import asyncio
+import io
+import sys
+import time
+import tracemalloc
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import AsyncClient, Client, override_settings
+from django.urls import get_resolver
+from django.utils import timezone
+from .models import Vendor, Equipment, Part, Task, Schedule
+from .seeding import (
+    clear_data, finish_seeding, seed_vendors, seed_equipment, seed_parts, seed_tasks, seed_schedules
+)
+
+DATASETS = {
+    'small': {
+        'vendors': 20, 'equipment': 200, 'depth': 3, 'fan_out': 4,
+        'parts': 500, 'tasks': 200, 'schedules': 2000, 'users': 20,
+    },
+    'medium': {
+        'vendors': 100, 'equipment': 2000, 'depth': 4, 'fan_out': 5,
+        'parts': 5000, 'tasks': 2000, 'schedules': 20000, 'users': 100,
+    },
+    'large': {
+        'vendors': 500, 'equipment': 20000, 'depth': 4, 'fan_out': 5,
+        'parts': 50000, 'tasks': 10000, 'schedules': 200000, 'users': 500,
+    },
+}
+DATASET_SEED = 1
+# The benchmark's own transaction and the views' savepoints are not counted
+TRANSACTION_STATEMENTS = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE SAVEPOINT')
+
+class Case:
+    """
+    One request to benchmark.
+
+    ``path`` and ``data`` may be callables taking the dataset context (the
+    primary keys picked by ``dataset_context``). A ``stream`` case opens an
+    event stream and hangs up after its first event. ``budget`` caps ``queries``,
+    ``p95_ms`` and ``peak_kb``; query budgets must hold for every dataset. A
+    limit may instead map dataset names to limits, for payloads that grow
+    with the data; datasets it leaves out are not held to that metric.
+    The cache is cleared before each request unless the case is ``warm``.
+    """
+
+    def __init__(self, name, route, method, path, data=None, budget=None, warm=False):
+        self.name = name
+        self.route = route
+        self.method = method
+        self.path = path
+        self.data = data
+        self.budget = budget or {}
+        self.warm = warm
+
+    def request(self, client, context):
+        path = self.path(context) if callable(self.path) else self.path
+        data = self.data(context) if callable(self.data) else self.data
+        if self.method == 'get':
+            response = client.get(path, data)
+        elif self.method == 'upload':
+            response = client.post(path, data)
+        elif self.method == 'stream':
+            response = async_to_sync(self.first_event)(client, path, data)
+        else:
+            response = getattr(client, self.method)(path, data, content_type='application/json')
+        if response.streaming and self.method != 'stream':
+            b''.join(response.streaming_content)
+        return response
+
+    async def first_event(self, client, path, data):
+        stream_client = AsyncClient()
+        stream_client.cookies = client.cookies
+        response = await stream_client.get(path, data)
+        async for chunk in response:
+            if chunk.startswith(b'id:'):
+                break
+        # Closing the loop async_to_sync ran finalizes the stream, as a
+        # client disconnect would
+        return response
+
+def _upload(context):
+    rows = ''.join(f"Benchmark vendor {i},bench{i}@example.com\n" for i in range(200))
+    return {'file': SimpleUploadedFile('vendors.csv', f"name,contact_info\n{rows}".encode())}
+
+CASES = [
+    Case('users', 'user-list', 'get', '/api/users/', budget={'queries': 3, 'p95_ms': 100}),
+    Case('vendors', 'vendor-list', 'get', '/api/vendors/', budget={'queries': 3, 'p95_ms': 100}),
+    Case('vendor create', 'vendor-list', 'post', '/api/vendors/',
+         {'name': 'Benchmark Vendor'}, budget={'queries': 3, 'p95_ms': 100}),
+    Case('vendor', 'vendor-detail', 'get', lambda c: f"/api/vendors/{c['vendor']}/", budget={'queries': 3, 'p95_ms': 100}),
+    Case('vendor update', 'vendor-detail', 'patch', lambda c: f"/api/vendors/{c['vendor']}/",
+         {'address': 'Benchmark Road 1'}, budget={'queries': 4, 'p95_ms': 100}),
+    # The whole forest is serialized, so time and memory follow the dataset.
+    # Measured p95 ~1.4s / 23 MB on small and ~15.5s / 205 MB on medium
+    Case('equipment trees', 'equipment-list', 'get', '/api/equipment/', budget={
+        'queries': 7,
+        'p95_ms': {'small': 2000, 'medium': 20000},
+        'peak_kb': {'small': 30000, 'medium': 256000},
+    }),
+    Case('equipment trees cached', 'equipment-list', 'get', '/api/equipment/',
+         budget={'queries': 2, 'p95_ms': 2500}, warm=True),
+    Case('equipment flat', 'equipment-list', 'get', '/api/equipment/',
+         {'search': 'Equipment', 'fields': 'id,name,parent,manufacturer'}, budget={'queries': 3, 'p95_ms': 100}),
+    Case('equipment create', 'equipment-list', 'post', '/api/equipment/',
+         lambda c: {'name': 'Benchmark Equipment', 'model': 'B-1', 'serial': 'BENCH-1', 'parent': c['equipment_root']},
+         budget={'queries': 8, 'p95_ms': 100}),
+    Case('equipment move', 'equipment-move', 'post', '/api/equipment/move/',
+         lambda c: [{'id': c['equipment_child'], 'parent': c['equipment_other_root']}],
+         budget={'queries': 11, 'p95_ms': 100}),
+    Case('equipment', 'equipment-detail', 'get', lambda c: f"/api/equipment/{c['equipment_root']}/",
+         budget={'queries': 7, 'p95_ms': 5000, 'peak_kb': 32000}),
+    Case('equipment rollup', 'equipment-rollup', 'get', '/api/equipment/rollup/', budget={'queries': 5, 'p95_ms': 500}),
+    Case('subtree rollup', 'equipment-rollup', 'get', '/api/equipment/rollup/',
+         lambda c: {'subtree': c['equipment_root'], 'depth': 2}, budget={'queries': 6, 'p95_ms': 200}),
+    Case('equipment update', 'equipment-detail', 'patch', lambda c: f"/api/equipment/{c['equipment_child']}/",
+         {'description': 'Benchmarked'}, budget={'queries': 8, 'p95_ms': 1000}),
+    Case('parts', 'part-list', 'get', '/api/parts/', budget={'queries': 5, 'p95_ms': 300}),
+    Case('subtree parts', 'part-list', 'get', '/api/parts/', lambda c: {'subtree': c['equipment_root']},
+         budget={'queries': 6, 'p95_ms': 300}),
+    Case('part create', 'part-list', 'post', '/api/parts/',
+         lambda c: {'part_number': 'BENCH-1', 'part_name': 'Benchmark', 'status': 'available', 'equipment': [c['equipment_root']]},
+         budget={'queries': 7, 'p95_ms': 100}),
+    Case('part', 'part-detail', 'get', lambda c: f"/api/parts/{c['part']}/", budget={'queries': 5, 'p95_ms': 100}),
+    Case('part update', 'part-detail', 'patch', lambda c: f"/api/parts/{c['part']}/",
+         {'status': 'on-order'}, budget={'queries': 9, 'p95_ms': 100}),
+    Case('tasks', 'task-list', 'get', '/api/tasks/', budget={'queries': 3, 'p95_ms': 100}),
+    Case('subtree tasks', 'task-list', 'get', '/api/tasks/', lambda c: {'subtree': c['equipment_root']},
+         budget={'queries': 4, 'p95_ms': 100}),
+    Case('task create', 'task-list', 'post', '/api/tasks/',
+         lambda c: {'description': 'Benchmark', 'equipment': c['equipment_root'], 'start_date': '2025-01-01', 'task_type': 'maintenance', 'frequency': 'monthly'},
+         budget={'queries': 4, 'p95_ms': 100}),
+    Case('task', 'task-detail', 'get', lambda c: f"/api/tasks/{c['task']}/", budget={'queries': 3, 'p95_ms': 100}),
+    Case('task update', 'task-detail', 'patch', lambda c: f"/api/tasks/{c['task']}/",
+         {'priority': 'high'}, budget={'queries': 4, 'p95_ms': 100}),
+    Case('schedules', 'schedule-list', 'get', '/api/schedules/', budget={'queries': 3, 'p95_ms': 200}),
+    Case('schedules cached', 'schedule-list', 'get', '/api/schedules/',
+         budget={'queries': 2, 'p95_ms': 100}, warm=True),
+    Case('overdue schedules', 'schedule-list', 'get', '/api/schedules/', {'overdue': 'true'},
+         budget={'queries': 3, 'p95_ms': 200}),
+    Case('subtree overdue schedules', 'schedule-list', 'get', '/api/schedules/',
+         lambda c: {'overdue': 'true', 'subtree': c['equipment_root']}, budget={'queries': 4, 'p95_ms': 200}),
+    Case('schedule complete', 'schedule-complete', 'post', '/api/schedules/complete/',
+         lambda c: {'ids': c['pending_schedules']}, budget={'queries': 6, 'p95_ms': 150}),
+    Case('schedule', 'schedule-detail', 'get', lambda c: f"/api/schedules/{c['schedule']}/", budget={'queries': 3, 'p95_ms': 100}),
+    # Includes re-reading the row, so the response's is_overdue matches the new due date
+    Case('schedule update', 'schedule-detail', 'patch', lambda c: f"/api/schedules/{c['schedule']}/",
+         {'note': 'Benchmarked'}, budget={'queries': 6, 'p95_ms': 100}),
+    Case('schedule history', 'schedule-history', 'get', lambda c: f"/api/schedules/{c['schedule']}/history/",
+         budget={'queries': 5, 'p95_ms': 100}),
+    Case('schedule stats', 'schedule-stats', 'get', '/api/schedules/stats/', budget={'queries': 4, 'p95_ms': 1000}),
+    Case('dashboard', 'dashboard-summary', 'get', '/api/dashboard/summary/', budget={'queries': 10, 'p95_ms': 1000}),
+    Case('dashboard cached', 'dashboard-summary', 'get', '/api/dashboard/summary/',
+         budget={'queries': 2, 'p95_ms': 100}, warm=True),
+    Case('equipment lookup', 'equipment-lookup', 'get', '/api/lookups/equipment/', {'q': 'equipment 1'},
+         budget={'queries': 4, 'p95_ms': 50}),
+    Case('async schedules', 'async-schedule-list', 'get', '/api/async/schedules/', budget={'queries': 3, 'p95_ms': 200}),
+    Case('async dashboard', 'async-dashboard-summary', 'get', '/api/async/dashboard/summary/',
+         budget={'queries': 10, 'p95_ms': 1000}),
+    Case('async lookup', 'async-equipment-lookup', 'get', '/api/async/lookups/equipment/', {'q': 'equipment 1'},
+         budget={'queries': 4, 'p95_ms': 50}),
+    Case('vendor lookup', 'vendor-lookup', 'get', '/api/lookups/vendors/', {'q': 'a'}, budget={'queries': 3, 'p95_ms': 50}),
+    Case('user lookup', 'user-lookup', 'get', '/api/lookups/users/', budget={'queries': 3, 'p95_ms': 50}),
+    Case('sync', 'sync', 'get', '/api/sync/', {'limit': 200}, budget={'queries': 10, 'p95_ms': 200}),
+    Case('forecast', 'forecast', 'get', '/api/forecast/', budget={'queries': 4, 'p95_ms': 2000}),
+    Case('forecast by subtree', 'forecast', 'get', '/api/forecast/', {'group_by': 'subtree'},
+         budget={'queries': 5, 'p95_ms': 2000}),
+    Case('forecast cached', 'forecast', 'get', '/api/forecast/', budget={'queries': 2, 'p95_ms': 100}, warm=True),
+    Case('event stream', 'events', 'stream', '/api/events/', {'last_event_id': 0}, budget={'queries': 2, 'p95_ms': 100}),
+    # SQLite binds at most 999 parameters, so 200 rows of five columns (updated_at
+    # included, for delta sync) take two INSERTs there
+    Case('vendor import', 'import', 'upload', '/api/import/vendors/', _upload, budget={'queries': 4, 'p95_ms': 300}),
+    Case('profiling metrics', 'profiling-metrics', 'get', '/api/metrics/', budget={'queries': 2, 'p95_ms': 100}),
+    Case('equipment export', 'export', 'get', '/api/export/equipment/', budget={'queries': 3, 'p95_ms': 500, 'peak_kb': 4096}),
+]
+
+def uncovered_routes(cases=CASES):
+    """Names of API routes that no benchmark case exercises."""
+    names = {pattern.name for pattern in get_resolver('cmms.urls').url_patterns if pattern.name}
+    return sorted(names - {case.route for case in cases})
+
+def seed_dataset(name):
+    """Replace the benchmark tables' contents with the ``name`` dataset."""
+    sizes = DATASETS[name]
+    clear_data()
+    User.objects.filter(username__startswith='bench-').delete()
+    User.objects.bulk_create(User(username=f'bench-{i}') for i in range(sizes['users']))
+    with transaction.atomic():
+        seed_vendors(sizes['vendors'], DATASET_SEED)
+        seed_equipment(sizes['equipment'], sizes['depth'], sizes['fan_out'], DATASET_SEED)
+        seed_parts(sizes['parts'], DATASET_SEED)
+        seed_tasks(sizes['tasks'], DATASET_SEED)
+        seed_schedules(sizes['schedules'], DATASET_SEED)
+    finish_seeding()
+
+def dataset_context():
+    """Primary keys the cases point at, chosen deterministically from the seeded rows."""
+    roots = list(Equipment.objects.filter(parent__isnull=True).order_by('tree_id').values_list('pk', flat=True)[:2])
+    return {
+        'vendor': Vendor.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'equipment_root': roots[0],
+        'equipment_other_root': roots[-1],
+        'equipment_child': Equipment.objects.filter(level=1).order_by('tree_id', 'lft').values_list('pk', flat=True).first(),
+        'part': Part.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'task': Task.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'schedule': Schedule.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'pending_schedules': list(
+            Schedule.objects.filter(status='pending').order_by('due_date', 'pk').values_list('pk', flat=True)[:50]
+        ),
+    }
+
+class QueryCounter:
+    """``execute_wrapper`` hook counting statements, leaving out transaction control."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.startswith(TRANSACTION_STATEMENTS):
+            self.count += 1
+        return execute(sql, params, many, context)
+
+def _run_once(case, client, context):
+    """Issue one request and roll back whatever it wrote."""
+    if not case.warm:
+        cache.clear()
+    with transaction.atomic():
+        began = time.perf_counter()
+        response = case.request(client, context)
+        elapsed = time.perf_counter() - began
+        transaction.set_rollback(True)
+    if response.status_code >= 400:
+        raise AssertionError(f"{case.name}: HTTP {response.status_code} {response.content[:500]!r}")
+    return elapsed, response
+
+def run_case(case, client, context, iterations):
+    """Measure ``case``: latency percentiles, query count, peak memory and response size."""
+    _run_once(case, client, context)  # Warm caches, imports and the cached dashboard
+    queries = QueryCounter()
+    with connection.execute_wrapper(queries):
+        tracemalloc.start()
+        _, response = _run_once(case, client, context)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    timings = np.array([_run_once(case, client, context)[0] for _ in range(iterations)]) * 1000
+    return {
+        'case': case.name,
+        'route': case.route,
+        'method': {'upload': 'POST', 'stream': 'GET'}.get(case.method, case.method.upper()),
+        'status': response.status_code,
+        'iterations': iterations,
+        'p50_ms': round(float(np.percentile(timings, 50)), 2),
+        'p95_ms': round(float(np.percentile(timings, 95)), 2),
+        'mean_ms': round(float(timings.mean()), 2),
+        'queries': queries.count,
+        'peak_kb': round(peak / 1024, 1),
+        'bytes': None if response.streaming else len(response.content),
+    }
+
+def check_budget(case, result, latency=True):
+    """Budget violations for one result, as readable strings."""
+    violations = []
+    for metric, limit in case.budget.items():
+        if metric == 'p95_ms' and not latency:
+            continue
+        if isinstance(limit, dict):
+            limit = limit.get(result['dataset'])
+        if limit is not None and result[metric] > limit:
+            violations.append(f"{case.name} [{result['dataset']}]: {metric} {result[metric]} > {limit}")
+    return violations
+
+def run_benchmarks(datasets, iterations, cases=CASES, latency_budgets=True, progress=None):
+    """
+    Seed each dataset in turn and run every case against it.
+
+    Returns ``(report, violations)``; the report is JSON-serializable.
+    """
+    user, _ = User.objects.get_or_create(username='benchmark', defaults={'is_superuser': True, 'is_staff': True})
+    client = Client()
+    client.force_login(user)
+    results = []
+    violations = []
+    counts = {}
+    for dataset in datasets:
+        seed_dataset(dataset)
+        context = dataset_context()
+        counts[dataset] = {model._meta.model_name: model.objects.count() for model in (Vendor, Equipment, Part, Task, Schedule)}
+        for case in cases:
+            result = {'dataset': dataset, **run_case(case, client, context, iterations)}
+            results.append(result)
+            violations.extend(check_budget(case, result, latency_budgets))
+            if progress:
+                progress(result)
+
+    # Query counts must not grow with the data
+    for case in cases:
+        seen = {result['queries'] for result in results if result['case'] == case.name}
+        if len(seen) > 1:
+            violations.append(f"{case.name}: query count varies with dataset size {sorted(seen)}")
+    report = {
+        'generated_at': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'iterations': iterations,
+        'datasets': counts,
+        'uncovered_routes': uncovered_routes(cases),
+        'results': results,
+        'violations': violations,
+    }
+    return report, violations
+
+# Read endpoints and their async twins, with the query string both get
+THROUGHPUT_ROUTES = [
+    ('schedules', '/api/schedules/', '/api/async/schedules/', ''),
+    ('dashboard', '/api/dashboard/summary/', '/api/async/dashboard/summary/', ''),
+    ('equipment lookup', '/api/lookups/equipment/', '/api/async/lookups/equipment/', 'q=equipment+1'),
+]
+
+def _wsgi_get(handler, path, query, cookie):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'SCRIPT_NAME': '', 'PATH_INFO': path, 'QUERY_STRING': query,
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1', 'HTTP_HOST': 'testserver', 'HTTP_COOKIE': cookie,
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    status = []
+    response = handler(environ, lambda line, headers: status.append(int(line.split()[0])))
+    try:
+        b''.join(response)
+    finally:
+        response.close()  # Fires request_finished, as servers do
+    return status[0]
+
+async def _asgi_get(application, path, query, cookie):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    requested = False
+    status = []
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # The client stays connected; Django stops waiting once it has answered
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await application(scope, receive, send)
+    return status[0]
+
+def _rates(results, elapsed):
+    statuses, timings = zip(*results)
+    failed = sorted({status for status in statuses if status != 200})
+    if failed:
+        raise AssertionError(f"HTTP {failed}")
+    timings = np.array(timings) * 1000
+    return {
+        'requests_per_s': round(len(timings) / elapsed, 1),
+        'p50_ms': round(float(np.percentile(timings, 50)), 2),
+        'p95_ms': round(float(np.percentile(timings, 95)), 2),
+    }
+
+def measure_wsgi(path, query, cookie, requests, concurrency):
+    """Requests per second and latency of ``requests`` GETs sent by ``concurrency`` threads."""
+    handler = WSGIHandler()
+
+    def one(_):
+        began = time.perf_counter()
+        status = _wsgi_get(handler, path, query, cookie)
+        return status, time.perf_counter() - began
+
+    began = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    return _rates(results, time.perf_counter() - began)
+
+async def measure_asgi(path, query, cookie, requests, concurrency):
+    """``measure_wsgi`` for the ASGI handler, with ``concurrency`` requests in flight on one loop."""
+    application = ASGIHandler()
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with limit:
+            began = time.perf_counter()
+            status = await _asgi_get(application, path, query, cookie)
+            return status, time.perf_counter() - began
+
+    began = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(requests)))
+    return _rates(results, time.perf_counter() - began)
+
+def run_throughput(datasets, requests, concurrency, routes=THROUGHPUT_ROUTES, cached=False, progress=None):
+    """
+    Seed each dataset and load every route through both handlers.
+
+    Responses are rebuilt for every request unless ``cached``, in which case
+    the configured cache serves all but the first. The database must be
+    visible to other threads, which rules out rolling back like the cases.
+    Returns a JSON-serializable report.
+    """
+    user, _ = User.objects.get_or_create(username='benchmark', defaults={'is_superuser': True, 'is_staff': True})
+    client = Client()
+    client.force_login(user)
+    cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+    caches = {} if cached else {'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}}
+    results = []
+    with override_settings(**caches):
+        for dataset in datasets:
+            seed_dataset(dataset)
+            for name, wsgi_path, asgi_path, query in routes:
+                cache.clear()
+                wsgi = measure_wsgi(wsgi_path, query, cookie, requests, concurrency)
+                cache.clear()
+                asgi = asyncio.run(measure_asgi(asgi_path, query, cookie, requests, concurrency))
+                result = {
+                    'dataset': dataset, 'route': name, 'wsgi': wsgi, 'asgi': asgi,
+                    'speedup': round(asgi['requests_per_s'] / wsgi['requests_per_s'], 2),
+                }
+                results.append(result)
+                if progress:
+                    progress(result)
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'requests': requests,
+        'concurrency': concurrency,
+        'cached': cached,
+        'results': results,
+    }
@@ -0,0 +1,149 @@
+import hashlib
+import time
+from functools import partial
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+VERSION_TIMEOUT = None  # Version counters never expire on their own
+RESPONSE_TIMEOUT = 300  # Seconds; a write retires cached responses sooner
+
+def _version_key(resource):
+    return f'cmms:version:{resource}'
+
+def get_version(resource):
+    """
+    Current cache generation for ``resource``.
+
+    Versions are nanosecond timestamps of the last write, so they double as
+    modification times, and a counter lost to eviction or a cache restart
+    comes back newer than any value older entries were keyed with.
+    """
+    return cache.get_or_set(_version_key(resource), time.time_ns, VERSION_TIMEOUT)
+
+def bump_version(resource):
+    """Invalidate every cache entry keyed on ``resource``."""
+    key = _version_key(resource)
+    # Stay monotonic even if this worker's clock is behind the last writer's
+    cache.set(key, max(time.time_ns(), (cache.get(key) or 0) + 1), VERSION_TIMEOUT)
+
+def invalidate(resource):
+    """
+    Bump ``resource`` now and again when the current transaction commits.
+
+    The second bump keeps a read that races the transaction from leaving
+    pre-commit rows cached under the new version.
+    """
+    bump_version(resource)
+    transaction.on_commit(partial(bump_version, resource))
+
+def invalidate_after_bulk(*resources):
+    """
+    Invalidate ``resources`` after writes that send no signals.
+
+    ``bulk_create``, ``update()``, tree renumbering and raw SQL skip the
+    post_save/post_delete receivers that normally call ``invalidate``, so
+    code using them calls this once per batch instead of once per row.
+    """
+    for resource in resources:
+        invalidate(resource)
+
+def versioned_key(prefix, resources, *parts):
+    """Cache key that changes whenever one of ``resources`` is bumped."""
+    versions = '.'.join(str(get_version(resource)) for resource in resources)
+    return ':'.join(['cmms', prefix, versions, *map(str, parts)])
+
+def request_resources(resources, request):
+    """
+    The counters a GET of ``resources`` depends on. A ``?subtree=`` filter
+    adds the equipment counter, since moving a node changes which rows its
+    subtree holds.
+    """
+    resources = list(resources)
+    if request.GET.get('subtree') and 'equipment' not in resources:
+        resources.append('equipment')
+    return resources
+
+def response_validators(name, resources, request, date_dependent=False, media_type=None):
+    """Cache key, ETag and Last-Modified time for a GET response of view ``name`` built from ``resources``."""
+    resources = request_resources(resources, request)
+    versions = [get_version(resource) for resource in resources]
+    last_modified = max(versions) // 10**9
+    parts = [request.get_host(), request.get_full_path()]
+    if date_dependent:
+        today = timezone.localdate()
+        parts.append(today)
+        midnight = timezone.make_aware(timezone.datetime.combine(today, timezone.datetime.min.time()))
+        last_modified = max(last_modified, int(midnight.timestamp()))
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    key = ':'.join(['cmms', 'response', name, *map(str, versions), digest])
+    etag = '"%s"' % hashlib.md5(f'{key}:{media_type}'.encode()).hexdigest()
+    return key, etag, last_modified
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Responses depend on the session, so only the client may keep them
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+class VersionedResponseMixin:
+    """
+    Conditional, shared-cache GET responses for DRF views.
+
+    ``cache_resources`` names the version counters the payload depends on.
+    Their versions give each response an ETag and a Last-Modified date, so
+    a client holding a current copy gets 304 Not Modified, and serialized
+    data is shared through the cache under a key that any write to those
+    resources retires. Views whose output changes with the date (overdue
+    flags) set ``date_dependent``.
+    """
+    cache_resources = ()
+    cache_timeout = RESPONSE_TIMEOUT
+    date_dependent = False
+
+    def get(self, request, *args, **kwargs):
+        key, etag, last_modified = response_validators(
+            type(self).__name__, self.cache_resources, request, self.date_dependent, request.accepted_media_type
+        )
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            data = cache.get(key)
+            if data is None:
+                response = super().get(request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(key, response.data, self.cache_timeout)
+            else:
+                response = Response(data)
+        return set_validators(response, etag, last_modified)
+
+class AsyncVersionedResponseMixin:
+    """
+    ``VersionedResponseMixin`` for async Django views answering JSON.
+
+    The rendered body is cached rather than the data, and the version
+    counters are read on the request's thread, as the async cache API would.
+    """
+    cache_resources = ()
+    cache_timeout = RESPONSE_TIMEOUT
+    date_dependent = False
+
+    async def get(self, request, *args, **kwargs):
+        key, etag, last_modified = await sync_to_async(response_validators)(
+            type(self).__name__, self.cache_resources, request, self.date_dependent, 'application/json'
+        )
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            content = await cache.aget(key)
+            if content is None:
+                response = await super().get(request, *args, **kwargs)
+                if response.status_code == 200:
+                    await cache.aset(key, response.content, self.cache_timeout)
+            else:
+                response = HttpResponse(content, content_type='application/json')
+        return set_validators(response, etag, last_modified)
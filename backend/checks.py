@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES['default']['BACKEND']
+    if getattr(settings, 'WEB_CONCURRENCY', 1) > 1 and backend.endswith(('.DummyCache', '.LocMemCache')):
+        return [Warning(
+            "Several workers run without a shared cache, so response caching is off or inconsistent.",
+            hint="Set REDIS_URL so workers share version counters and cached responses.",
+            id='cmms.W001',
+        )]
+    return []
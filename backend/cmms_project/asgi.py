@@ -0,0 +1,12 @@
+"""
+ASGI entry point, for the event stream and the async reads under /api/async/.
+
+Served by the Procfile with
+  SERVER_APP=cmms_project.asgi GUNICORN_CMD_ARGS="-k uvicorn_worker.UvicornWorker"
+"""
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cmms_project.settings')
+
+application = get_asgi_application()
\ No newline at end of file
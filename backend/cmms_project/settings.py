@@ -36,12 +36,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'cmms.profiling.ProfilingMiddleware',  # Outermost so it times everything below it
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'cmms.routers.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -66,18 +68,79 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'cmms_project.wsgi.application'
 
+# ASGI mode serves the event stream and the async reads under /api/async/
+# without a worker per open request. The Procfile switches with
+#   SERVER_APP=cmms_project.asgi GUNICORN_CMD_ARGS="-k uvicorn_worker.UvicornWorker"
+ASGI_APPLICATION = 'cmms_project.asgi.application'
+
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
-DATABASES = {
-    'default': {
+# Postgres connections come from a psycopg 3 pool in each process, which
+# checks a connection before handing it out. DB_POOL_MAX_SIZE=0 keeps one
+# persistent, health-checked connection per thread instead, for running
+# behind PgBouncer. sqlite:///path URLs are accepted for local runs.
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+
+def database_from_url(url):
+    parsed = urlparse(url)
+    if parsed.scheme == 'sqlite':
+        return {'ENGINE': 'django.db.backends.sqlite3', 'NAME': parsed.path[1:]}
+    database = {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': urlparse(os.getenv('DATABASE_URL')).path[1:],
-        'USER': urlparse(os.getenv('DATABASE_URL')).username,
-        'PASSWORD': urlparse(os.getenv('DATABASE_URL')).password,
-        'HOST': urlparse(os.getenv('DATABASE_URL')).hostname,
-        'PORT': urlparse(os.getenv('DATABASE_URL')).port,
+        'NAME': parsed.path[1:],
+        'USER': parsed.username,
+        'PASSWORD': parsed.password,
+        'HOST': parsed.hostname,
+        'PORT': parsed.port,
     }
-}
+    if DB_POOL_MAX_SIZE:
+        from psycopg_pool import ConnectionPool
+        database['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+                'max_size': DB_POOL_MAX_SIZE,
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),  # Seconds to wait for a free connection
+                'max_idle': 300,
+                'check': ConnectionPool.check_connection,
+            },
+        }
+    else:
+        database['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', '600'))
+        database['CONN_HEALTH_CHECKS'] = True
+    return database
+
+DATABASES = {'default': database_from_url(os.getenv('DATABASE_URL'))}
+
+# Optional read replica. GETs of the list views read from it, except from
+# clients that wrote, and for resources written, within the last
+# REPLICA_PIN_SECONDS (see cmms.routers); make that longer than the replica
+# usually lags. Tests read the primary.
+if os.getenv('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = {
+        **database_from_url(os.getenv('DATABASE_REPLICA_URL')),
+        'TEST': {'MIRROR': 'default'},
+    }
+CMMS_READ_REPLICA = 'replica' if 'replica' in DATABASES else None
+CMMS_REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+DATABASE_ROUTERS = ['cmms.routers.ReplicaRouter']
+
+# Cache
+# Version counters and serialized API responses live here, and every worker
+# must see the same ones: a write bumps the counter in one process only, so
+# the others would keep serving, and answering 304 for, what it replaced.
+# Set REDIS_URL to share them. With several workers (WEB_CONCURRENCY, which
+# gunicorn reads) and no Redis, caching is switched off and a system check
+# says so.
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', '1'))
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+elif WEB_CONCURRENCY > 1:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -107,7 +170,41 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'cmms.pagination.KeysetPagination',
+}
+
+# Request profiling: Server-Timing headers and /api/metrics/ for a sample of
+# requests. A sample rate of 0 switches the middleware off entirely.
+CMMS_PROFILING = {
+    'SAMPLE_RATE': float(os.getenv('PROFILING_SAMPLE_RATE', '0')),
+}
+
+# Processes the maintenance forecast fans out to on large installations;
+# unset means one per CPU
+CMMS_FORECAST_WORKERS = int(os.getenv('FORECAST_WORKERS', '0')) or None
+
+# Live events (/api/events/). Each process fans out its own by default; with
+# several workers set REDIS_URL so they share events through Redis.
+if os.getenv('REDIS_URL'):
+    CMMS_EVENTS = {
+        'BROKER': 'cmms.events.RedisBroker',
+        'OPTIONS': {'url': os.getenv('REDIS_URL')},
+    }
+
+# Reminder digests (manage.py send_reminders, run from cron). The file
+# backend writes JSON lines instead of mail; for an SMTP debugging server
+# set EMAIL_PORT to the port it listens on.
+CMMS_REMINDERS = {
+    'BACKEND': os.getenv('REMINDER_BACKEND', 'cmms.reminders.EmailBackend'),
+    'OPTIONS': {},
+    'LEAD_DAYS': int(os.getenv('REMINDER_LEAD_DAYS', '3')),
+    'OVERDUE_DAYS': int(os.getenv('REMINDER_OVERDUE_DAYS', '7')),
+    'CONCURRENCY': int(os.getenv('REMINDER_CONCURRENCY', '10')),
 }
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', '25'))
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'cmms@localhost')
 
 # CORS and CSRF
 CORS_ALLOWED_ORIGINS = [
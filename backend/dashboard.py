@@ -0,0 +1,123 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Case, Count, Exists, F, OuterRef, Q, When
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+from .caching import versioned_key
+from .models import Equipment, Task, Schedule
+from .trees import subtree_filter
+
+SUMMARY_TIMEOUT = 300  # Seconds; saves and deletes invalidate sooner
+
+def _counts(today):
+    """Per-bucket counters shared by every breakdown."""
+    return {
+        'pending': Count('id', filter=Q(status='pending')),
+        'overdue': Count('id', filter=Q(status='pending', due_date__lt=today)),
+        'completed': Count('id', filter=Q(status='completed')),
+    }
+
+def _grouped(schedules, field, counts):
+    return schedules.values(field).annotate(**counts).order_by(field)
+
+def _keyed(rows, field, counts, key=None):
+    return [
+        {'key': key(row[field]) if key else row[field], **{name: row[name] for name in counts}}
+        for row in rows
+    ]
+
+def _summary_queries(start, end, subtree):
+    """
+    The unevaluated queries behind a summary: the schedules and planned
+    tasks it totals, its counters and a ``(schedules, field, counters, key)``
+    grouping per breakdown.
+
+    A pending schedule falls in the range by ``due_date`` and a completed one
+    by ``completion_date``, matching what the dashboard cards list.
+    """
+    today = timezone.now().date()
+    schedules = Schedule.objects.all()
+    tasks = Task.objects.all()
+
+    if subtree is not None:
+        tasks = tasks.filter(**subtree_filter(subtree))
+        schedules = schedules.filter(**subtree_filter(subtree, 'task__equipment'))
+
+    pending_range = Q(status='pending')
+    completed_range = Q(status='completed')
+    if start:
+        pending_range &= Q(due_date__gte=start)
+        completed_range &= Q(completion_date__gte=start)
+        tasks = tasks.filter(start_date__gte=start)
+    if end:
+        pending_range &= Q(due_date__lte=end)
+        completed_range &= Q(completion_date__lte=end)
+        tasks = tasks.filter(start_date__lte=end)
+    schedules = schedules.filter(pending_range | completed_range)
+
+    counts = _counts(today)
+    completed = Schedule.objects.filter(task=OuterRef('pk'), status='completed')
+    week_of = TruncWeek(Case(When(status='completed', then=F('completion_date')), default=F('due_date')))
+    groupings = {
+        'by_status': (schedules, 'status', {'count': Count('id')}, None),
+        'by_priority': (schedules, 'task__priority', counts, None),
+        'by_task_type': (schedules, 'task__task_type', counts, None),
+        'by_equipment': (schedules, 'task__equipment__tree_id', counts, None),
+        'by_week': (schedules.annotate(week=week_of), 'week', counts, lambda week: week.isoformat()),
+    }
+    return schedules, tasks.exclude(Exists(completed)), counts, groupings
+
+def _roots(by_tree):
+    return Equipment.objects.filter(
+        parent__isnull=True, tree_id__in=[row['key'] for row in by_tree]
+    ).values_list('tree_id', 'name')
+
+def _assemble(totals, planned, breakdowns, roots):
+    for row in breakdowns['by_equipment']:
+        row['name'] = roots.get(row['key'])
+    return {
+        'totals': {**totals, 'planned_tasks': planned},
+        **breakdowns,
+        'generated_at': timezone.now().isoformat(),
+    }
+
+def build_summary(start=None, end=None, subtree=None):
+    """Count schedules in the database, grouped the ways the dashboard shows them."""
+    schedules, planned, counts, groupings = _summary_queries(start, end, subtree)
+    breakdowns = {
+        name: _keyed(_grouped(rows, field, fields), field, fields, key)
+        for name, (rows, field, fields, key) in groupings.items()
+    }
+    roots = dict(_roots(breakdowns['by_equipment']))
+    return _assemble(schedules.aggregate(**counts), planned.count(), breakdowns, roots)
+
+async def abuild_summary(start=None, end=None, subtree=None):
+    """``build_summary`` on the async ORM, for async views."""
+    schedules, planned, counts, groupings = _summary_queries(start, end, subtree)
+    breakdowns = {}
+    for name, (rows, field, fields, key) in groupings.items():
+        breakdowns[name] = _keyed([row async for row in _grouped(rows, field, fields)], field, fields, key)
+    roots = {tree_id: name async for tree_id, name in _roots(breakdowns['by_equipment'])}
+    return _assemble(await schedules.aaggregate(**counts), await planned.acount(), breakdowns, roots)
+
+def _summary_key(start, end, subtree):
+    # Equipment trees group every summary, and are listed by their root's name
+    return versioned_key('dashboard', ['task', 'schedule', 'equipment'], timezone.now().date(), start, end, subtree.pk if subtree else None)
+
+def get_summary(start=None, end=None, subtree=None):
+    """Cached ``build_summary``; task, schedule and equipment writes invalidate it."""
+    key = _summary_key(start, end, subtree)
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_summary(start, end, subtree)
+        cache.set(key, summary, SUMMARY_TIMEOUT)
+    return summary
+
+async def aget_summary(start=None, end=None, subtree=None):
+    """``get_summary`` for async views; it shares the cache entries."""
+    key = await sync_to_async(_summary_key)(start, end, subtree)
+    summary = await cache.aget(key)
+    if summary is None:
+        summary = await abuild_summary(start, end, subtree)
+        await cache.aset(key, summary, SUMMARY_TIMEOUT)
+    return summary
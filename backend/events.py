@@ -0,0 +1,205 @@
+"""
+Live change events for connected clients.
+
+Writes publish compact events through ``publish_on_commit``, so nothing
+is announced for a transaction that rolls back. The broker numbers them,
+keeps the most recent in a replay buffer and fans each one out to every
+subscriber of the process; ``EventStreamView`` relays a subscription as
+Server-Sent Events. A client reconnecting with ``Last-Event-ID`` gets what
+it missed from the buffer, or a ``reset`` event asking it to refetch when
+the gap is older than the buffer or it fell too far behind.
+
+``LocalBroker`` serves a single process. With several workers,
+``RedisBroker`` publishes through Redis and each worker's listener feeds
+its own subscribers.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUFFER = 1000  # Events kept for clients that reconnect
+DEFAULT_QUEUE_LIMIT = 500  # Undelivered events before a slow client is reset
+HEARTBEAT = 15  # Seconds between keep-alive comments on idle streams
+
+class Subscription:
+    """One client's queue; ``push`` may be called from any thread."""
+    def __init__(self, loop, limit):
+        self.loop = loop
+        self.limit = limit
+        self.queue = asyncio.Queue()
+        self.overflowed = False
+
+    def push(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= self.limit:
+            # None wakes the reader, which sends a reset and closes
+            self.overflowed = True
+            event = None
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+class LocalBroker:
+    """Numbers, buffers and fans out events within this process."""
+    def __init__(self, buffer=DEFAULT_BUFFER, queue_limit=DEFAULT_QUEUE_LIMIT):
+        self.lock = threading.Lock()
+        self.recent = deque(maxlen=buffer)
+        self.subscribers = set()
+        self.queue_limit = queue_limit
+        # Start from the clock so ids keep growing across restarts and a
+        # client holding an id from before one is told to refetch
+        self.last_id = time.time_ns() // 1000
+
+    def publish(self, kind, data):
+        with self.lock:
+            event = {'id': self.last_id + 1, 'type': kind, 'data': data}
+            subscribers = self._record(event)
+        self._fan_out(event, subscribers)
+
+    def deliver(self, event):
+        """Fan out an event numbered elsewhere."""
+        with self.lock:
+            subscribers = self._record(event)
+        self._fan_out(event, subscribers)
+
+    def _record(self, event):
+        self.last_id = max(self.last_id, event['id'])
+        self.recent.append(event)
+        return list(self.subscribers)
+
+    def _fan_out(self, event, subscribers):
+        for subscription in subscribers:
+            try:
+                subscription.push(event)
+            except RuntimeError:
+                # The client's event loop has closed
+                self.unsubscribe(subscription)
+
+    def subscribe(self, last_id=None):
+        """
+        Register the calling event loop's client.
+
+        Returns the subscription, the buffered events after ``last_id`` and
+        whether the client must refetch because some are gone.
+        """
+        subscription = Subscription(asyncio.get_running_loop(), self.queue_limit)
+        with self.lock:
+            self.subscribers.add(subscription)
+            if last_id is None or last_id >= self.last_id:
+                return subscription, [], False
+            replay = [event for event in self.recent if event['id'] > last_id]
+            complete = bool(replay) and replay[0]['id'] == last_id + 1
+            return subscription, replay if complete else [], not complete
+
+    async def asubscribe(self, last_id=None):
+        """``subscribe`` for coroutines; brokers with blocking setup move it off the loop."""
+        return self.subscribe(last_id)
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+class RedisBroker(LocalBroker):
+    """
+    Shares events between worker processes over Redis pub/sub.
+
+    Ids come from a Redis counter so they agree across workers. Each worker
+    listens on a daemon thread, started with its first subscriber, and hands
+    what it hears to ``deliver``.
+    """
+    def __init__(self, url, channel='cmms:events', **kwargs):
+        import redis
+        super().__init__(**kwargs)
+        self.redis = redis.Redis.from_url(url)
+        self.channel = channel
+        self.listener = None
+        self.start_lock = threading.Lock()
+
+    def publish(self, kind, data):
+        event = {'id': self.redis.incr(f'{self.channel}:id'), 'type': kind, 'data': data}
+        self.redis.publish(self.channel, json.dumps(event))
+
+    def start_listener(self):
+        with self.start_lock:
+            if self.listener is None:
+                # Events before this point were never heard here
+                last_id = int(self.redis.get(f'{self.channel}:id') or 0)
+                with self.lock:
+                    self.last_id = last_id
+                self.listener = threading.Thread(target=self.listen, name='cmms-events', daemon=True)
+                self.listener.start()
+
+    def subscribe(self, last_id=None):
+        self.start_listener()
+        return super().subscribe(last_id)
+
+    async def asubscribe(self, last_id=None):
+        if self.listener is None:
+            # Starting reads the counter from Redis, which would block the loop
+            await asyncio.to_thread(self.start_listener)
+        return super().subscribe(last_id)
+
+    def listen(self):
+        while True:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                for message in pubsub.listen():
+                    self.deliver(json.loads(message['data']))
+            except Exception:
+                logger.exception("Event listener lost Redis; reconnecting")
+                time.sleep(1)
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            config = getattr(settings, 'CMMS_EVENTS', {})
+            _broker = import_string(config.get('BROKER', 'cmms.events.LocalBroker'))(**config.get('OPTIONS', {}))
+        return _broker
+
+def publish_on_commit(kind, data):
+    """Publish once the current transaction commits; a failed publish is logged, never raised."""
+    transaction.on_commit(lambda: get_broker().publish(kind, data), robust=True)
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+async def stream_events(last_id=None, heartbeat=HEARTBEAT):
+    """Server-Sent Events text for one client, until it disconnects."""
+    broker = get_broker()
+    subscription, replay, reset = await broker.asubscribe(last_id)
+    try:
+        yield 'retry: 3000\n\n'
+        if reset:
+            yield format_event({'id': broker.last_id, 'type': 'reset', 'data': {}})
+        for event in replay:
+            yield format_event(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            if event is None:
+                yield format_event({'id': broker.last_id, 'type': 'reset', 'data': {}})
+                return
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
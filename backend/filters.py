@@ -0,0 +1,47 @@
+from rest_framework import serializers
+from .models import Equipment
+from .trees import subtree_filter
+
+class QueryParamFilterMixin:
+    """
+    Narrows list querysets from whitelisted query parameters.
+
+    ``filter_params`` maps a query parameter to an ORM lookup and the DRF
+    field used to parse it, so malformed values come back as a 400 instead
+    of reaching the database.
+
+    Views that set ``subtree_path`` (the relation from their model to
+    Equipment) also accept ``?subtree=<equipment id>``, which keeps the rows
+    attached to that node or any of its descendants.
+    """
+    filter_params = {}
+    subtree_path = None
+
+    def subtree_lookups(self, node):
+        return subtree_filter(node, self.subtree_path)
+
+    def get_query_filters(self):
+        filters = {}
+        errors = {}
+        for param, (lookup, field) in self.filter_params.items():
+            value = self.request.query_params.get(param)
+            if value in (None, ''):
+                continue
+            try:
+                filters[lookup] = field.run_validation(value)
+            except serializers.ValidationError as exc:
+                errors[param] = exc.detail
+        subtree = self.request.query_params.get('subtree')
+        if self.subtree_path is not None and subtree not in (None, ''):
+            field = serializers.PrimaryKeyRelatedField(queryset=Equipment.objects.only('tree_id', 'lft', 'rght'))
+            try:
+                filters.update(self.subtree_lookups(field.run_validation(subtree)))
+            except serializers.ValidationError as exc:
+                errors['subtree'] = exc.detail
+        if errors:
+            raise serializers.ValidationError(errors)
+        return filters
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return queryset.filter(**self.get_query_filters())
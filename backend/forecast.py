@@ -0,0 +1,202 @@
+"""
+Preventive-maintenance forecast.
+
+Every task is expanded into its future occurrences with the NumPy
+recurrence engine, without writing Schedule rows, and the occurrences are
+counted per week and per priority, task type or equipment subtree.
+
+Work is partitioned by ``Equipment.tree_id``: on large installations each
+process of a pool reads and expands whole trees on its own, and only the
+small per-partition histograms travel back to be summed. Results are cached
+under the task version counter (and the equipment one when trees matter),
+so they are recomputed only after a change.
+"""
+import datetime
+import os
+from multiprocessing import get_context
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.models import Count
+from django.utils import timezone
+from .caching import versioned_key
+from .models import Equipment, Task, PRIORITY_CHOICES, TASK_TYPE_CHOICES
+from .recurrence import fast_forward, occurrences_until
+from .utils import chunks
+
+DEFAULT_WEEKS = 52
+MAX_WEEKS = 104
+DEFAULT_GROUPS = 20  # Subtrees listed by name; the rest are summed as "other"
+GROUPINGS = ['priority', 'task_type', 'subtree']
+CHUNK_SIZE = 5000  # Tasks expanded at once, which bounds the occurrence arrays
+PARALLEL_THRESHOLD = 20000  # Below this many tasks a pool costs more than it saves
+FORECAST_TIMEOUT = 3600  # Seconds; task writes invalidate sooner
+OTHER = 'other'
+
+def _bucket_of(lfts, node):
+    """The child of ``node`` whose subtree holds each ``lft``, or ``node`` itself."""
+    children = node['children']
+    if not children:
+        return np.full(len(lfts), node['pk'])
+    pks, child_lfts, child_rghts = map(np.asarray, zip(*children))
+    index = np.searchsorted(child_lfts, lfts, side='right') - 1
+    inside = (index >= 0) & (lfts <= child_rghts[np.maximum(index, 0)])
+    return np.where(inside, pks[np.maximum(index, 0)], node['pk'])
+
+def forecast_partition(tree_ids, window_start, weeks, group_by, node=None):
+    """
+    Weekly occurrence counts for the tasks on ``tree_ids`` (every tree when
+    ``None``), keyed by bucket. ``node`` narrows the tasks to one subtree and
+    makes its children the buckets of a ``'subtree'`` breakdown.
+    """
+    start = np.datetime64(window_start, 'D')
+    end = start + np.timedelta64(weeks * 7 - 1, 'D')
+    tasks = Task.objects.all()
+    if tree_ids is not None:
+        tasks = tasks.filter(equipment__tree_id__in=tree_ids)
+    if node is not None:
+        tasks = tasks.filter(
+            equipment__tree_id=node['tree_id'], equipment__lft__gte=node['lft'], equipment__lft__lte=node['rght']
+        )
+    if group_by != 'subtree':
+        key_field = group_by
+    else:
+        key_field = 'equipment__tree_id' if node is None else 'equipment__lft'
+    rows = tasks.order_by().values_list('frequency', 'start_date', key_field).iterator(chunk_size=CHUNK_SIZE)
+
+    counts = {}
+    for chunk in chunks(rows, CHUNK_SIZE):
+        frequencies, start_dates, keys = zip(*chunk)
+        frequencies = np.asarray(frequencies, dtype=object)
+        first_dates = fast_forward(start_dates, frequencies, start)
+        task_rows, dates = occurrences_until(first_dates, frequencies, end)
+        upcoming = dates >= start  # Drops one-time tasks dated before the window
+        task_rows = task_rows[upcoming]
+        week = (dates[upcoming] - start).astype(np.int64) // 7
+        keys = np.asarray(keys, dtype=object)
+        if group_by == 'subtree' and node is not None:
+            keys = _bucket_of(keys.astype(np.int64), node)
+        codes, bucket = np.unique(keys[task_rows], return_inverse=True)
+        histogram = np.bincount(bucket * weeks + week, minlength=len(codes) * weeks).reshape(len(codes), weeks)
+        for code, row in zip(codes.tolist(), histogram):
+            counts[code] = counts[code] + row if code in counts else row
+    return counts
+
+def _call_partition(args):
+    return forecast_partition(*args)
+
+def _unpool_connections():
+    # Pooled sockets forked from the parent are still the parent's; each
+    # worker opens plain connections of its own
+    for alias in connections:
+        connections[alias].settings_dict.get('OPTIONS', {}).pop('pool', None)
+
+def _partition_trees(tree_sizes, workers):
+    """Spread ``(tree_id, task_count)`` pairs over ``workers`` bins, largest tree first."""
+    bins = [[] for _ in range(workers)]
+    loads = [0] * workers
+    for tree_id, size in sorted(tree_sizes, key=lambda item: -item[1]):
+        emptiest = loads.index(min(loads))
+        bins[emptiest].append(tree_id)
+        loads[emptiest] += size
+    return [tree_ids for tree_ids in bins if tree_ids]
+
+def _worker_count(task_count, workers):
+    if workers is None:
+        workers = getattr(settings, 'CMMS_FORECAST_WORKERS', None) or os.cpu_count() or 1
+    # Test databases live in memory where other processes cannot see them
+    if task_count < PARALLEL_THRESHOLD or connection.vendor == 'sqlite':
+        return 1
+    return workers
+
+def _subtree_node(subtree):
+    children = subtree.get_children().order_by('lft').values_list('pk', 'lft', 'rght')
+    return {
+        'pk': subtree.pk, 'tree_id': subtree.tree_id, 'lft': subtree.lft, 'rght': subtree.rght,
+        'children': list(children),
+    }
+
+def _labels(group_by, keys, node):
+    if group_by == 'priority':
+        return dict(PRIORITY_CHOICES)
+    if group_by == 'task_type':
+        return dict(TASK_TYPE_CHOICES)
+    if node is None:
+        return dict(Equipment.objects.filter(parent__isnull=True, tree_id__in=keys).values_list('tree_id', 'name'))
+    return dict(Equipment.objects.filter(pk__in=keys).values_list('pk', 'name'))
+
+def build_forecast(start=None, weeks=DEFAULT_WEEKS, group_by='priority', subtree=None, limit=DEFAULT_GROUPS, workers=None):
+    """
+    Occurrences per week from the Monday on or before ``start`` (today).
+
+    Every bucket of a priority or task type breakdown is listed; a subtree
+    breakdown names the ``limit`` busiest trees (or children of
+    ``subtree``) and sums the rest into ``"other"``.
+    """
+    start = start or timezone.now().date()
+    window_start = start - datetime.timedelta(days=start.weekday())
+    node = _subtree_node(subtree) if subtree is not None else None
+
+    tasks = Task.objects.all()
+    if node is not None:
+        tasks = tasks.filter(equipment__tree_id=node['tree_id'])
+    tree_sizes = list(tasks.values_list('equipment__tree_id').annotate(count=Count('id')).order_by())
+    workers = _worker_count(sum(size for _, size in tree_sizes), workers)
+    if workers > 1 and len(tree_sizes) > 1:
+        jobs = [
+            (tree_ids, window_start, weeks, group_by, node)
+            for tree_ids in _partition_trees(tree_sizes, workers)
+        ]
+        # Forked children must open their own connections
+        connections.close_all()
+        with get_context().Pool(len(jobs), initializer=_unpool_connections) as pool:
+            partials = pool.map(_call_partition, jobs)
+    else:
+        partials = [forecast_partition(None, window_start, weeks, group_by, node)]
+
+    counts = {}
+    for partial in partials:
+        for key, row in partial.items():
+            counts[key] = counts[key] + row if key in counts else row
+    if group_by == 'priority':
+        keys = [code for code, _ in PRIORITY_CHOICES if code in counts]
+    elif group_by == 'task_type':
+        keys = [code for code, _ in TASK_TYPE_CHOICES if code in counts]
+    else:
+        keys = sorted(counts, key=lambda key: (-int(counts[key].sum()), key))
+    if len(keys) > limit and group_by == 'subtree':
+        other = sum(counts[key] for key in keys[limit:])
+        keys = keys[:limit]
+        counts[OTHER] = other
+    labels = _labels(group_by, keys, node)
+    if OTHER in counts:
+        keys.append(OTHER)
+        labels[OTHER] = 'Other'
+
+    total = sum(counts.values(), np.zeros(weeks, dtype=np.int64))
+    return {
+        'start': window_start.isoformat(),
+        'week_starts': [(window_start + datetime.timedelta(weeks=week)).isoformat() for week in range(weeks)],
+        'group_by': group_by,
+        'buckets': [
+            {'key': key, 'label': labels.get(key), 'total': int(counts[key].sum()), 'counts': counts[key].tolist()}
+            for key in keys
+        ],
+        'total': total.tolist(),
+        'generated_at': timezone.now().isoformat(),
+    }
+
+def get_forecast(start=None, weeks=DEFAULT_WEEKS, group_by='priority', subtree=None, limit=DEFAULT_GROUPS):
+    """Cached ``build_forecast``; task writes, and tree changes for subtrees, invalidate it."""
+    start = start or timezone.now().date()
+    resources = ['task', 'equipment'] if group_by == 'subtree' or subtree is not None else ['task']
+    key = versioned_key(
+        'forecast', resources,
+        start - datetime.timedelta(days=start.weekday()), weeks, group_by, subtree.pk if subtree else None, limit
+    )
+    forecast = cache.get(key)
+    if forecast is None:
+        forecast = build_forecast(start, weeks, group_by, subtree, limit)
+        cache.set(key, forecast, FORECAST_TIMEOUT)
+    return forecast
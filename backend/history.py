@@ -0,0 +1,101 @@
+"""
+Append-only schedule history.
+
+Every change is written with one ``bulk_create`` however many schedules
+it touches, and events are never updated afterwards. The aggregates read
+completion events back with grouped SQL.
+"""
+import datetime
+from django.db.models import Avg, Count, DateField, F, Max, Min, Q, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, TruncDate
+from django.utils import timezone
+from .events import publish_on_commit
+from .models import ScheduleEvent
+from .trees import subtree_filter
+
+DEFAULT_STATS_LIMIT = 20
+
+def actor_of(request):
+    user = getattr(request, 'user', None)
+    return user if user is not None and user.is_authenticated else None
+
+def record_events(schedule_ids, kind, actor=None, **values):
+    """Append one ``kind`` event per schedule, all stamped with the same time."""
+    now = timezone.now()
+    ScheduleEvent.objects.bulk_create([
+        ScheduleEvent(schedule_id=pk, kind=kind, actor=actor, created_at=now, **values)
+        for pk in schedule_ids
+    ])
+
+def record_reassignment(task, previous, actor=None):
+    """Log a task's new assignee on each of its pending schedules and announce it to live clients."""
+    pending = task.schedules.filter(status='pending').values_list('pk', flat=True)
+    record_events(
+        pending, 'reassigned', actor,
+        from_value=previous.username if previous else '',
+        to_value=task.assigned_to.username if task.assigned_to else '',
+    )
+    publish_on_commit('task.assigned', {
+        'task': task.pk, 'assigned_to': task.assigned_to_id, 'previous': previous.pk if previous else None,
+    })
+
+def _days(duration):
+    return round(duration / datetime.timedelta(days=1), 2) if duration is not None else None
+
+def completion_stats(start=None, end=None, subtree=None, limit=DEFAULT_STATS_LIMIT):
+    """
+    Completion latency and mean time between completions from the event log.
+
+    Both measure the completion date recorded on each event (its
+    ``to_value``), not when the event was written, so backdated work counts
+    on the day it was done. Latency runs from a schedule's due date to that
+    day, so negative values mean early work. Completed work orders are the
+    only service events the system records, so ``mtbf_days`` is the mean gap
+    between consecutive completions on the same equipment: for n
+    completions that is (last - first) / (n - 1), which grouped MIN, MAX and
+    COUNT give without a window scan. ``equipment`` lists the ``limit``
+    assets serviced most often.
+    """
+    events = ScheduleEvent.objects.filter(kind='completed').annotate(
+        completed_on=Coalesce(Cast(NullIf('to_value', Value('')), DateField()), TruncDate('created_at')),
+    )
+    if start:
+        events = events.filter(completed_on__gte=start)
+    if end:
+        events = events.filter(completed_on__lte=end)
+    if subtree is not None:
+        events = events.filter(**subtree_filter(subtree, 'schedule__task__equipment'))
+
+    totals = events.aggregate(
+        completions=Count('id'),
+        late=Count('id', filter=Q(completed_on__gt=F('schedule__due_date'))),
+        mean_latency=Avg(F('completed_on') - F('schedule__due_date')),
+    )
+
+    per_equipment = (
+        events.values('schedule__task__equipment', 'schedule__task__equipment__name')
+        .annotate(completions=Count('id'), first=Min('completed_on'), last=Max('completed_on'))
+        .filter(completions__gt=1)
+        .order_by('-completions', 'schedule__task__equipment')
+    )
+    span = datetime.timedelta()
+    gaps = 0
+    equipment = []
+    for row in per_equipment.iterator():
+        span += row['last'] - row['first']
+        gaps += row['completions'] - 1
+        if len(equipment) < limit:
+            equipment.append({
+                'equipment': row['schedule__task__equipment'],
+                'name': row['schedule__task__equipment__name'],
+                'completions': row['completions'],
+                'mtbf_days': _days((row['last'] - row['first']) / (row['completions'] - 1)),
+            })
+
+    return {
+        'completions': totals['completions'],
+        'late_completions': totals['late'],
+        'mean_latency_days': _days(totals['mean_latency']),
+        'mtbf_days': _days(span / gaps) if gaps else None,
+        'equipment': equipment,
+    }
@@ -0,0 +1,74 @@
+"""
+Compact id/name lists for dropdowns and autocomplete.
+
+Rows are read with ``values_list`` so no model instances are built. An
+optional ``q`` is matched as a case-insensitive prefix, which PostgreSQL
+answers for vendors and equipment from the ``UPPER(...) text_pattern_ops``
+indexes created in migration 0010. The user table belongs to
+django.contrib.auth and is small, so user lookups scan it.
+
+Dropdowns search as the user types rather than loading every row, so
+``limit`` stays small.
+"""
+from django.contrib.auth.models import User
+from django.db.models import Q
+from .models import Equipment, Vendor
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+PATH_SEPARATOR = ' / '
+
+def _search(queryset, field, q, limit):
+    if q:
+        queryset = queryset.filter(**{f'{field}__istartswith': q})
+    return queryset.order_by(field, 'id')[:limit]
+
+def vendor_lookup(q='', limit=DEFAULT_LIMIT):
+    rows = _search(Vendor.objects.filter(is_active=True), 'name', q, limit).values_list('id', 'name')
+    return [{'id': pk, 'name': name} for pk, name in rows]
+
+def user_lookup(q='', limit=DEFAULT_LIMIT):
+    rows = _search(User.objects.filter(is_active=True), 'username', q, limit).values_list('id', 'username')
+    return [{'id': pk, 'name': username} for pk, username in rows]
+
+def _equipment_matches(q, limit):
+    return _search(Equipment.objects.filter(is_active=True), 'name', q, limit).values_list(
+        'id', 'name', 'tree_id', 'lft', 'rght'
+    )
+
+def _ancestors(rows):
+    """Bounds and names of the nodes whose ``lft``/``rght`` bounds enclose any of ``rows``, or None if all are roots."""
+    enclosing = Q()
+    for _, _, tree_id, lft, rght in rows:
+        if lft > 1:  # Roots start at 1 and have no ancestors
+            enclosing |= Q(tree_id=tree_id, lft__lt=lft, rght__gt=rght)
+    if not enclosing:
+        return None
+    return Equipment.objects.filter(enclosing).order_by('tree_id', 'lft').values_list('tree_id', 'lft', 'rght', 'name')
+
+def _with_paths(rows, ancestors):
+    trees = {}
+    for tree_id, lft, rght, name in ancestors:
+        trees.setdefault(tree_id, []).append((lft, rght, name))
+    results = []
+    for pk, name, tree_id, lft, rght in rows:
+        path = [n for l, r, n in trees.get(tree_id, ()) if l < lft and r > rght]
+        results.append({'id': pk, 'name': name, 'path': PATH_SEPARATOR.join([*path, name])})
+    return results
+
+def equipment_lookup(q='', limit=DEFAULT_LIMIT):
+    """
+    Matching equipment with the names of its ancestors joined into ``path``.
+
+    Ancestors of every match are read in one more query: they are the nodes
+    of the same tree whose ``lft``/``rght`` bounds enclose the match.
+    """
+    rows = list(_equipment_matches(q, limit))
+    ancestors = _ancestors(rows)
+    return _with_paths(rows, ancestors if ancestors is not None else ())
+
+async def aequipment_lookup(q='', limit=DEFAULT_LIMIT):
+    """``equipment_lookup`` on the async ORM, for async views."""
+    rows = [row async for row in _equipment_matches(q, limit)]
+    ancestors = _ancestors(rows)
+    return _with_paths(rows, [row async for row in ancestors] if ancestors is not None else ())
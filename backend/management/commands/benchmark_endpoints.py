@@ -0,0 +1,53 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from cmms.benchmarks import CASES, DATASETS, run_benchmarks
+
+class Command(BaseCommand):
+    help = 'Benchmarks every API route against seeded datasets in a throwaway test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', action='append', choices=list(DATASETS), dest='datasets',
+                            help='Dataset to run (repeatable; default: small and medium)')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per case')
+        parser.add_argument('--case', action='append', dest='cases', help='Only run cases with this name (repeatable)')
+        parser.add_argument('--report', help='Write the JSON report to this file')
+        parser.add_argument('--skip-latency', action='store_true', help='Enforce query and memory budgets only')
+
+    def handle(self, *args, **options):
+        datasets = options['datasets'] or ['small', 'medium']
+        cases = [case for case in CASES if not options['cases'] or case.name in options['cases']]
+        if not cases:
+            raise CommandError('No benchmark case matches --case')
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            report, violations = run_benchmarks(
+                datasets, options['iterations'], cases,
+                latency_budgets=not options['skip_latency'], progress=self.write_result
+            )
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        if options['report']:
+            with open(options['report'], 'w') as stream:
+                json.dump(report, stream, indent=2)
+            self.stdout.write(f"Report written to {options['report']}")
+        if report['uncovered_routes'] and not options['cases']:
+            violations.append(f"Routes without a benchmark case: {', '.join(report['uncovered_routes'])}")
+        if violations:
+            for violation in violations:
+                self.stderr.write(violation)
+            raise CommandError(f'{len(violations)} budget violations')
+        self.stdout.write(self.style.SUCCESS(f'All {len(cases)} cases within budget'))
+
+    def write_result(self, result):
+        self.stdout.write(
+            f"{result['dataset']:<7} {result['method']:<6} {result['case']:<20} "
+            f"p50 {result['p50_ms']:>8.1f}ms  p95 {result['p95_ms']:>8.1f}ms  "
+            f"{result['queries']:>3} queries  {result['peak_kb']:>9.1f} KiB"
+        )
@@ -0,0 +1,38 @@
+import datetime
+import random
+import time
+from django.core.management.base import BaseCommand
+from cmms.models import Task, FREQUENCY_CHOICES
+from cmms.recurrence import next_due_dates
+
+class Command(BaseCommand):
+    help = 'Compares the scalar and NumPy recurrence calculators on synthetic tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=50000, help='Number of synthetic tasks')
+        parser.add_argument('--steps', type=int, default=52, help='Occurrences computed per task')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        codes = [code for code, _ in FREQUENCY_CHOICES]
+        starts = [datetime.date(2020, 1, 1) + datetime.timedelta(days=rng.randrange(2000)) for _ in range(options['tasks'])]
+        frequencies = [rng.choice(codes) for _ in starts]
+        steps = options['steps']
+
+        began = time.perf_counter()
+        tasks = [Task(frequency=frequency) for frequency in frequencies]
+        for task, current in zip(tasks, starts):
+            for _ in range(steps):
+                current = task.calculate_next_due_date(current)
+        scalar = time.perf_counter() - began
+
+        began = time.perf_counter()
+        next_due_dates(starts, frequencies, steps)
+        vectorized = time.perf_counter() - began
+
+        total = options['tasks'] * steps
+        self.stdout.write(f'{total} date steps')
+        self.stdout.write(f'scalar:     {scalar:.3f}s ({total / scalar:,.0f} steps/s)')
+        self.stdout.write(f'vectorized: {vectorized:.3f}s ({total / vectorized:,.0f} steps/s)')
+        self.stdout.write(self.style.SUCCESS(f'speedup: {scalar / vectorized:.1f}x'))
@@ -0,0 +1,42 @@
+import json
+from django.core.management.base import BaseCommand
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from cmms.benchmarks import DATASETS, run_throughput
+
+class Command(BaseCommand):
+    help = 'Compares WSGI read endpoints with their async twins under ASGI, under concurrent load'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', action='append', choices=list(DATASETS), dest='datasets',
+                            help='Dataset to run (repeatable; default: small)')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per route and handler')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight at once')
+        parser.add_argument('--cached', action='store_true', help='Serve repeats from the response cache')
+        parser.add_argument('--report', help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            report = run_throughput(
+                options['datasets'] or ['small'], options['requests'], options['concurrency'],
+                cached=options['cached'], progress=self.write_result
+            )
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        if options['report']:
+            with open(options['report'], 'w') as stream:
+                json.dump(report, stream, indent=2)
+            self.stdout.write(f"Report written to {options['report']}")
+
+    def write_result(self, result):
+        wsgi, asgi = result['wsgi'], result['asgi']
+        self.stdout.write(
+            f"{result['dataset']:<7} {result['route']:<17} "
+            f"wsgi {wsgi['requests_per_s']:>8.1f} req/s  p95 {wsgi['p95_ms']:>8.1f}ms  "
+            f"asgi {asgi['requests_per_s']:>8.1f} req/s  p95 {asgi['p95_ms']:>8.1f}ms  x{result['speedup']:.2f}"
+        )
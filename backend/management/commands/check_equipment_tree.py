@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from cmms.caching import invalidate_after_bulk
+from cmms.models import Equipment
+from cmms.trees import check_tree_consistency
+
+class Command(BaseCommand):
+    help = 'Checks the equipment MPTT columns against parent links, optionally rebuilding them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Rebuild the tree if problems are found')
+        parser.add_argument('--limit', type=int, default=50, help='Maximum number of problems to print')
+
+    def handle(self, *args, **options):
+        problems = check_tree_consistency()
+        if not problems:
+            self.stdout.write(self.style.SUCCESS('Equipment tree is consistent'))
+            return
+
+        for pk, problem in problems[:options['limit']]:
+            self.stdout.write(f"Equipment {pk}: {problem}")
+        if len(problems) > options['limit']:
+            self.stdout.write(f"... and {len(problems) - options['limit']} more")
+
+        if not options['rebuild']:
+            raise CommandError(f"Found {len(problems)} tree problems; rerun with --rebuild to fix them")
+        Equipment.objects.rebuild()
+        invalidate_after_bulk('equipment')
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt equipment tree after {len(problems)} problems"))
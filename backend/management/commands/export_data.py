@@ -0,0 +1,25 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from cmms.transfer import DEFAULT_BATCH_SIZE, EXPORT_COLUMNS, FORMATS, export_rows, guess_format, render_rows
+
+class Command(BaseCommand):
+    help = 'Streams vendors, equipment or parts to a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=list(EXPORT_COLUMNS))
+        parser.add_argument('--output', '-o', help='File to write (default: stdout)')
+        parser.add_argument('--type', choices=list(FORMATS), help='File format (default: from the extension, else csv)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows fetched per query')
+
+    def handle(self, *args, **options):
+        file_format = FORMATS.get(options['type']) or guess_format(options['output'] or '') or 'csv'
+        rows = export_rows(options['resource'], chunk_size=options['chunk_size'])
+        if not options['output']:
+            sys.stdout.writelines(render_rows(options['resource'], file_format, rows))
+            return
+        try:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as stream:
+                stream.writelines(render_rows(options['resource'], file_format, rows))
+        except OSError as exc:
+            raise CommandError(exc)
+        self.stdout.write(self.style.SUCCESS(f"Exported {options['resource']} to {options['output']}"))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from cmms.transfer import DEFAULT_BATCH_SIZE, FORMATS, IMPORTERS, ImportFailed, guess_format, import_rows
+
+class Command(BaseCommand):
+    help = 'Bulk imports vendors, equipment or parts from a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=list(IMPORTERS))
+        parser.add_argument('path', help='File to import')
+        parser.add_argument('--type', choices=list(FORMATS), help='File format (default: from the extension)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows validated and inserted per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the file without saving anything')
+
+    def handle(self, *args, **options):
+        file_format = FORMATS.get(options['type']) or guess_format(options['path'])
+        if file_format is None:
+            raise CommandError('Cannot tell the file format; pass --type')
+
+        start = timezone.now()
+        with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+            try:
+                created = import_rows(
+                    options['resource'], stream, file_format,
+                    batch_size=options['batch_size'], dry_run=options['dry_run']
+                )
+            except ImportFailed as exc:
+                for error in exc.errors:
+                    self.stderr.write(f"Line {error['line']}: {error['errors']}")
+                raise CommandError(f'{exc}; nothing was imported')
+        elapsed = (timezone.now() - start).total_seconds()
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {created} {options['resource']} in {elapsed:.1f}s"))
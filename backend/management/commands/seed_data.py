@@ -1,110 +1,59 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 from django.utils import timezone
 from cmms.models import Vendor, Equipment, Part, Task, Schedule
-import random
-from faker import Faker
-
-fake = Faker()
+from cmms.seeding import (
+    DEFAULT_CHUNK_SIZE, clear_data, finish_seeding,
+    seed_vendors, seed_equipment, seed_parts, seed_tasks, seed_schedules
+)
 
 class Command(BaseCommand):
-    help = 'Seeds the database with sample data'
-
-    def handle(self, *args, **kwargs):
-        # Clear existing data
-        Schedule.objects.all().delete()
-        Task.objects.all().delete()
-        Part.objects.all().delete()
-        Equipment.objects.all().delete()
-        Vendor.objects.all().delete()
-
-        # Seed Vendors (10)
-        vendors = []
-        for _ in range(10):
-            vendor = Vendor(
-                name=fake.company(),
-                contact_info=fake.email(),
-                address=fake.address(),
-                is_active=True
-            )
-            vendor.save()
-            vendors.append(vendor)
-        self.stdout.write(self.style.SUCCESS('Created 10 Vendors'))
-
-        # Seed Equipment (10, with nesting)
-        equipment_list = []
-        # 5 top-level equipment
-        for i in range(5):
-            equip = Equipment(
-                name=f"Equipment {i+1}",
-                model=f"Model-X{i+1}",
-                serial=f"SN{i+1:03d}",
-                description=fake.sentence(),
-                location_status=random.choice(['in-house', 'off-site']),
-                manufacturer=random.choice(vendors),
-                is_active=True
-            )
-            equip.save()
-            equipment_list.append(equip)
-
-        # 5 nested equipment (children of top-level)
-        for i in range(5):
-            parent = random.choice(equipment_list[:5])  # Pick from top-level
-            child = Equipment(
-                name=f"Sub-Equipment {i+1}",
-                model=f"Model-Y{i+1}",
-                serial=f"SN{i+6:03d}",
-                description=fake.sentence(),
-                parent=parent,
-                location_status=random.choice(['in-house', 'off-site']),
-                manufacturer=random.choice(vendors),
-                is_active=True
-            )
-            child.save()
-            equipment_list.append(child)
-        self.stdout.write(self.style.SUCCESS('Created 10 Equipment (5 top-level, 5 nested)'))
-
-        # Seed Parts (10, connected to equipment)
-        parts = []
-        for i in range(10):
-            part = Part(
-                part_number=f"P{i+1:03d}",
-                part_name=f"Part {i+1}",
-                description=fake.sentence(),
-                status=random.choice(['available', 'in-stock', 'on-order']),
-                last_updated=timezone.now(),
-                is_active=True,
-                vendor=random.choice(vendors)
-            )
-            part.save()
-            # Connect to 1-3 random equipment (fixed syntax)
-            connected_equipment = random.sample(equipment_list, k=random.randint(1, 3))
-            part.equipment.set(connected_equipment)
-            parts.append(part)
-        self.stdout.write(self.style.SUCCESS('Created 10 Parts with Equipment connections'))
-
-        # Seed Tasks (10, tied to equipment)
-        tasks = []
-        for i in range(10):
-            task = Task(
-                description=f"Task {i+1}: {fake.sentence(nb_words=5)}",
-                frequency=random.choice(['daily', 'weekly', 'monthly', 'yearly', None]),
-                equipment=random.choice(equipment_list),
-                start_date=timezone.now().date(),
-                task_type=random.choice(['maintenance', 'calibration']),
-                priority=random.choice(['low', 'medium', 'high'])
-            )
-            task.save()
-            tasks.append(task)
-        self.stdout.write(self.style.SUCCESS('Created 10 Tasks'))
-
-        # Seed Schedules (10, linked to tasks)
-        for i, task in enumerate(tasks):
-            Schedule.objects.create(
-                task=task,
-                due_date=timezone.now().date() + timezone.timedelta(days=random.randint(1, 30)),
-                status='pending',
-                history_log=f"Schedule {i+1} created"
-            )
-        self.stdout.write(self.style.SUCCESS('Created 10 Schedules'))
-
-        self.stdout.write(self.style.SUCCESS('Database seeded successfully with 10 of each!'))
\ No newline at end of file
+    help = 'Seeds the database with sample data, from a handful of rows up to load-testing volumes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=10, help='Number of vendors')
+        parser.add_argument('--equipment', type=int, default=10, help='Number of equipment')
+        parser.add_argument('--depth', type=int, default=2, help='Levels per equipment tree, roots included')
+        parser.add_argument('--fan-out', type=int, default=1, help='Children per equipment node')
+        parser.add_argument('--parts', type=int, default=10, help='Number of parts')
+        parser.add_argument('--tasks', type=int, default=10, help='Number of tasks')
+        parser.add_argument('--schedules', type=int, default=10, help='Number of schedules')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows per bulk insert')
+        parser.add_argument('--workers', type=int, default=1, help='Processes for parts, tasks and schedules')
+
+    def handle(self, *args, **options):
+        if options['tasks'] and not options['equipment']:
+            raise CommandError('Tasks need equipment; pass --equipment')
+        if options['workers'] > 1 and connection.vendor == 'sqlite':
+            raise CommandError('SQLite allows a single writer; use --workers 1')
+
+        seed = options['seed']
+        chunk_size = options['chunk_size']
+        workers = options['workers']
+        start = timezone.now()
+        clear_data()
+        self.stdout.write(self.style.SUCCESS('Cleared existing data'))
+
+        steps = [
+            ('vendors', Vendor, lambda: seed_vendors(options['vendors'], seed, chunk_size)),
+            ('equipment', Equipment, lambda: seed_equipment(options['equipment'], options['depth'], options['fan_out'], seed, chunk_size)),
+            ('parts', Part, lambda: seed_parts(options['parts'], seed, chunk_size, workers)),
+            ('tasks', Task, lambda: seed_tasks(options['tasks'], seed, chunk_size, workers)),
+            ('schedules', Schedule, lambda: seed_schedules(options['schedules'], seed, chunk_size, workers)),
+        ]
+        for label, model, step in steps:
+            step_start = timezone.now()
+            if workers > 1:
+                step()
+            else:
+                with transaction.atomic():
+                    step()
+            elapsed = (timezone.now() - step_start).total_seconds()
+            self.stdout.write(self.style.SUCCESS(
+                f'Created {model.objects.count()} {label} in {elapsed:.1f}s'
+            ))
+        finish_seeding()
+
+        elapsed = (timezone.now() - start).total_seconds()
+        self.stdout.write(self.style.SUCCESS(f'Database seeded successfully in {elapsed:.1f}s'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from cmms.reminders import RunInProgress, get_backend, send_reminders
+
+class Command(BaseCommand):
+    help = 'Sends each assignee one digest of their due soon and overdue schedules they have not been reminded of'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lead-days', type=int, help='Remind this many days before the due date')
+        parser.add_argument('--overdue-days', type=int, help='Keep reminding of schedules overdue by up to this many days')
+        parser.add_argument('--concurrency', type=int, help='Digests sent at the same time')
+        parser.add_argument('--backend', help='Dotted path of the reminder backend class')
+
+    def handle(self, *args, **options):
+        try:
+            result = send_reminders(
+                lead_days=options['lead_days'],
+                overdue_days=options['overdue_days'],
+                concurrency=options['concurrency'],
+                backend=get_backend(options['backend']),
+            )
+        except RunInProgress:
+            self.stdout.write('Another reminder run is in progress; nothing sent')
+            return
+        message = f"Sent {result['reminders']} reminders in {result['digests']} digests"
+        if result['failed']:
+            raise CommandError(f"{message}; {result['failed']} digests failed and will be retried")
+        self.stdout.write(self.style.SUCCESS(message))
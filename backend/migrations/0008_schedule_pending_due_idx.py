@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmms', '0007_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['due_date'], name='schedule_pending_due_idx'),
+        ),
+    ]
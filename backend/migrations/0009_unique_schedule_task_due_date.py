@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:36
+
+from django.db import migrations, models
+
+
+def remove_duplicate_schedules(apps, schema_editor):
+    """Keep one schedule per (task, due_date), preferring a completed one."""
+    Schedule = apps.get_model('cmms', 'Schedule')
+    duplicates = (
+        Schedule.objects.values('task_id', 'due_date')
+        .annotate(count=models.Count('id'))
+        .filter(count__gt=1)
+    )
+    for row in duplicates.iterator():
+        rows = Schedule.objects.filter(task_id=row['task_id'], due_date=row['due_date'])
+        keep = rows.order_by('status', 'id').values_list('id', flat=True)[0]  # 'completed' sorts first
+        rows.exclude(id=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmms', '0008_schedule_pending_due_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_schedules, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=models.UniqueConstraint(fields=('task', 'due_date'), name='unique_schedule_task_due_date'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:07
+
+from django.db import migrations, models
+
+# Case-insensitive prefix search (``istartswith``) compiles to
+# UPPER(column::text) LIKE 'PREFIX%', which only a pattern-ops index on the
+# same expression can serve in PostgreSQL. Other backends skip them.
+PREFIX_INDEXES = [
+    ('cmms', 'Vendor', 'name', 'vendor_name_prefix_idx'),
+    ('cmms', 'Equipment', 'name', 'equipment_name_prefix_idx'),
+]
+
+
+def create_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    quote = schema_editor.quote_name
+    for app_label, model_name, field, index_name in PREFIX_INDEXES:
+        table = apps.get_model(app_label, model_name)._meta.db_table
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {quote(index_name)} '
+            f'ON {quote(table)} (UPPER({quote(field)}::text) text_pattern_ops)'
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _, _, _, index_name in PREFIX_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(index_name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmms', '0009_unique_schedule_task_due_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['name', 'id'], name='equipment_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['tree_id', 'lft'], name='equipment_tree_lft_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(fields=['name', 'id'], name='vendor_name_idx'),
+        ),
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_history_logs(apps, schema_editor):
+    """Keep each existing history_log as a note event dated by the schedule's last change."""
+    Schedule = apps.get_model('cmms', 'Schedule')
+    ScheduleEvent = apps.get_model('cmms', 'ScheduleEvent')
+    logs = Schedule.objects.exclude(history_log='').values_list('pk', 'history_log', 'updated_at')
+    batch = []
+    for pk, history_log, updated_at in logs.iterator(chunk_size=1000):
+        batch.append(ScheduleEvent(schedule_id=pk, kind='note', note=history_log, created_at=updated_at))
+        if len(batch) >= 1000:
+            ScheduleEvent.objects.bulk_create(batch)
+            batch = []
+    ScheduleEvent.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmms', '0011_sync_tracking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('status', 'Status Change'), ('reassigned', 'Reassigned'), ('completed', 'Completed'), ('note', 'Note')], max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('from_value', models.CharField(blank=True, max_length=255)),
+                ('to_value', models.CharField(blank=True, max_length=255)),
+                ('note', models.TextField(blank=True)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='schedule_events', to=settings.AUTH_USER_MODEL)),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='cmms.schedule')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['schedule', 'created_at', 'id'], name='schedule_event_idx'), models.Index(fields=['kind', 'created_at'], name='schedule_event_kind_idx')],
+            },
+        ),
+        migrations.RunPython(copy_history_logs, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='schedule',
+            name='history_log',
+        ),
+    ]
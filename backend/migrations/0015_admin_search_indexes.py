@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmms', '0014_reminder_log'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='equipment',
+            name='serial',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='part',
+            name='part_name',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='part',
+            name='part_number',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:10
+
+from django.db import migrations
+
+# The schedule admin searches task descriptions by prefix (``istartswith``);
+# see 0010 for why this takes a pattern-ops index on UPPER(column).
+INDEX_NAME = 'task_description_prefix_idx'
+
+
+def create_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    quote = schema_editor.quote_name
+    table = apps.get_model('cmms', 'Task')._meta.db_table
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {quote(INDEX_NAME)} '
+        f'ON {quote(table)} (UPPER({quote("description")}::text) text_pattern_ops)'
+    )
+
+
+def drop_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(INDEX_NAME)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmms', '0015_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
\ No newline at end of file
@@ -33,11 +33,30 @@ SCHEDULE_STATUS_CHOICES = [
     ('completed', 'Completed'),
 ]
 
+SCHEDULE_EVENT_CHOICES = [
+    ('status', 'Status Change'),
+    ('reassigned', 'Reassigned'),
+    ('completed', 'Completed'),
+    ('note', 'Note'),
+]
+
+REMINDER_KIND_CHOICES = [
+    ('due', 'Due Soon'),
+    ('overdue', 'Overdue'),
+]
+
 class Vendor(models.Model):
     name = models.CharField(max_length=255)
     contact_info = models.TextField(blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'id'], name='vendor_name_idx'),
+            models.Index(fields=['updated_at', 'id'], name='vendor_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -45,7 +64,7 @@ class Vendor(models.Model):
 class Equipment(MPTTModel):
     name = models.CharField(max_length=255)
     model = models.CharField(max_length=255)
-    serial = models.CharField(max_length=255)
+    serial = models.CharField(max_length=255, db_index=True)  # Admin search
     description = models.TextField(blank=True, null=True)  # New optional field
     parent = TreeForeignKey(
         'self',
@@ -75,16 +94,34 @@ class Equipment(MPTTModel):
         related_name='equipment_manufactured'
     )
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class MPTTMeta:
         order_insertion_by = ['name']
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['location_status', 'manufacturer'], name='equipment_location_mfr_idx'),
+            models.Index(fields=['manufacturer', 'location_status'], name='equipment_mfr_location_idx'),
+            models.Index(fields=['name', 'id'], name='equipment_name_idx'),
+            models.Index(fields=['tree_id', 'lft'], name='equipment_tree_lft_idx'),
+            models.Index(fields=['updated_at', 'id'], name='equipment_updated_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets post_save tell a location change from any other save
+        instance._loaded_location_status = instance.__dict__.get('location_status')
+        return instance
+
     def __str__(self):
         return self.name
 
 class Part(models.Model):
-    part_number = models.CharField(max_length=255)
-    part_name = models.CharField(max_length=255)
+    # Indexed for prefix search in the admin
+    part_number = models.CharField(max_length=255, db_index=True)
+    part_name = models.CharField(max_length=255, db_index=True)
     description = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=50)
     last_updated = models.DateTimeField(auto_now=True)
@@ -112,6 +149,13 @@ class Part(models.Model):
     )
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'part_number', 'id'], name='part_active_number_idx'),
+            models.Index(fields=['status', 'part_number'], name='part_status_number_idx'),
+            models.Index(fields=['last_updated', 'id'], name='part_updated_idx'),
+        ]
+
     def __str__(self):
         return self.part_number
 
@@ -145,6 +189,18 @@ class Task(models.Model):
         blank=True,
         related_name='tasks'
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['start_date', 'id'], name='task_start_idx'),
+            models.Index(fields=['priority', 'start_date'], name='task_priority_start_idx'),
+            models.Index(fields=['task_type', 'start_date'], name='task_type_start_idx'),
+            models.Index(fields=['assigned_to', 'start_date'], name='task_assignee_start_idx'),
+            # Subtree lists: the equipment range join, then start_date order
+            models.Index(fields=['equipment', 'start_date', 'id'], name='task_equipment_start_idx'),
+            models.Index(fields=['updated_at', 'id'], name='task_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.task_type}: {self.description[:50]}"
@@ -163,6 +219,20 @@ class Task(models.Model):
             return last_date + relativedelta(years=1)
         return last_date  # Fallback
 
+class ScheduleQuerySet(models.QuerySet):
+    def with_overdue(self):
+        """Annotate ``overdue`` in SQL so it can be filtered, counted and ordered on."""
+        today = timezone.now().date()
+        return self.annotate(overdue=models.Case(
+            models.When(status='pending', due_date__lt=today, then=models.Value(True)),
+            default=models.Value(False),
+            output_field=models.BooleanField()
+        ))
+
+    def overdue(self):
+        """Pending schedules past their due date; served by the partial pending index."""
+        return self.filter(status='pending', due_date__lt=timezone.now().date())
+
 class Schedule(models.Model):
     task = models.ForeignKey(
         Task,
@@ -176,27 +246,103 @@ class Schedule(models.Model):
         choices=SCHEDULE_STATUS_CHOICES,
         default='pending'
     )
-    history_log = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ScheduleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['due_date'],
+                condition=models.Q(status='pending'),
+                name='schedule_pending_due_idx'
+            ),
+            models.Index(fields=['due_date', 'id'], name='schedule_due_idx'),
+            models.Index(fields=['status', 'due_date'], name='schedule_status_due_idx'),
+            models.Index(fields=['status', 'completion_date'], name='schedule_status_done_idx'),
+            # Serves per-task pending and overdue lookups, including subtree rollups
+            models.Index(fields=['task', 'status', 'due_date'], name='schedule_task_status_due_idx'),
+            models.Index(fields=['updated_at', 'id'], name='schedule_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'due_date'], name='unique_schedule_task_due_date'),
+        ]
 
     def __str__(self):
         return f"Schedule for {self.task} due on {self.due_date}"
 
     @property
     def is_overdue(self):
+        # Prefer the value Schedule.objects.with_overdue() computed in SQL
+        overdue = getattr(self, 'overdue', None)
+        if overdue is not None:
+            return overdue
         if self.status == 'pending' and self.due_date < timezone.now().date():
             return True
         return False
 
-    def save(self, *args, **kwargs):
-        """Override save to auto-generate next schedule on completion."""
-        if self.pk and self.status == 'completed' and not self.completion_date:
-            # If completing a schedule, set completion date and create next one
-            self.completion_date = timezone.now().date()
-            next_due_date = self.task.calculate_next_due_date(self.due_date)
-            if next_due_date:
-                Schedule.objects.create(
-                    task=self.task,
-                    due_date=next_due_date,
-                    status='pending'
-                )
-        super().save(*args, **kwargs)
\ No newline at end of file
+class ScheduleEvent(models.Model):
+    """One entry in a schedule's append-only history; rows are never updated."""
+    schedule = models.ForeignKey(
+        Schedule,
+        on_delete=models.CASCADE,
+        related_name='events'
+    )
+    kind = models.CharField(max_length=20, choices=SCHEDULE_EVENT_CHOICES)
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='schedule_events'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    from_value = models.CharField(max_length=255, blank=True)
+    to_value = models.CharField(max_length=255, blank=True)
+    note = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['schedule', 'created_at', 'id'], name='schedule_event_idx'),
+            models.Index(fields=['kind', 'created_at'], name='schedule_event_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} on schedule {self.schedule_id} at {self.created_at}"
+
+class DeletedRecord(models.Model):
+    """Tombstone for a hard-deleted row, so sync clients learn to drop it."""
+    resource = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='deleted_record_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.resource} {self.object_id} deleted at {self.deleted_at}"
+
+class ReminderLog(models.Model):
+    """A reminder of one kind an assignee has been sent about a schedule; each goes out once."""
+    schedule = models.ForeignKey(
+        Schedule,
+        on_delete=models.CASCADE,
+        related_name='reminders'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='reminders'
+    )
+    kind = models.CharField(max_length=20, choices=REMINDER_KIND_CHOICES)
+    sent_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['schedule', 'user', 'kind'], name='unique_reminder'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} reminder for schedule {self.schedule_id} to {self.user} at {self.sent_at}"
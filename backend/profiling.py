@@ -0,0 +1,243 @@
+"""
+Opt-in request profiling.
+
+``ProfilingMiddleware`` times a random sample of requests: wall time, SQL
+statement count and time, repeated statements (the N+1 signature), time
+spent producing serializer ``.data`` and response size. Each sampled
+response gets a ``Server-Timing`` header, and every view accumulates
+histograms that ``metrics_snapshot`` reports. Settings live in
+``CMMS_PROFILING``; with a sample rate of 0 the middleware removes itself.
+
+Metrics are kept per process, so each worker reports its own traffic.
+
+The middleware runs natively under both WSGI and ASGI. Queries are
+charged through a hook installed once on each connection, which looks the
+sampled request up in a context variable; that variable follows the
+request onto the thread its ORM calls run on under ASGI.
+"""
+import bisect
+import logging
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'SAMPLE_RATE': 0.0,
+    'DUPLICATE_THRESHOLD': 3,  # Same statement this many times in one request
+    'BUCKETS_MS': [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000],
+    'MAX_PATTERNS': 20,  # Repeated statements remembered per view
+}
+
+_current = ContextVar('cmms_profile', default=None)
+_lock = threading.Lock()
+_views = {}
+_started = timezone.now()
+
+def _profile_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile(execute, sql, params, many, context)
+
+def watch_connections():
+    """Install the query hook on this thread's connections, once each."""
+    for connection in connections.all():
+        if _profile_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(_profile_query)
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'CMMS_PROFILING', {})}
+
+class RequestProfile:
+    """Counters for one sampled request."""
+
+    def __init__(self):
+        self.query_count = 0
+        self.query_time = 0.0
+        self.statements = {}
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # ``execute_wrapper`` hook
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_time += time.perf_counter() - began
+            self.query_count += 1
+            self.statements[sql] = self.statements.get(sql, 0) + 1
+
+    def duplicates(self, threshold):
+        return {sql: count for sql, count in self.statements.items() if count >= threshold}
+
+def _timed_data(prop):
+    """Wrap a serializer ``data`` property so the outermost call is timed."""
+    def data(self):
+        profile = _current.get()
+        if profile is None:
+            return prop.fget(self)
+        profile.serializer_depth += 1
+        began = time.perf_counter()
+        try:
+            return prop.fget(self)
+        finally:
+            profile.serializer_depth -= 1
+            if not profile.serializer_depth:
+                profile.serializer_time += time.perf_counter() - began
+    data.profiled = True
+    return property(data)
+
+def instrument_serializers():
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(cls.data.fget, 'profiled', False):
+            cls.data = _timed_data(cls.data)
+
+class ViewStats:
+    """Running totals and a latency histogram for one view."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.histogram = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.queries = 0
+        self.query_ms = 0.0
+        self.serializer_ms = 0.0
+        self.bytes = 0
+        self.duplicate_requests = 0
+        self.patterns = {}
+
+    def add(self, wall_ms, profile, size, duplicates, max_patterns):
+        self.histogram[bisect.bisect_left(self.buckets, wall_ms)] += 1
+        self.count += 1
+        self.total_ms += wall_ms
+        self.max_ms = max(self.max_ms, wall_ms)
+        self.queries += profile.query_count
+        self.query_ms += profile.query_time * 1000
+        self.serializer_ms += profile.serializer_time * 1000
+        self.bytes += size
+        if duplicates:
+            self.duplicate_requests += 1
+            for sql, count in duplicates.items():
+                if sql in self.patterns or len(self.patterns) < max_patterns:
+                    self.patterns[sql] = max(self.patterns.get(sql, 0), count)
+
+    def as_dict(self):
+        count = self.count or 1
+        return {
+            'requests': self.count,
+            'mean_ms': round(self.total_ms / count, 2),
+            'max_ms': round(self.max_ms, 2),
+            'mean_queries': round(self.queries / count, 2),
+            'mean_query_ms': round(self.query_ms / count, 2),
+            'mean_serializer_ms': round(self.serializer_ms / count, 2),
+            'mean_bytes': round(self.bytes / count),
+            'requests_with_duplicates': self.duplicate_requests,
+            'histogram': [
+                {'le': bound, 'count': count}
+                for bound, count in zip([*self.buckets, None], self.histogram)
+            ],
+            'duplicate_queries': [
+                {'sql': sql, 'max_per_request': count}
+                for sql, count in sorted(self.patterns.items(), key=lambda item: -item[1])
+            ],
+        }
+
+def metrics_snapshot():
+    """Aggregated per-view metrics for this process."""
+    config = get_config()
+    with _lock:
+        views = {name: stats.as_dict() for name, stats in sorted(_views.items())}
+    return {
+        'pid': os.getpid(),
+        'since': _started.isoformat(),
+        'sample_rate': config['SAMPLE_RATE'],
+        'buckets_ms': config['BUCKETS_MS'],
+        'views': views,
+    }
+
+def reset_metrics():
+    global _started
+    with _lock:
+        _views.clear()
+        _started = timezone.now()
+
+class ProfilingMiddleware:
+    """Profiles ``SAMPLE_RATE`` of requests; see the module docstring."""
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.config = get_config()
+        if self.config['SAMPLE_RATE'] <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        instrument_serializers()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.config['SAMPLE_RATE']:
+            return self.get_response(request)
+
+        watch_connections()
+        profile = RequestProfile()
+        token = _current.set(profile)
+        began = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, profile, (time.perf_counter() - began) * 1000)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= self.config['SAMPLE_RATE']:
+            return await self.get_response(request)
+
+        # The request's ORM calls run on its sync thread, with that thread's connections
+        await sync_to_async(watch_connections)()
+        profile = RequestProfile()
+        token = _current.set(profile)
+        began = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, profile, (time.perf_counter() - began) * 1000)
+        return response
+
+    def record(self, request, response, profile, wall_ms):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        size = 0 if response.streaming else len(response.content)
+        duplicates = profile.duplicates(self.config['DUPLICATE_THRESHOLD'])
+        if duplicates:
+            worst, count = max(duplicates.items(), key=lambda item: item[1])
+            logger.warning("%s ran the same query %d times: %s", view, count, worst[:300])
+
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={wall_ms:.1f}',
+            f'db;dur={profile.query_time * 1000:.1f};desc="{profile.query_count} queries"',
+            f'serialize;dur={profile.serializer_time * 1000:.1f}',
+            *([f'dup;desc="{sum(duplicates.values())} repeated queries"'] if duplicates else []),
+        ])
+        with _lock:
+            stats = _views.get(view)
+            if stats is None:
+                stats = _views[view] = ViewStats(self.config['BUCKETS_MS'])
+            stats.add(wall_ms, profile, size, duplicates, self.config['MAX_PATTERNS'])
@@ -0,0 +1,156 @@
+"""
+Batch counterpart of ``Task.calculate_next_due_date`` built on NumPy.
+
+Dates travel as ``datetime64[D]`` arrays and frequencies as arrays of
+``FREQUENCY_CHOICES`` codes (``None`` for one-time tasks, which yield NaT).
+Results match stepping ``relativedelta`` one occurrence at a time: once a
+monthly or yearly series is clamped to a shorter month (Jan 31 -> Feb 28,
+Feb 29 -> Feb 28) it keeps the clamped day, because each step starts from
+the previous due date rather than from the original start date.
+"""
+import numpy as np
+
+DAY_STEPS = {'daily': 1, 'weekly': 7}
+MONTH_STEPS = {'monthly': 1, 'yearly': 12}
+NAT = np.datetime64('NaT', 'D')
+MONTH_LEAD = 24  # Months of steps after which a series' day can no longer change
+
+def as_dates(values):
+    """Coerce dates, ISO strings or datetime64 values to a ``datetime64[D]`` array."""
+    return np.asarray(values, dtype='datetime64[D]')
+
+def _step_days(dates, period, steps):
+    offsets = np.arange(1, steps + 1) * period
+    return dates[:, None] + offsets.astype('timedelta64[D]')
+
+def _step_months(dates, period, steps):
+    months = dates.astype('datetime64[M]')
+    day = (dates - months.astype('datetime64[D]')).astype(np.int64) + 1
+    target = months[:, None] + (np.arange(1, steps + 1) * period).astype('timedelta64[M]')
+    month_start = target.astype('datetime64[D]')
+    month_length = ((target + 1).astype('datetime64[D]') - month_start).astype(np.int64)
+    # relativedelta clamps to the month's last day and the next step starts
+    # from the clamped date, so the day can only ever shrink along a row
+    day = np.minimum.accumulate(np.minimum(day[:, None], month_length), axis=1)
+    return month_start + (day - 1).astype('timedelta64[D]')
+
+def next_due_dates(last_dates, frequencies, steps=1):
+    """
+    Due dates after ``last_dates``, ``steps`` occurrences per row.
+
+    Column ``k`` holds what calling ``calculate_next_due_date`` ``k + 1``
+    times would return. Returns a ``(len(last_dates), steps)`` array.
+    """
+    last_dates = as_dates(last_dates)
+    frequencies = np.asarray(frequencies, dtype=object)
+    result = np.full((len(last_dates), steps), NAT)
+    if steps < 1:
+        return result
+    for code, period in DAY_STEPS.items():
+        rows = frequencies == code
+        if rows.any():
+            result[rows] = _step_days(last_dates[rows], period, steps)
+    for code, period in MONTH_STEPS.items():
+        rows = frequencies == code
+        if rows.any():
+            result[rows] = _step_months(last_dates[rows], period, steps)
+    return result
+
+def _skip_months(dates, frequencies, period, window_start):
+    """
+    First monthly or yearly occurrence on or after ``window_start`` for
+    series at ``dates``, all behind it.
+
+    Any 24 months of steps pass a February of a common year, or for yearly
+    series their own month in one, so by then the day has shrunk to that
+    month's length (if at all) and stays put. Rows further behind jump
+    straight to within 24 months of ``window_start`` with that day and are
+    stepped from there.
+    """
+    months = dates.astype('datetime64[M]')
+    day = (dates - months.astype('datetime64[D]')).astype(np.int64) + 1
+    gap = (window_start.astype('datetime64[M]') - months).astype(np.int64)
+    jump = (gap - MONTH_LEAD) // period * period
+    jumping = jump >= MONTH_LEAD
+    if period == 1:
+        floor = 28
+    else:
+        common = np.datetime64('2001-01', 'M') + (months - months.astype('datetime64[Y]'))
+        floor = ((common + 1).astype('datetime64[D]') - common.astype('datetime64[D]')).astype(np.int64)
+    target = (months + np.where(jumping, jump, 0).astype('timedelta64[M]')).astype('datetime64[D]')
+    dates = np.where(jumping, target + (np.minimum(day, floor) - 1).astype('timedelta64[D]'), dates)
+    candidates = np.concatenate(
+        [dates[:, None], next_due_dates(dates, frequencies, (2 * MONTH_LEAD) // period + 1)], axis=1
+    )
+    first = np.argmax(candidates >= window_start, axis=1)
+    return candidates[np.arange(len(dates)), first]
+
+def fast_forward(first_dates, frequencies, window_start):
+    """
+    Move each recurring series to its first occurrence on or after
+    ``window_start``, without stepping through the ones before it. One-time
+    and NaT rows are returned as they are.
+    """
+    first_dates = as_dates(first_dates).copy()
+    frequencies = np.asarray(frequencies, dtype=object)
+    window_start = np.datetime64(window_start, 'D')
+    behind = ~np.isnat(first_dates) & (first_dates < window_start)
+    for code, period in DAY_STEPS.items():
+        rows = behind & (frequencies == code)
+        gap = (window_start - first_dates[rows]).astype(np.int64)
+        first_dates[rows] += (-(-gap // period) * period).astype('timedelta64[D]')
+    for code, period in MONTH_STEPS.items():
+        rows = behind & (frequencies == code)
+        if rows.any():
+            first_dates[rows] = _skip_months(first_dates[rows], frequencies[rows], period, window_start)
+    return first_dates
+
+def _steps_to_reach(first_dates, code, horizon_end):
+    earliest = first_dates.min()
+    if code in DAY_STEPS:
+        return int((horizon_end - earliest).astype(np.int64) // DAY_STEPS[code])
+    months = (horizon_end.astype('datetime64[M]') - earliest.astype('datetime64[M]')).astype(np.int64)
+    return int(months // MONTH_STEPS[code])
+
+def occurrences_until(first_dates, frequencies, horizon_end):
+    """
+    Every occurrence from ``first_dates`` (inclusive) up to ``horizon_end``.
+
+    Returns ``(rows, dates)``: flat arrays pairing the input row index with
+    each due date, ordered by row and then date. One-time rows contribute
+    only their first date. The earliest row of each frequency sizes the
+    step matrix for all of them, so ``fast_forward`` series that may be
+    far behind first.
+    """
+    first_dates = as_dates(first_dates)
+    frequencies = np.asarray(frequencies, dtype=object)
+    horizon_end = np.datetime64(horizon_end, 'D')
+    row_parts = []
+    date_parts = []
+
+    in_horizon = ~np.isnat(first_dates) & (first_dates <= horizon_end)
+    recurring = np.zeros(len(frequencies), dtype=bool)
+    for code in (*DAY_STEPS, *MONTH_STEPS):
+        recurring |= frequencies == code
+    for code in (None, *DAY_STEPS, *MONTH_STEPS):
+        if code is None:
+            rows = np.flatnonzero(in_horizon & ~recurring)
+        else:
+            rows = np.flatnonzero(in_horizon & (frequencies == code))
+        if not len(rows):
+            continue
+        steps = 0 if code is None else _steps_to_reach(first_dates[rows], code, horizon_end)
+        dates = np.concatenate(
+            [first_dates[rows, None], next_due_dates(first_dates[rows], frequencies[rows], steps)],
+            axis=1
+        )
+        keep = dates <= horizon_end
+        row_parts.append(np.broadcast_to(rows[:, None], dates.shape)[keep])
+        date_parts.append(dates[keep])
+
+    if not row_parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype='datetime64[D]')
+    rows = np.concatenate(row_parts)
+    dates = np.concatenate(date_parts)
+    order = np.lexsort((dates, rows))
+    return rows[order], dates[order]
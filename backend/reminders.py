@@ -0,0 +1,189 @@
+"""
+Due and overdue reminders for task assignees.
+
+``collect_digests`` reads the pending schedules in the reminder window in
+one query on the partial pending ``due_date`` index: a schedule is *due*
+from ``lead_days`` before its due date and *overdue* from the day after,
+for up to ``overdue_days``. Rows are grouped into one digest per assignee,
+and ``dispatch`` hands the digests to a backend with at most
+``concurrency`` sends in flight.
+
+Every reminder sent is logged per schedule, assignee and kind, and the
+query skips logged ones. A schedule created or reassigned inside the
+window is therefore still announced to its new assignee, and nothing is
+sent twice. An assignee's reminders are logged as soon as their digest has
+been accepted, so a digest that fails goes out with the next run, and a
+restart resumes where the previous run stopped. The only duplicate
+possible is a digest in flight when the process dies. Runs take a lock, so
+overlapping cron invocations cannot both send.
+"""
+import asyncio
+import datetime
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage
+from django.db import connection
+from django.db.models import Case, Exists, OuterRef, Value, When
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Schedule, ReminderLog, REMINDER_KIND_CHOICES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEAD_DAYS = 3
+DEFAULT_OVERDUE_DAYS = 7  # Older backlog is left to the dashboard
+DEFAULT_CONCURRENCY = 10
+LOCK_ID = 0x636d6d73  # Advisory lock key for reminder runs
+LOCK_TIMEOUT = 3600  # Seconds a cache lock outlives a run that died
+
+class RunInProgress(Exception):
+    """Another reminder run holds the lock."""
+
+def collect_digests(today, lead_days=DEFAULT_LEAD_DAYS, overdue_days=DEFAULT_OVERDUE_DAYS):
+    """One digest per assignee with the reminders they have not been sent yet."""
+    kind = Case(When(due_date__gte=today, then=Value('due')), default=Value('overdue'))
+    sent = ReminderLog.objects.filter(schedule=OuterRef('pk'), user=OuterRef('task__assigned_to'), kind=OuterRef('kind'))
+    rows = Schedule.objects.filter(
+        due_date__gte=today - datetime.timedelta(days=overdue_days),
+        due_date__lte=today + datetime.timedelta(days=lead_days),
+        status='pending', task__assigned_to__is_active=True,
+    ).annotate(kind=kind).exclude(Exists(sent)).order_by('due_date', 'id').values_list(
+        'pk', 'kind', 'due_date', 'task', 'task__description', 'task__equipment__name',
+        'task__assigned_to', 'task__assigned_to__username', 'task__assigned_to__email',
+    )
+
+    digests = {}
+    for pk, kind, due_date, task_id, description, equipment, user_id, username, email in rows.iterator():
+        digest = digests.setdefault(user_id, {
+            'user': user_id, 'username': username, 'email': email, 'overdue': [], 'due': [],
+        })
+        digest[kind].append({
+            'schedule': pk, 'task': task_id, 'description': description,
+            'equipment': equipment, 'due_date': due_date.isoformat(),
+        })
+    return list(digests.values())
+
+def render_digest(digest):
+    """Subject and plain-text body of a digest."""
+    counts = [f"{len(digest[kind])} {label.lower()}" for kind, label in REMINDER_KIND_CHOICES if digest[kind]]
+    lines = [f"Hello {digest['username']},", '']
+    for kind, label in reversed(REMINDER_KIND_CHOICES):
+        if digest[kind]:
+            lines.append(f'{label}:')
+            lines.extend(
+                f"  {item['due_date']}  {item['description']} ({item['equipment']}), schedule {item['schedule']}"
+                for item in digest[kind]
+            )
+            lines.append('')
+    return f"Maintenance reminders: {', '.join(counts)}", '\n'.join(lines)
+
+class EmailBackend:
+    """
+    Mails each digest through Django's mail settings, so ``EMAIL_BACKEND``
+    decides between SMTP, the console and files; in development point
+    ``EMAIL_PORT`` at a debugging SMTP server. Assignees without an address
+    are skipped.
+    """
+    def __init__(self, from_email=None):
+        self.from_email = from_email or settings.DEFAULT_FROM_EMAIL
+
+    async def send(self, digest):
+        if not digest['email']:
+            logger.warning("No email address for %s; reminders skipped", digest['username'])
+            return
+        subject, body = render_digest(digest)
+        message = EmailMessage(subject, body, self.from_email, [digest['email']])
+        await asyncio.to_thread(message.send)
+
+class FileBackend:
+    """Appends each digest to ``path`` as a JSON line, for local runs and tests."""
+    def __init__(self, path='reminders.jsonl'):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def write(self, line):
+        with self.lock, open(self.path, 'a', encoding='utf-8') as output:
+            output.write(line + '\n')
+
+    async def send(self, digest):
+        await asyncio.to_thread(self.write, json.dumps(digest))
+
+def get_backend(path=None):
+    """The configured backend, or the class at ``path`` with its defaults."""
+    config = getattr(settings, 'CMMS_REMINDERS', {})
+    if path is not None:
+        return import_string(path)()
+    return import_string(config.get('BACKEND', 'cmms.reminders.EmailBackend'))(**config.get('OPTIONS', {}))
+
+def log_sent(digest):
+    ReminderLog.objects.bulk_create([
+        ReminderLog(schedule_id=item['schedule'], user_id=digest['user'], kind=kind)
+        for kind, _ in REMINDER_KIND_CHOICES for item in digest[kind]
+    ], ignore_conflicts=True)
+
+async def dispatch(digests, backend, concurrency):
+    """Send ``digests`` with at most ``concurrency`` at once; returns the users whose digest failed."""
+    limit = asyncio.Semaphore(concurrency)
+    log = sync_to_async(log_sent)
+
+    async def deliver(digest):
+        async with limit:
+            try:
+                await backend.send(digest)
+            except Exception:
+                logger.exception("Reminder digest for %s failed", digest['username'])
+                return digest['user']
+        await log(digest)
+        return None
+
+    results = await asyncio.gather(*(deliver(digest) for digest in digests))
+    return [user_id for user_id in results if user_id is not None]
+
+@contextmanager
+def run_lock():
+    """
+    Hold the reminder lock for a run, or raise ``RunInProgress``. Postgres
+    takes a session advisory lock, released with the connection if the
+    process dies; other databases fall back to a cache key.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [LOCK_ID])
+            if not cursor.fetchone()[0]:
+                raise RunInProgress
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [LOCK_ID])
+        return
+    if not cache.add('cmms:reminders:lock', True, LOCK_TIMEOUT):
+        raise RunInProgress
+    try:
+        yield
+    finally:
+        cache.delete('cmms:reminders:lock')
+
+def send_reminders(today=None, lead_days=None, overdue_days=None, concurrency=None, backend=None):
+    """Collect and send one run of reminders; raises ``RunInProgress`` while another run is going."""
+    config = getattr(settings, 'CMMS_REMINDERS', {})
+    today = today or timezone.localdate()
+    lead_days = config.get('LEAD_DAYS', DEFAULT_LEAD_DAYS) if lead_days is None else lead_days
+    overdue_days = config.get('OVERDUE_DAYS', DEFAULT_OVERDUE_DAYS) if overdue_days is None else overdue_days
+    concurrency = concurrency or config.get('CONCURRENCY', DEFAULT_CONCURRENCY)
+    backend = backend or get_backend()
+
+    with run_lock():
+        digests = collect_digests(today, lead_days, overdue_days)
+        failed = async_to_sync(dispatch)(digests, backend, concurrency)
+    sent = [digest for digest in digests if digest['user'] not in failed]
+    return {
+        'digests': len(sent),
+        'reminders': sum(len(digest[kind]) for digest in sent for kind, _ in REMINDER_KIND_CHOICES),
+        'failed': len(failed),
+    }
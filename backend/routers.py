@@ -0,0 +1,126 @@
+"""
+Read-replica routing.
+
+With ``CMMS_READ_REPLICA`` naming a database alias, list views read their
+pages from it: ``replica_reads`` marks the block that runs the list query
+and ``ReplicaRouter`` sends the reads made inside it to the replica.
+Authentication, detail views, writes and migrations stay on the primary.
+
+A replica lags behind, and for ``CMMS_REPLICA_PIN_SECONDS`` after a write
+two kinds of read go to the primary instead:
+
+* Reads of a resource written within the window. Its version counter is
+  the time of the last write, and the page read is cached under that
+  version for every client, so it must not come from a replica that has
+  not caught up.
+* Every read by a client that just wrote. ``ReplicaPinMiddleware`` answers
+  any unsafe request with a short-lived pin cookie, whatever the
+  authentication, and also pins signed-in users in the cache for clients
+  that drop cookies; set REDIS_URL so those pins hold across workers.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from .caching import get_version, request_resources
+
+DEFAULT_PIN_SECONDS = 5
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'cmms_read_primary'
+
+_replica = ContextVar('cmms_replica', default=None)
+
+def replica_alias():
+    """The alias list reads may use, or None without a separate replica."""
+    alias = getattr(settings, 'CMMS_READ_REPLICA', None)
+    if alias is None or alias not in connections:
+        return alias
+    # Test mirrors point at the primary, where reading through a second
+    # connection would only hide the test's uncommitted rows
+    replica, primary = connections[alias].settings_dict, connections[DEFAULT_DB_ALIAS].settings_dict
+    if all(replica.get(key) == primary.get(key) for key in ('ENGINE', 'HOST', 'PORT', 'NAME')):
+        return None
+    return alias
+
+def pin_seconds():
+    return getattr(settings, 'CMMS_REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS)
+
+def _pin_key(user_id):
+    return f'cmms:replica-pin:{user_id}'
+
+def pin_to_primary(request, response):
+    if not replica_alias():
+        return
+    response.set_cookie(PIN_COOKIE, '1', max_age=pin_seconds(), httponly=True, samesite='Lax')
+    if request.user.is_authenticated:
+        cache.set(_pin_key(request.user.pk), True, pin_seconds())
+
+def is_pinned(request):
+    if PIN_COOKIE in request.COOKIES:
+        return True
+    return request.user.is_authenticated and cache.get(_pin_key(request.user.pk)) is not None
+
+def recently_written(resources):
+    """Whether any of ``resources`` changed within the pin window; see the module docstring."""
+    cutoff = time.time_ns() - pin_seconds() * 10**9
+    return any(get_version(resource) > cutoff for resource in resources)
+
+@contextmanager
+def replica_reads(request, resources=()):
+    """Send reads in this block to the replica, unless there is none or it may miss recent writes."""
+    alias = replica_alias()
+    if alias and (is_pinned(request) or recently_written(resources)):
+        alias = None
+    token = _replica.set(alias)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+class ReplicaReadMixin:
+    """For DRF list views: GETs that miss the response cache read the replica."""
+    def get(self, request, *args, **kwargs):
+        with replica_reads(request, request_resources(getattr(self, 'cache_resources', ()), request)):
+            return super().get(request, *args, **kwargs)
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Related rows of replica objects read outside the block come from the primary too
+        return _replica.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # Both hold the same rows
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+class ReplicaPinMiddleware:
+    """Pins the user of any request that can write; see the module docstring."""
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            pin_to_primary(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            # The user may still be an unevaluated session lookup
+            await sync_to_async(pin_to_primary)(request, response)
+        return response
@@ -0,0 +1,101 @@
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+import numpy as np
+from .caching import invalidate_after_bulk
+from .events import publish_on_commit
+from .history import record_events
+from .models import Task, Schedule
+from .recurrence import as_dates, fast_forward, next_due_dates, occurrences_until
+from .utils import chunks
+
+DEFAULT_HORIZON_MONTHS = 12
+DEFAULT_CHUNK_SIZE = 5000
+
+def plan_occurrences(tasks, horizon_end, today=None):
+    """
+    Due dates still to be materialized for ``(pk, frequency, start_date, last_due)`` rows.
+
+    A task resumes one step after its latest schedule; a task without any
+    starts at its ``start_date``, and a one-time task that already has its
+    schedule gets nothing. Recurring series skip the occurrences before
+    ``today``, so a task that started years ago is not back-filled with
+    overdue rows. Returns a list of ``(task_pk, due_date)`` pairs.
+    """
+    pks, frequencies, start_dates, last_dues = zip(*tasks)
+    last_dues = as_dates(last_dues)
+    resume = next_due_dates(last_dues, frequencies)[:, 0]
+    first_dates = np.where(np.isnat(last_dues), as_dates(start_dates), resume)
+    first_dates = fast_forward(first_dates, frequencies, today or timezone.now().date())
+    rows, dates = occurrences_until(first_dates, frequencies, horizon_end)
+    return list(zip(np.asarray(pks)[rows].tolist(), dates.tolist()))
+
+def generate_schedules(horizon_end=None, tasks=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Materialize pending schedules for every task up to ``horizon_end``.
+
+    Tasks are planned a chunk at a time with the NumPy recurrence engine,
+    rows are written with ``bulk_create``, and the unique (task, due_date)
+    constraint makes reruns and overlapping runs harmless. Returns the
+    number of rows submitted for insertion.
+    """
+    if horizon_end is None:
+        horizon_end = timezone.now().date() + relativedelta(months=DEFAULT_HORIZON_MONTHS)
+    if tasks is None:
+        tasks = Task.objects.all()
+    rows = (
+        tasks.annotate(last_due=Max('schedules__due_date'))
+        .values_list('pk', 'frequency', 'start_date', 'last_due')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    created = 0
+    for chunk in chunks(rows, chunk_size):
+        batch = [
+            Schedule(task_id=task_id, due_date=due_date, status='pending')
+            for task_id, due_date in plan_occurrences(chunk, horizon_end)
+        ]
+        Schedule.objects.bulk_create(batch, batch_size=chunk_size, ignore_conflicts=True)
+        created += len(batch)
+    if created:
+        invalidate_after_bulk('schedule')
+    return created
+
+def complete_schedules(schedule_ids, completion_date=None, actor=None):
+    """
+    Complete pending schedules and create each one's follow-up occurrence.
+
+    This is the only completion path. The pending rows are locked with
+    ``select_for_update`` and flipped by an ``UPDATE ... WHERE status =
+    'pending'`` in the same transaction that inserts the follow-ups, so
+    concurrent requests cannot both complete a schedule or fork its series.
+    Already completed or unknown IDs are skipped, and each completed one
+    gets a history event naming ``actor``. Returns the completed IDs.
+    """
+    completion_date = completion_date or timezone.now().date()
+    with transaction.atomic():
+        claimed = list(
+            Schedule.objects.select_for_update(of=('self',))
+            .filter(pk__in=schedule_ids, status='pending')
+            .order_by('pk')
+            .values_list('pk', 'task_id', 'task__frequency', 'due_date')
+        )
+        if not claimed:
+            return []
+        pks, task_ids, frequencies, due_dates = zip(*claimed)
+        Schedule.objects.filter(pk__in=pks, status='pending').update(
+            status='completed', completion_date=completion_date, updated_at=timezone.now()
+        )
+        record_events(pks, 'completed', actor, from_value='pending', to_value=completion_date.isoformat())
+        publish_on_commit('schedule.completed', {'ids': list(pks), 'completion_date': completion_date.isoformat()})
+        next_dates = next_due_dates(due_dates, frequencies)[:, 0]
+        follow_ups = [
+            Schedule(task_id=task_id, due_date=due_date.item(), status='pending')
+            for task_id, due_date in zip(task_ids, next_dates)
+            if not np.isnat(due_date)
+        ]
+        # The next occurrence may already be materialized by generate_schedules
+        Schedule.objects.bulk_create(follow_ups, ignore_conflicts=True)
+        invalidate_after_bulk('schedule')
+    return list(pks)
@@ -0,0 +1,330 @@
+"""
+Synthetic data at load-testing scale, written in chunks with ``bulk_create``.
+
+Every chunk draws from its own ``random.Random`` seeded by the run seed, the
+table and the chunk number, so a seed produces the same rows whether chunks
+run in this process or spread over worker processes. Equipment trees are
+laid out in memory with their MPTT columns already filled in, so no rebuild
+is needed afterwards.
+"""
+import datetime
+import random
+from multiprocessing import get_context
+import numpy as np
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from .caching import invalidate_after_bulk
+from .models import (
+    Vendor, Equipment, Part, Task, Schedule, ScheduleEvent, DeletedRecord, ReminderLog,
+    FREQUENCY_CHOICES, PRIORITY_CHOICES, TASK_TYPE_CHOICES, EQUIPMENT_LOCATION_STATUS
+)
+from .recurrence import next_due_dates
+from .sync import RESOURCE_NAMES, batched_deletions
+
+DEFAULT_CHUNK_SIZE = 5000
+PART_STATUSES = ['available', 'in-stock', 'on-order']
+FREQUENCIES = [code for code, _ in FREQUENCY_CHOICES] + [None]
+TEXT_POOL_SIZE = 500  # Faker is slow, so rows pick from a pool of sentences
+START_WINDOW_DAYS = 730
+COMPLETED_SHARE = 0.9  # Past schedules that are completed; the rest are overdue
+LAST_DATE = np.datetime64(datetime.date.max)
+SEEDED_RESOURCES = ('vendor', 'equipment', 'part', 'task', 'schedule')
+
+_state = {}
+
+def _rng(table, index):
+    return random.Random(f"{_state['seed']}:{table}:{index}")
+
+def _prepare(seed, chunk_size, today):
+    """Per-process setup: text pools and the primary keys chunks point at."""
+    faker = Faker()
+    faker.seed_instance(seed)
+    _state.update(
+        seed=seed,
+        chunk_size=chunk_size,
+        today=today,
+        sentences=[faker.sentence() for _ in range(TEXT_POOL_SIZE)],
+        vendor_pks=list(Vendor.objects.order_by('pk').values_list('pk', flat=True)),
+        equipment_pks=list(Equipment.objects.order_by('pk').values_list('pk', flat=True)),
+    )
+
+def _run_chunks(func, jobs, workers, seed, chunk_size, today):
+    """Run ``func(*job)`` for every job, in a process pool when ``workers > 1``."""
+    if workers <= 1:
+        _prepare(seed, chunk_size, today)
+        for job in jobs:
+            func(*job)
+        return
+    # Forked children must open their own connections
+    connections.close_all()
+    with get_context().Pool(workers, initializer=_prepare, initargs=(seed, chunk_size, today)) as pool:
+        for _ in pool.imap_unordered(_star, [(func, job) for job in jobs]):
+            pass
+
+def _star(item):
+    func, job = item
+    return func(*job)
+
+def _ranges(count, chunk_size):
+    return [(index, start, min(start + chunk_size, count)) for index, start in enumerate(range(0, count, chunk_size))]
+
+def clear_data():
+    """
+    Delete every seeded table, leaving a sync tombstone for each removed row.
+
+    On PostgreSQL the tombstones are copied over with one ``INSERT ...
+    SELECT`` per synced table and the tables are emptied with a single
+    ``TRUNCATE``. Other databases go through ``delete()``, whose signal
+    receivers record the tombstones (inserted together at the end) and
+    invalidate the caches themselves.
+    Sequences are not restarted, so a tombstoned id is never handed to a
+    new row.
+    """
+    connection = connections[Schedule.objects.db]
+    if connection.vendor != 'postgresql':
+        # Children first, so no cascade has to collect them
+        with batched_deletions():
+            for model in (ScheduleEvent, ReminderLog, Schedule, Task, Part, Equipment, Vendor):
+                model.objects.all().delete()
+        return
+    now = timezone.now()
+    quote = connection.ops.quote_name
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for model, resource in RESOURCE_NAMES.items():
+            cursor.execute(
+                f'INSERT INTO {quote(DeletedRecord._meta.db_table)} (resource, object_id, deleted_at) '
+                f'SELECT %s, {quote(model._meta.pk.column)}, %s FROM {quote(model._meta.db_table)}',
+                [resource, now],
+            )
+        tables = [
+            model._meta.db_table for model in (
+                Part.equipment.through, Part.suppliers.through, ScheduleEvent, ReminderLog,
+                Schedule, Task, Part, Equipment, Vendor,
+            )
+        ]
+        cursor.execute(f"TRUNCATE {', '.join(map(quote, tables))}")
+    invalidate_after_bulk(*SEEDED_RESOURCES)
+
+def seed_vendors(count, seed, chunk_size=DEFAULT_CHUNK_SIZE):
+    faker = Faker()
+    faker.seed_instance(seed)
+    for _, start, stop in _ranges(count, chunk_size):
+        Vendor.objects.bulk_create([
+            Vendor(name=faker.company(), contact_info=faker.email(), address=faker.address(), is_active=True)
+            for _ in range(start, stop)
+        ])
+
+def tree_layout(size, fan_out):
+    """
+    ``(parent, level, lft, rght, rank)`` for a ``size``-node tree filled breadth-first.
+
+    Node ``i``'s parent is node ``(i - 1) // fan_out``; the list is returned
+    in that breadth-first order with ``parent`` as an index into it, and
+    ``rank`` is the node's position in tree (preorder) order.
+    """
+    parents = [None] + [(i - 1) // fan_out for i in range(1, size)]
+    children = [[] for _ in range(size)]
+    for node in range(1, size):
+        children[parents[node]].append(node)
+    levels = [0] * size
+    lft = [0] * size
+    rght = [0] * size
+    ranks = [0] * size
+    rank = 0
+    counter = 1
+    stack = [(0, False)]
+    while stack:
+        node, done = stack.pop()
+        if done:
+            rght[node] = counter
+            counter += 1
+            continue
+        lft[node] = counter
+        ranks[node] = rank
+        counter += 1
+        rank += 1
+        stack.append((node, True))
+        for child in reversed(children[node]):
+            levels[child] = levels[node] + 1
+            stack.append((child, False))
+    return list(zip(parents, levels, lft, rght, ranks))
+
+def seed_equipment(count, depth, fan_out, seed, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Insert ``count`` equipment as trees ``depth`` levels deep with ``fan_out`` children per node.
+
+    Nodes go in a level at a time so each child knows its parent's primary
+    key. Names are numbered in tree order, which keeps siblings sorted the
+    way ``order_insertion_by = ['name']`` expects.
+    """
+    if not count:
+        return
+    fan_out = max(fan_out, 1)
+    tree_size = min(count, sum(fan_out ** level for level in range(max(depth, 1))))
+    layouts = {tree_size: tree_layout(tree_size, fan_out)}
+    rng = random.Random(f"{seed}:equipment")
+    vendor_pks = list(Vendor.objects.order_by('pk').values_list('pk', flat=True)) or [None]
+    faker = Faker()
+    faker.seed_instance(seed)
+    sentences = [faker.sentence() for _ in range(TEXT_POOL_SIZE)]
+    width = max(3, len(str(count)))
+    first_tree_id = (Equipment.objects.aggregate(Max('tree_id'))['tree_id__max'] or 0) + 1
+
+    # (tree number, node in layout, layout) for every node
+    nodes = []
+    for tree, start in enumerate(range(0, count, tree_size)):
+        size = min(tree_size, count - start)
+        layout = layouts.setdefault(size, tree_layout(size, fan_out))
+        for node in range(size):
+            nodes.append((tree, node, layout))
+    first_node = [None] * ((count - 1) // tree_size + 1)
+    for position, (tree, node, _) in enumerate(nodes):
+        if node == 0:
+            first_node[tree] = position
+
+    pks = [None] * len(nodes)
+    for level in range(max(depth, 1)):
+        batch = []
+        for position, (tree, node, layout) in enumerate(nodes):
+            parent, node_level, lft, rght, rank = layout[node]
+            if node_level != level:
+                continue
+            rank += tree * tree_size
+            batch.append((position, Equipment(
+                name=f"Equipment {rank + 1:0{width}d}",
+                model=f"Model-{rng.choice('XYZ')}{rng.randint(1, 99)}",
+                serial=f"SN{rank + 1:0{width}d}",
+                description=rng.choice(sentences),
+                parent_id=None if parent is None else pks[first_node[tree] + parent],
+                location_status=rng.choice(EQUIPMENT_LOCATION_STATUS)[0],
+                manufacturer_id=rng.choice(vendor_pks),
+                is_active=True,
+                tree_id=first_tree_id + tree, lft=lft, rght=rght, level=node_level,
+            )))
+        for start in range(0, len(batch), chunk_size):
+            chunk = batch[start:start + chunk_size]
+            Equipment.objects.bulk_create([equipment for _, equipment in chunk])
+            for position, equipment in chunk:
+                pks[position] = equipment.pk
+
+def _part_chunk(index, start, stop, width):
+    rng = _rng('parts', index)
+    vendor_pks = _state['vendor_pks'] or [None]
+    parts = Part.objects.bulk_create([
+        Part(
+            part_number=f"P{number + 1:0{width}d}",
+            part_name=f"Part {number + 1}",
+            description=rng.choice(_state['sentences']),
+            status=rng.choice(PART_STATUSES),
+            is_active=True,
+            vendor_id=rng.choice(vendor_pks),
+        )
+        for number in range(start, stop)
+    ])
+    equipment_pks = _state['equipment_pks']
+    links = []
+    suppliers = []
+    for part in parts:
+        for equipment_pk in rng.sample(equipment_pks, k=min(len(equipment_pks), rng.randint(1, 3))):
+            links.append(Part.equipment.through(part_id=part.pk, equipment_id=equipment_pk))
+        for vendor_pk in rng.sample(_state['vendor_pks'], k=min(len(_state['vendor_pks']), rng.randint(0, 2))):
+            suppliers.append(Part.suppliers.through(part_id=part.pk, vendor_id=vendor_pk))
+    Part.equipment.through.objects.bulk_create(links)
+    Part.suppliers.through.objects.bulk_create(suppliers)
+
+def _task_chunk(index, start, stop):
+    rng = _rng('tasks', index)
+    today = _state['today']
+    equipment_pks = _state['equipment_pks']
+    Task.objects.bulk_create([
+        Task(
+            description=f"Task {number + 1}: {rng.choice(_state['sentences'])}",
+            frequency=rng.choice(FREQUENCIES),
+            equipment_id=rng.choice(equipment_pks),
+            start_date=today - datetime.timedelta(days=rng.randrange(START_WINDOW_DAYS)),
+            task_type=rng.choice(TASK_TYPE_CHOICES)[0],
+            priority=rng.choice(PRIORITY_CHOICES)[0],
+        )
+        for number in range(start, stop)
+    ])
+
+def schedule_quotas(frequencies, count):
+    """
+    How many schedules each task gets so that ``count`` are created in total.
+
+    Every task gets its first occurrence; the rest are spread evenly over the
+    recurring tasks, since a one-time task only ever has one schedule.
+    """
+    quotas = (np.arange(len(frequencies)) < count).astype(np.int64)
+    recurring = np.flatnonzero([frequency is not None for frequency in frequencies])
+    extra = count - int(quotas.sum())
+    if extra > 0 and len(recurring):
+        base, remainder = divmod(extra, len(recurring))
+        quotas[recurring] += base
+        quotas[recurring[:remainder]] += 1
+    return quotas
+
+def _schedule_chunk(index, tasks, quotas):
+    rng = _rng('schedules', index)
+    today = _state['today']
+    pks, frequencies, start_dates = zip(*tasks)
+    quotas = np.asarray(quotas)
+    starts = np.asarray(start_dates, dtype='datetime64[D]')
+    dates = np.concatenate(
+        [starts[:, None], next_due_dates(starts, frequencies, steps=int(quotas.max()) - 1)], axis=1
+    )
+    keep = (np.arange(dates.shape[1]) < quotas[:, None]) & ~np.isnat(dates) & (dates <= LAST_DATE)
+    rows, columns = np.nonzero(keep)
+    schedules = []
+    for row, due_date in zip(rows.tolist(), dates[rows, columns].tolist()):
+        schedule = Schedule(task_id=pks[row], due_date=due_date, status='pending')
+        if due_date < today and rng.random() < COMPLETED_SHARE:
+            schedule.status = 'completed'
+            schedule.completion_date = min(due_date + datetime.timedelta(days=rng.randint(0, 3)), today)
+        schedules.append(schedule)
+    Schedule.objects.bulk_create(schedules, batch_size=_state['chunk_size'])
+    # Completion events, recorded at some point during the completion day
+    ScheduleEvent.objects.bulk_create([
+        ScheduleEvent(
+            schedule_id=schedule.pk, kind='completed', from_value='pending',
+            to_value=schedule.completion_date.isoformat(),
+            created_at=timezone.make_aware(datetime.datetime.combine(
+                schedule.completion_date, datetime.time(rng.randrange(7, 18), rng.randrange(60))
+            )),
+        )
+        for schedule in schedules if schedule.status == 'completed'
+    ], batch_size=_state['chunk_size'])
+
+def seed_parts(count, seed, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, today=None):
+    """Insert ``count`` parts, each linked to one to three equipment and up to two suppliers."""
+    width = max(3, len(str(count)))
+    jobs = [(*job, width) for job in _ranges(count, chunk_size)]
+    _run_chunks(_part_chunk, jobs, workers, seed, chunk_size, today or timezone.now().date())
+
+def seed_tasks(count, seed, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, today=None):
+    """Insert ``count`` tasks starting within the last two years on random equipment."""
+    _run_chunks(_task_chunk, _ranges(count, chunk_size), workers, seed, chunk_size, today or timezone.now().date())
+
+def seed_schedules(count, seed, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, today=None):
+    """
+    Insert ``count`` schedules following each task's recurrence from its start date.
+
+    Past occurrences are mostly completed, with a completion event each, and
+    the rest are left overdue.
+    """
+    tasks = list(Task.objects.order_by('pk').values_list('pk', 'frequency', 'start_date'))
+    quotas = schedule_quotas([frequency for _, frequency, _ in tasks], count)
+    # Split the tasks so each chunk holds roughly ``chunk_size`` schedules
+    bounds = np.searchsorted(np.cumsum(quotas), np.arange(chunk_size, int(quotas.sum()), chunk_size), side='right')
+    edges = [0, *dict.fromkeys(bounds.tolist()), len(tasks)]
+    jobs = [
+        (index, tasks[start:stop], quotas[start:stop].tolist())
+        for index, (start, stop) in enumerate(zip(edges, edges[1:]))
+        if quotas[start:stop].sum()
+    ]
+    _run_chunks(_schedule_chunk, jobs, workers, seed, chunk_size, today or timezone.now().date())
+
+def finish_seeding():
+    invalidate_after_bulk(*SEEDED_RESOURCES)
@@ -1,6 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Vendor, Equipment, Part, Task, Schedule
+from django.db import transaction
+from . import forecast, sync, trees
+from .lookups import DEFAULT_LIMIT, MAX_LIMIT
+from .history import actor_of, record_events
+from .models import Vendor, Equipment, Part, Task, Schedule, ScheduleEvent, EQUIPMENT_LOCATION_STATUS
 
 # Custom RecursiveField for self-referential serializers
 class RecursiveField(serializers.Serializer):
@@ -8,17 +12,48 @@ class RecursiveField(serializers.Serializer):
         serializer = self.parent.parent.__class__(value, context=self.context)
         return serializer.data
 
+class SparseFieldsMixin:
+    """
+    Lets GET clients trim the representation from the query string.
+
+    ``?fields=id,name`` keeps only the listed fields. Nested blocks named in
+    ``Meta.expandable_fields`` are rendered by default; once ``?expand=`` is
+    sent, only the blocks it lists stay nested and the others collapse to the
+    related primary key, or are left out when they have none of their own.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        params = request.query_params
+
+        if 'expand' in params:
+            expand = set(filter(None, params['expand'].split(',')))
+            for name in getattr(self.Meta, 'expandable_fields', ()):
+                if name in expand or name not in self.fields:
+                    continue
+                field = self.fields.pop(name)
+                if isinstance(field, serializers.BaseSerializer) and field.source in (None, name):
+                    self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+
+        if params.get('fields'):
+            keep = set(params['fields'].split(','))
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username']
 
-class VendorSerializer(serializers.ModelSerializer):
+class VendorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Vendor
         fields = ['id', 'name', 'contact_info', 'address', 'is_active']
 
-class EquipmentSerializer(serializers.ModelSerializer):
+class EquipmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     vendor = VendorSerializer(read_only=True)
     parent = serializers.PrimaryKeyRelatedField(
         queryset=Equipment.objects.all(),
@@ -42,24 +77,39 @@ class EquipmentSerializer(serializers.ModelSerializer):
             'location_status', 'expected_return_date', 'vendor', 'manufacturer',
             'manufacturer_details', 'is_active', 'children', 'parts'
         ]
+        expandable_fields = ['vendor', 'manufacturer_details', 'children', 'parts']
 
     def get_children(self, obj):
+        # Served from the cache trees.assemble_trees() fills in, when present
         children = obj.get_children()
-        return EquipmentSerializer(children, many=True).data
+        return EquipmentSerializer(children, many=True, context=self.context).data
 
     def get_parts(self, obj):
         parts = obj.parts.all()
         from .serializers import PartSerializer
         return PartSerializer(parts, many=True).data
 
-class PartSerializer(serializers.ModelSerializer):
+class EquipmentMoveSerializer(serializers.Serializer):
+    id = serializers.PrimaryKeyRelatedField(queryset=Equipment.objects.all())
+    parent = serializers.PrimaryKeyRelatedField(
+        queryset=Equipment.objects.all(),
+        allow_null=True
+    )
+
+class EquipmentSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Equipment
+        fields = ['id', 'name']
+
+class PartSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     equipment = serializers.PrimaryKeyRelatedField(
         queryset=Equipment.objects.all(),
         many=True,
         allow_null=True,
         required=False
     )
-    # Removed equipment_details to break recursion; use IDs instead
+    # Flat rows, since the full EquipmentSerializer would recurse back into parts
+    equipment_details = EquipmentSummarySerializer(source='equipment', many=True, read_only=True)
     suppliers = serializers.PrimaryKeyRelatedField(
         queryset=Vendor.objects.all(),
         many=True,
@@ -72,10 +122,23 @@ class PartSerializer(serializers.ModelSerializer):
         model = Part
         fields = [
             'id', 'part_number', 'part_name', 'description', 'status', 'last_updated',
-            'equipment', 'suppliers', 'supplier_details', 'is_active'
+            'equipment', 'equipment_details', 'suppliers', 'supplier_details', 'is_active'
         ]
+        expandable_fields = ['equipment_details', 'supplier_details']
+
+    def create(self, validated_data):
+        links = {name: validated_data.pop(name, None) or [] for name in ('equipment', 'suppliers')}
+        with transaction.atomic():
+            part = super().create(validated_data)
+            # A new part has no links to diff and its insert already stamped it and
+            # retired cached parts, so skip set() and its m2m signals
+            for name, targets in links.items():
+                field = Part._meta.get_field(name)
+                through, target_name = field.remote_field.through, field.m2m_reverse_field_name()
+                through.objects.bulk_create([through(part=part, **{target_name: target}) for target in targets])
+        return part
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     equipment = serializers.PrimaryKeyRelatedField(queryset=Equipment.objects.all())
     assigned_to = serializers.PrimaryKeyRelatedField(
         queryset=User.objects.all(),
@@ -90,13 +153,110 @@ class TaskSerializer(serializers.ModelSerializer):
             'start_date', 'task_type', 'priority', 'assigned_to'
         ]
 
-class ScheduleSerializer(serializers.ModelSerializer):
+class ScheduleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     task = TaskSerializer(read_only=True)
     is_overdue = serializers.ReadOnlyField()
+    # Appended to the schedule's history; read it back from /history/
+    note = serializers.CharField(write_only=True, required=False)
 
     class Meta:
         model = Schedule
         fields = [
             'id', 'task', 'due_date', 'completion_date',
-            'status', 'history_log', 'is_overdue'
-        ]
\ No newline at end of file
+            'status', 'is_overdue', 'note'
+        ]
+        expandable_fields = ['task']
+
+    def create(self, validated_data):
+        note = validated_data.pop('note', None)
+        instance = super().create(validated_data)
+        if note:
+            record_events([instance.pk], 'note', actor_of(self.context.get('request')), note=note)
+        return instance
+
+    def update(self, instance, validated_data):
+        note = validated_data.pop('note', None)
+        previous_status = instance.status
+        # Write only what the client sent so a stale read can't undo a concurrent completion
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        actor = actor_of(self.context.get('request'))
+        if instance.status != previous_status:
+            record_events([instance.pk], 'status', actor, from_value=previous_status, to_value=instance.status)
+        if note:
+            record_events([instance.pk], 'note', actor, note=note)
+        return instance
+
+class ScheduleEventSerializer(serializers.ModelSerializer):
+    actor_name = serializers.CharField(source='actor.username', read_only=True, default=None)
+
+    class Meta:
+        model = ScheduleEvent
+        fields = ['id', 'schedule', 'kind', 'actor', 'actor_name', 'created_at', 'from_value', 'to_value', 'note']
+
+class ScheduleCompleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
+    completion_date = serializers.DateField(required=False)
+
+class DashboardSummaryQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    subtree = serializers.PrimaryKeyRelatedField(queryset=Equipment.objects.all(), required=False)
+
+class SubtreeRollupQuerySerializer(serializers.Serializer):
+    subtree = serializers.PrimaryKeyRelatedField(queryset=Equipment.objects.all(), required=False)
+    depth = serializers.IntegerField(
+        required=False, default=trees.DEFAULT_ROLLUP_DEPTH, min_value=0, max_value=trees.MAX_ROLLUP_DEPTH
+    )
+
+class ForecastQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    weeks = serializers.IntegerField(required=False, default=forecast.DEFAULT_WEEKS, min_value=1, max_value=forecast.MAX_WEEKS)
+    group_by = serializers.ChoiceField(forecast.GROUPINGS, required=False, default='priority')
+    subtree = serializers.PrimaryKeyRelatedField(queryset=Equipment.objects.all(), required=False)
+    limit = serializers.IntegerField(required=False, default=forecast.DEFAULT_GROUPS, min_value=1, max_value=100)
+
+class LookupQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(required=False, default='', allow_blank=True, max_length=255)
+    limit = serializers.IntegerField(required=False, default=DEFAULT_LIMIT, min_value=1, max_value=MAX_LIMIT)
+
+class SyncQuerySerializer(serializers.Serializer):
+    since = serializers.CharField(required=False)
+    limit = serializers.IntegerField(required=False, default=sync.DEFAULT_LIMIT, min_value=1, max_value=sync.MAX_LIMIT)
+
+    def validate_since(self, value):
+        try:
+            return sync.decode_token(value)
+        except ValueError:
+            raise serializers.ValidationError("Not a token returned by this endpoint.")
+
+# Row formats for bulk import. Relations are referenced by natural keys
+# (equipment serial, vendor name) and resolved a batch at a time.
+class VendorImportSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=255)
+    contact_info = serializers.CharField(required=False)
+    address = serializers.CharField(required=False)
+    is_active = serializers.BooleanField(default=True)
+
+class EquipmentImportSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=255)
+    model = serializers.CharField(max_length=255)
+    serial = serializers.CharField(max_length=255)
+    description = serializers.CharField(required=False)
+    location_status = serializers.ChoiceField(EQUIPMENT_LOCATION_STATUS, default='in-house')
+    expected_return_date = serializers.DateField(required=False)
+    parent = serializers.CharField(required=False)
+    manufacturer = serializers.CharField(required=False)
+    vendor = serializers.CharField(required=False)
+    is_active = serializers.BooleanField(default=True)
+
+class PartImportSerializer(serializers.Serializer):
+    part_number = serializers.CharField(max_length=255)
+    part_name = serializers.CharField(max_length=255)
+    description = serializers.CharField(required=False)
+    status = serializers.CharField(max_length=50)
+    equipment = serializers.ListField(child=serializers.CharField(), required=False)
+    suppliers = serializers.ListField(child=serializers.CharField(), required=False)
+    vendor = serializers.CharField(required=False)
+    is_active = serializers.BooleanField(default=True)
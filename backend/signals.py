@@ -0,0 +1,58 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+from .caching import invalidate
+from .events import publish_on_commit
+from .models import Vendor, Equipment, Part, Task, Schedule
+from .sync import record_deletion, touch_parts
+
+@receiver([post_save, post_delete], sender=Vendor)
+@receiver([post_save, post_delete], sender=Equipment)
+@receiver([post_save, post_delete], sender=Part)
+@receiver([post_save, post_delete], sender=Task)
+@receiver([post_save, post_delete], sender=Schedule)
+def invalidate_resource_caches(sender, **kwargs):
+    invalidate(sender._meta.model_name)
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_caches(sender, update_fields=None, **kwargs):
+    # Logins only stamp last_login, which no response shows
+    if update_fields != frozenset(['last_login']):
+        invalidate('user')
+
+@receiver(post_delete, sender=Vendor)
+@receiver(post_delete, sender=Equipment)
+@receiver(post_delete, sender=Part)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Schedule)
+def record_sync_deletion(sender, instance, **kwargs):
+    record_deletion(instance)
+
+@receiver(m2m_changed, sender=Part.equipment.through)
+@receiver(m2m_changed, sender=Part.suppliers.through)
+def invalidate_part_caches(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate('part')
+
+@receiver(m2m_changed, sender=Part.equipment.through)
+@receiver(m2m_changed, sender=Part.suppliers.through)
+def touch_linked_parts(sender, instance, action, reverse, pk_set, **kwargs):
+    # Link rows carry no timestamp, so bump the parts' own for delta sync
+    if reverse and action == 'pre_clear':
+        # The links are gone by post_clear
+        touch_parts(sender.objects.filter(**{instance._meta.model_name: instance}).values('part_id'))
+    elif action in ('post_add', 'post_remove'):
+        touch_parts(pk_set if reverse else [instance.pk])
+    elif action == 'post_clear' and not reverse:
+        touch_parts([instance.pk])
+
+@receiver(post_save, sender=Equipment)
+def publish_location_change(sender, instance, created, **kwargs):
+    loaded = getattr(instance, '_loaded_location_status', None)
+    if not created and loaded is not None and loaded != instance.location_status:
+        publish_on_commit('equipment.location', {
+            'equipment': instance.pk,
+            'location_status': instance.location_status,
+            'expected_return_date': instance.expected_return_date.isoformat() if instance.expected_return_date else None,
+        })
+    instance._loaded_location_status = instance.location_status
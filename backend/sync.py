@@ -0,0 +1,176 @@
+"""
+Delta sync for offline clients.
+
+``collect_changes`` returns the rows of each synced resource created or
+updated after a change token, plus the ids of rows deleted since then,
+which post_delete records as ``DeletedRecord`` tombstones. Soft-deleted
+rows come back as updates with ``is_active`` false.
+
+Each resource is read as its own keyset stream over the indexed
+(change time, id) columns, and the token holds the position reached in
+every stream. A transaction can commit after a later one already has, so
+a position never moves past the server clock minus ``OVERLAP``; rows in
+that window are sent again, and clients apply them as idempotent upserts.
+"""
+import datetime
+from contextlib import contextmanager
+from asgiref.local import Local
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Vendor, Equipment, Part, Task, Schedule, DeletedRecord
+
+OVERLAP = datetime.timedelta(seconds=30)
+DEFAULT_LIMIT = 1000  # Rows per stream and response
+MAX_LIMIT = 10000
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+TOMBSTONE_BATCH_SIZE = 1000
+_pending = Local()  # Tombstones held back by batched_deletions
+
+# Resource name -> (model, change time column, fields sent to clients)
+RESOURCES = {
+    'vendors': (Vendor, 'updated_at', ['id', 'name', 'contact_info', 'address', 'is_active', 'updated_at']),
+    'equipment': (Equipment, 'updated_at', [
+        'id', 'name', 'model', 'serial', 'description', 'parent', 'location_status',
+        'expected_return_date', 'vendor', 'manufacturer', 'is_active', 'updated_at',
+    ]),
+    'parts': (Part, 'last_updated', [
+        'id', 'part_number', 'part_name', 'description', 'status', 'vendor', 'is_active', 'last_updated',
+    ]),
+    'tasks': (Task, 'updated_at', [
+        'id', 'description', 'frequency', 'equipment', 'start_date', 'task_type', 'priority',
+        'assigned_to', 'updated_at',
+    ]),
+    'schedules': (Schedule, 'updated_at', [
+        'id', 'task', 'due_date', 'completion_date', 'status', 'updated_at',
+    ]),
+}
+RESOURCE_NAMES = {model: name for name, (model, _, _) in RESOURCES.items()}
+STREAMS = [*RESOURCES, 'deleted']
+
+def encode_token(positions):
+    """Pack per-stream ``(time, id)`` positions into an opaque string."""
+    return '-'.join(
+        f'{(moment - EPOCH) // datetime.timedelta(microseconds=1)}.{pk}'
+        for moment, pk in (positions[stream] for stream in STREAMS)
+    )
+
+def decode_token(token):
+    """Inverse of ``encode_token``; raises ``ValueError`` for anything else."""
+    parts = token.split('-')
+    if len(parts) != len(STREAMS):
+        raise ValueError(token)
+    positions = {}
+    for stream, part in zip(STREAMS, parts):
+        micros, pk = map(int, part.split('.'))
+        if micros < 0 or pk < 0:
+            raise ValueError(token)
+        positions[stream] = (EPOCH + datetime.timedelta(microseconds=micros), pk)
+    return positions
+
+def _after(queryset, column, position, limit):
+    """First ``limit + 1`` rows past ``position`` in (column, id) order."""
+    if position is not None:
+        moment, pk = position
+        queryset = queryset.filter(Q(**{f'{column}__gt': moment}) | Q(**{column: moment, 'pk__gt': pk}))
+    return queryset.order_by(column, 'pk')[:limit + 1]
+
+def _advance(old, last, overflowed, safe):
+    """
+    Next position of a stream whose last returned row is at ``last``.
+
+    A stream with rows left continues right after the page it returned. A
+    drained one moves to its last row or to ``safe``, whichever is earlier,
+    so rows of transactions still in flight are picked up next time.
+    """
+    if overflowed:
+        return last
+    candidate = min(last, safe) if last is not None else safe
+    return candidate if old is None or candidate > old else old
+
+def _attach_part_links(parts):
+    by_id = {part['id']: part for part in parts}
+    for part in parts:
+        part['equipment'] = []
+        part['suppliers'] = []
+    links = [
+        (Part.equipment.through, 'equipment_id', 'equipment'),
+        (Part.suppliers.through, 'vendor_id', 'suppliers'),
+    ]
+    for through, column, key in links:
+        rows = through.objects.filter(part_id__in=by_id).order_by('pk').values_list('part_id', column)
+        for part_id, linked_id in rows:
+            by_id[part_id][key].append(linked_id)
+
+def collect_changes(since=None, limit=DEFAULT_LIMIT):
+    """
+    Rows changed after the ``since`` positions (everything when ``None``).
+
+    Returns ``changes`` and ``deleted`` keyed by resource, the ``token`` for
+    the next call and ``more``, which is set while any stream has rows left.
+    """
+    safe = (timezone.now() - OVERLAP, 0)
+    positions = {}
+    more = False
+    changes = {}
+    for name, (model, column, fields) in RESOURCES.items():
+        old = since[name] if since else None
+        rows = list(_after(model.objects.all(), column, old, limit).values(*fields))
+        overflowed = len(rows) > limit
+        rows = rows[:limit]
+        last = (rows[-1][column], rows[-1]['id']) if rows else None
+        positions[name] = _advance(old, last, overflowed, safe)
+        more = more or overflowed
+        changes[name] = rows
+    _attach_part_links(changes['parts'])
+
+    old = since['deleted'] if since else None
+    tombstones = list(_after(DeletedRecord.objects.all(), 'deleted_at', old, limit).values_list(
+        'id', 'resource', 'object_id', 'deleted_at'
+    ))
+    overflowed = len(tombstones) > limit
+    tombstones = tombstones[:limit]
+    last = (tombstones[-1][3], tombstones[-1][0]) if tombstones else None
+    positions['deleted'] = _advance(old, last, overflowed, safe)
+    deleted = {name: [] for name in RESOURCES}
+    for _, resource, object_id, _ in tombstones:
+        deleted[resource].append(object_id)
+
+    return {
+        'token': encode_token(positions),
+        'more': more or overflowed,
+        'changes': changes,
+        'deleted': deleted,
+    }
+
+def record_deletion(instance):
+    record = DeletedRecord(resource=RESOURCE_NAMES[type(instance)], object_id=instance.pk)
+    pending = getattr(_pending, 'records', None)
+    if pending is None:
+        record.save()
+    else:
+        pending.append(record)
+
+@contextmanager
+def batched_deletions():
+    """
+    Insert the tombstones of every delete in the block together at its end.
+
+    post_delete fires once per row, so bulk deletes and their cascades would
+    otherwise write one tombstone per query. The block runs in a transaction
+    and may be nested; the outermost one writes.
+    """
+    if getattr(_pending, 'records', None) is not None:
+        yield
+        return
+    _pending.records = []
+    try:
+        with transaction.atomic():
+            yield
+            DeletedRecord.objects.bulk_create(_pending.records, batch_size=TOMBSTONE_BATCH_SIZE)
+    finally:
+        _pending.records = None
+
+def touch_parts(part_ids):
+    """Mark parts changed when only their many-to-many links were written."""
+    Part.objects.filter(pk__in=part_ids).update(last_updated=timezone.now())
@@ -1,3 +1,1254 @@
-from django.test import TestCase
+import asyncio
+import base64
+import datetime
+import io
+import random
+import threading
+import unittest
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.contrib.admin import site
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.management import CommandError, call_command
+from django.core import mail
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.db.utils import ConnectionDoesNotExist
+from django.test import AsyncClient, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from . import events
+from .benchmarks import Case, check_budget, uncovered_routes
+from .dashboard import abuild_summary, build_summary
+from .forecast import build_forecast, get_forecast
+from .profiling import RequestProfile, ViewStats, reset_metrics
+from .models import Vendor, Equipment, Part, Task, Schedule, DeletedRecord, FREQUENCY_CHOICES
+from .reminders import EmailBackend, RunInProgress, run_lock, send_reminders
+from .routers import PIN_COOKIE, ReplicaRouter, replica_alias, replica_reads
+from .scheduling import complete_schedules, generate_schedules, plan_occurrences
+from .sync import RESOURCE_NAMES
+from .recurrence import fast_forward, next_due_dates, occurrences_until
+from .transfer import ImportFailed, export_rows, import_rows, render_rows
+from .trees import check_tree_consistency, move_equipment, subtree_rollups
 
-# Create your tests here.
+FREQUENCIES = [code for code, _ in FREQUENCY_CHOICES] + [None]
+
+class RecurrenceTests(SimpleTestCase):
+    def scalar_series(self, start, frequency, steps):
+        task = Task(frequency=frequency)
+        dates, current = [], start
+        for _ in range(steps):
+            current = task.calculate_next_due_date(current) if current else None
+            dates.append(current)
+        return dates
+
+    def test_matches_scalar_path(self):
+        rng = random.Random(8)
+        starts = [datetime.date(2020, 1, 1) + datetime.timedelta(days=rng.randrange(2000)) for _ in range(500)]
+        # Month-end and leap-day starts exercise relativedelta's clamping
+        starts += [datetime.date(2024, 2, 29), datetime.date(2025, 1, 31), datetime.date(2024, 1, 30), datetime.date(2023, 8, 31)]
+        frequencies = [FREQUENCIES[i % len(FREQUENCIES)] for i in range(len(starts))]
+        frequencies[-4:] = ['yearly', 'monthly', 'monthly', 'monthly']
+
+        result = next_due_dates(starts, frequencies, steps=30)
+        for row, (start, frequency) in enumerate(zip(starts, frequencies)):
+            expected = self.scalar_series(start, frequency, 30)
+            got = [None if np.isnat(value) else value.item() for value in result[row]]
+            self.assertEqual(got, expected, f'{frequency} from {start}')
+
+    def test_clamped_day_sticks(self):
+        result = next_due_dates([datetime.date(2025, 1, 31)], ['monthly'], steps=3)
+        self.assertEqual(result[0].tolist(), [
+            datetime.date(2025, 2, 28), datetime.date(2025, 3, 28), datetime.date(2025, 4, 28)
+        ])
+
+    def test_occurrences_until_horizon(self):
+        rows, dates = occurrences_until(
+            [datetime.date(2025, 1, 1), datetime.date(2025, 1, 1), datetime.date(2026, 1, 1)],
+            ['weekly', None, 'daily'],
+            datetime.date(2025, 1, 31)
+        )
+        self.assertEqual(rows.tolist(), [0, 0, 0, 0, 0, 1])
+        self.assertEqual(dates[:2].tolist(), [datetime.date(2025, 1, 1), datetime.date(2025, 1, 8)])
+
+    def test_fast_forward_matches_stepping(self):
+        rng = random.Random(5)
+        starts = [datetime.date(1995, 1, 1) + datetime.timedelta(days=rng.randrange(11000)) for _ in range(300)]
+        starts += [datetime.date(2000, 2, 29), datetime.date(2011, 1, 31), datetime.date(2023, 8, 31)]
+        frequencies = [FREQUENCIES[i % len(FREQUENCIES)] for i in range(len(starts))]
+        frequencies[-3:] = ['yearly', 'monthly', 'monthly']
+        window_start = datetime.date(2025, 3, 30)
+        result = fast_forward(starts, frequencies, window_start)
+        for start, frequency, got in zip(starts, frequencies, result.tolist()):
+            task, expected = Task(frequency=frequency), start
+            while frequency and expected < window_start:
+                expected = task.calculate_next_due_date(expected)
+            self.assertEqual(got, expected, f'{frequency} from {start}')
+
+    def test_planning_starts_today(self):
+        today = datetime.date(2025, 6, 15)
+        planned = plan_occurrences([
+            (1, 'monthly', datetime.date(2015, 1, 31), None),
+            (2, 'weekly', datetime.date(2020, 1, 1), datetime.date(2024, 1, 3)),
+            (3, None, datetime.date(2025, 1, 1), None),
+        ], datetime.date(2025, 12, 31), today)
+        monthly = [due for pk, due in planned if pk == 1]
+        self.assertEqual(monthly[0], datetime.date(2025, 6, 28))
+        self.assertEqual(len(monthly), 7)
+        self.assertEqual(min(due for pk, due in planned if pk == 2), datetime.date(2025, 6, 18))
+        # A one-time task keeps its date
+        self.assertIn((3, datetime.date(2025, 1, 1)), planned)
+
+class ListQueryCountTests(TestCase):
+    """
+    List endpoints must cost a fixed number of queries however many rows
+    they return; a serializer field without matching select_related or
+    prefetch_related turns into one query per row and fails here.
+    """
+    SIZES = (10, 100, 1000)
+    # Session and user lookups for the logged-in client, then the view's own
+    BUDGETS = {
+        '/api/users/': 3,
+        '/api/vendors/': 3,
+        '/api/equipment/': 7,  # roots, subtree nodes, parts, part equipment, part suppliers
+        '/api/parts/': 5,  # parts, equipment, suppliers
+        '/api/tasks/': 3,
+        '/api/schedules/': 3,  # schedules joined to tasks
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.user)
+
+    def seed(self, count):
+        """Grow every table to ``count`` rows, wiring up each relation the serializers render."""
+        start = Vendor.objects.count()
+        new = range(start, count)
+        vendors = Vendor.objects.bulk_create(Vendor(name=f'Vendor {i}') for i in new)
+        User.objects.bulk_create(User(username=f'user{i}') for i in new)
+        # Half roots, half children of those roots; MPTT columns are rebuilt below
+        equipment = Equipment.objects.bulk_create(
+            Equipment(
+                name=f'Equipment {i}', model='M', serial=f'SN{i}',
+                vendor=vendor, manufacturer=vendor, tree_id=0, lft=0, rght=0, level=0
+            )
+            for i, vendor in zip(new, vendors)
+        )
+        for child, parent in zip(equipment[1::2], equipment[::2]):
+            child.parent = parent
+        Equipment.objects.bulk_update(equipment[1::2], ['parent'])
+        Equipment.objects.rebuild()
+        parts = Part.objects.bulk_create(
+            Part(part_number=f'P{i}', part_name=f'Part {i}', status='available') for i in new
+        )
+        Part.equipment.through.objects.bulk_create(
+            Part.equipment.through(part=part, equipment=equip) for part, equip in zip(parts, equipment)
+        )
+        Part.suppliers.through.objects.bulk_create(
+            Part.suppliers.through(part=part, vendor=vendor) for part, vendor in zip(parts, vendors)
+        )
+        tasks = Task.objects.bulk_create(
+            Task(
+                description=f'Task {i}', frequency='monthly', equipment=equip,
+                start_date=datetime.date(2025, 1, 1), task_type='maintenance', assigned_to=self.user
+            )
+            for i, equip in zip(new, equipment)
+        )
+        Schedule.objects.bulk_create(
+            Schedule(task=task, due_date=datetime.date(2025, 1, 1)) for task in tasks
+        )
+
+    def test_list_query_counts_are_flat(self):
+        for size in self.SIZES:
+            self.seed(size)
+            for url, budget in self.BUDGETS.items():
+                with self.subTest(url=url, rows=size), self.assertNumQueries(budget):
+                    response = self.client.get(url, {'page_size': size})
+                    self.assertEqual(response.status_code, 200)
+
+class BenchmarkCoverageTests(SimpleTestCase):
+    def test_every_route_has_a_benchmark_case(self):
+        # New endpoints need a case in benchmarks.CASES
+        self.assertEqual(uncovered_routes(), [])
+
+    def test_budgets_can_vary_by_dataset(self):
+        case = Case('trees', 'equipment-list', 'get', '/api/equipment/', budget={'queries': 7, 'p95_ms': {'small': 2000}})
+        result = {'queries': 7, 'p95_ms': 3000}
+        self.assertEqual(check_budget(case, {**result, 'dataset': 'small'}), ['trees [small]: p95_ms 3000 > 2000'])
+        self.assertEqual(check_budget(case, {**result, 'dataset': 'large'}), [])
+
+class ConditionalResponseTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.vendor = Vendor.objects.create(name='Acme')
+
+    def test_unchanged_resources_answer_304_from_the_cache(self):
+        first = self.client.get('/api/vendors/')
+        self.assertTrue(first.has_header('Last-Modified'))
+        # Session and user lookups per request only: the payload comes from the cache
+        with self.assertNumQueries(4):
+            again = self.client.get('/api/vendors/')
+            not_modified = self.client.get('/api/vendors/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.json(), first.json())
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_writes_retire_etags(self):
+        etag = self.client.get('/api/vendors/')['ETag']
+        self.client.patch(f'/api/vendors/{self.vendor.pk}/', {'name': 'Acme Corp'}, content_type='application/json')
+        response = self.client.get('/api/vendors/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['name'], 'Acme Corp')
+
+    def test_created_parts_keep_their_links(self):
+        pump = Equipment.objects.create(name='Pump', model='M', serial='SN1')
+        etag = self.client.get('/api/parts/')['ETag']
+        created = self.client.post(
+            '/api/parts/', {'part_number': 'B-1', 'part_name': 'Bearing', 'status': 'available',
+                            'equipment': [pump.pk], 'suppliers': [self.vendor.pk]},
+            content_type='application/json',
+        ).json()
+        self.assertEqual((created['equipment'], created['suppliers']), ([pump.pk], [self.vendor.pk]))
+        self.assertEqual(created['equipment_details'], [{'id': pump.pk, 'name': 'Pump'}])
+        self.assertEqual(created['supplier_details'][0]['name'], 'Acme')
+        response = self.client.get('/api/parts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['results'][0]['equipment'], [pump.pk])
+        updated = self.client.patch(f"/api/parts/{created['id']}/", {'equipment': []}, content_type='application/json')
+        self.assertEqual((updated.json()['equipment'], updated.json()['equipment_details']), ([], []))
+
+    def test_dependent_resources_retire_etags(self):
+        part = Part.objects.create(part_number='B-1', part_name='Bearing', status='available')
+        parts_etag = self.client.get('/api/parts/')['ETag']
+        part.suppliers.add(self.vendor)
+        self.assertEqual(self.client.get('/api/parts/', HTTP_IF_NONE_MATCH=parts_etag).status_code, 200)
+
+        root = Equipment.objects.create(name='Root', model='M', serial='SN1')
+        child = Equipment.objects.create(name='Child', model='M', serial='SN2')
+        equipment_etag = self.client.get('/api/equipment/')['ETag']
+        self.client.post('/api/equipment/move/', [{'id': child.pk, 'parent': root.pk}], content_type='application/json')
+        response = self.client.get('/api/equipment/', HTTP_IF_NONE_MATCH=equipment_etag)
+        self.assertEqual(len(response.json()['results']), 1)
+
+        task = Task.objects.create(description='Oil', start_date=datetime.date(2025, 1, 1), equipment=root, task_type='maintenance')
+        schedule = Schedule.objects.create(task=task, due_date=datetime.date(2025, 1, 1))
+        self.assertEqual(self.client.get('/api/tasks/', {'has_completed': 'true'}).json()['results'], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/schedules/complete/', {'ids': [schedule.pk]}, content_type='application/json')
+        self.assertEqual(len(self.client.get('/api/tasks/', {'has_completed': 'true'}).json()['results']), 1)
+
+        history = f'/api/schedules/{schedule.pk}/history/'
+        self.assertEqual(self.client.get(history).json()['results'][0]['actor_name'], 'admin')
+        user = User.objects.get(username='admin')
+        user.username = 'chief'
+        user.save()
+        self.assertEqual(self.client.get(history).json()['results'][0]['actor_name'], 'chief')
+
+class ListApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.tech = User.objects.create_user('tech')
+        self.client.force_login(self.admin)
+        self.acme = Vendor.objects.create(name='Acme')
+        self.pump = Equipment.objects.create(name='Pump', model='M', serial='SN1', manufacturer=self.acme)
+        self.fan = Equipment.objects.create(name='Fan', model='M', serial='SN2', location_status='off-site', is_active=False)
+        self.seal = Part.objects.create(part_number='S-1', part_name='Seal', status='available')
+        self.seal.equipment.add(self.pump)
+        self.seal.suppliers.add(self.acme)
+        Part.objects.create(part_number='B-1', part_name='Belt', status='ordered').equipment.add(self.fan)
+        self.oil = Task.objects.create(
+            description='Oil', frequency='weekly', start_date=datetime.date(2025, 1, 1), equipment=self.pump,
+            task_type='maintenance', priority='high', assigned_to=self.tech,
+        )
+        self.check = Task.objects.create(
+            description='Check', start_date=datetime.date(2025, 3, 1), equipment=self.fan, task_type='calibration', priority='low',
+        )
+        self.past = Schedule.objects.create(task=self.oil, due_date=datetime.date(2025, 1, 1))
+        self.done = Schedule.objects.create(
+            task=self.oil, due_date=datetime.date(2025, 1, 8), status='completed', completion_date=datetime.date(2025, 1, 9)
+        )
+        self.future = Schedule.objects.create(task=self.check, due_date=datetime.date(2999, 1, 1))
+
+    def results(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['results']
+
+    def walk(self, url, **params):
+        pages = []
+        while url:
+            response = self.client.get(url, params)
+            params = {}
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json())
+            url = pages[-1]['next']
+        return pages
+
+    def test_keyset_pages_walk_duplicate_sort_keys(self):
+        tasks = [
+            Task.objects.create(description=f'T{n}', start_date=datetime.date(2025, 1, 1), equipment=self.pump, task_type='maintenance')
+            for n in range(7)
+        ]
+        for task in tasks:
+            Schedule.objects.create(task=task, due_date=datetime.date(2025, 2, 1))
+        expected = list(Schedule.objects.order_by('due_date', 'id').values_list('id', flat=True))
+
+        pages = self.walk('/api/schedules/', page_size=2)
+        self.assertEqual([row['id'] for page in pages for row in page['results']], expected)
+        # Positions carry (due_date, id), so no cursor needs an offset
+        for page in pages[:-1]:
+            cursor = parse_qs(urlsplit(page['next']).query)['cursor'][0]
+            self.assertNotIn('o', parse_qs(base64.b64decode(cursor).decode()))
+
+        backwards = []
+        url = pages[-1]['previous']
+        while url:
+            page = self.client.get(url).json()
+            backwards = [row['id'] for row in page['results']] + backwards
+            url = page['previous']
+        self.assertEqual(backwards + [row['id'] for row in pages[-1]['results']], expected)
+
+        bad = base64.b64encode(b'p=%5B%22x%22%2C+%221%22%5D').decode()
+        self.assertEqual(self.client.get('/api/schedules/', {'cursor': bad}).status_code, 404)
+
+    def test_sparse_fields(self):
+        rows = self.results('/api/schedules/', fields='id,due_date,is_overdue')
+        self.assertEqual({tuple(sorted(row)) for row in rows}, {('due_date', 'id', 'is_overdue')})
+        rows = self.results('/api/schedules/', expand='', fields='id,task')
+        self.assertEqual(rows[0], {'id': self.past.pk, 'task': self.oil.pk})
+        rows = self.results('/api/schedules/', fields='id,task')
+        self.assertEqual(rows[0]['task']['description'], 'Oil')
+        rows = self.results('/api/equipment/', fields='name')
+        self.assertEqual(sorted(rows, key=lambda row: row['name']), [{'name': 'Fan'}, {'name': 'Pump'}])
+
+    def test_filters(self):
+        cases = [
+            ('/api/equipment/', 'name', {'search': 'um'}, ['Pump']),
+            ('/api/equipment/', 'name', {'location_status': 'off-site'}, ['Fan']),
+            ('/api/equipment/', 'name', {'manufacturer': self.acme.pk}, ['Pump']),
+            ('/api/equipment/', 'name', {'is_active': 'false'}, ['Fan']),
+            ('/api/parts/', 'part_number', {'part_number': 's-'}, ['S-1']),
+            ('/api/parts/', 'part_number', {'status': 'ordered'}, ['B-1']),
+            ('/api/parts/', 'part_number', {'supplier': self.acme.pk}, ['S-1']),
+            ('/api/parts/', 'part_number', {'equipment': self.fan.pk}, ['B-1']),
+            ('/api/tasks/', 'description', {'priority': 'high'}, ['Oil']),
+            ('/api/tasks/', 'description', {'task_type': 'calibration'}, ['Check']),
+            ('/api/tasks/', 'description', {'frequency': 'weekly'}, ['Oil']),
+            ('/api/tasks/', 'description', {'assigned_to': self.tech.pk}, ['Oil']),
+            ('/api/tasks/', 'description', {'equipment': self.fan.pk}, ['Check']),
+            ('/api/tasks/', 'description', {'start_after': '2025-02-01'}, ['Check']),
+            ('/api/tasks/', 'description', {'start_before': '2025-02-01'}, ['Oil']),
+            ('/api/schedules/', 'id', {'status': 'completed'}, [self.done.pk]),
+            ('/api/schedules/', 'id', {'due_after': '2025-01-05'}, [self.done.pk, self.future.pk]),
+            ('/api/schedules/', 'id', {'due_before': '2025-01-05'}, [self.past.pk]),
+            ('/api/schedules/', 'id', {'completed_after': '2025-01-09'}, [self.done.pk]),
+            ('/api/schedules/', 'id', {'completed_before': '2025-01-08'}, []),
+            ('/api/schedules/', 'id', {'priority': 'low'}, [self.future.pk]),
+            ('/api/schedules/', 'id', {'task_type': 'maintenance'}, [self.past.pk, self.done.pk]),
+            ('/api/schedules/', 'id', {'assigned_to': self.tech.pk}, [self.past.pk, self.done.pk]),
+            ('/api/schedules/', 'id', {'equipment': self.fan.pk}, [self.future.pk]),
+            ('/api/schedules/', 'id', {'task': self.check.pk}, [self.future.pk]),
+            ('/api/schedules/', 'id', {'overdue': 'true'}, [self.past.pk]),
+            ('/api/schedules/', 'id', {'overdue': 'false'}, [self.done.pk, self.future.pk]),
+        ]
+        for url, key, params, expected in cases:
+            with self.subTest(url=url, **params):
+                self.assertEqual(sorted(row[key] for row in self.results(url, **params)), sorted(expected))
+        for url, param in [('/api/tasks/', 'priority'), ('/api/schedules/', 'due_after'), ('/api/equipment/', 'manufacturer')]:
+            response = self.client.get(url, {param: 'bogus'})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(param, response.json())
+
+    def test_overdue_is_computed_in_sql(self):
+        annotated = {schedule.pk: schedule.overdue for schedule in Schedule.objects.with_overdue()}
+        self.assertEqual(annotated, {self.past.pk: True, self.done.pk: False, self.future.pk: False})
+        self.assertEqual([schedule.is_overdue for schedule in Schedule.objects.order_by('id')], [True, False, False])
+        self.assertEqual(list(Schedule.objects.overdue()), [self.past])
+        rows = self.results('/api/schedules/', fields='id,is_overdue')
+        self.assertEqual({row['id']: row['is_overdue'] for row in rows}, annotated)
+        self.assertTrue(self.client.get(f'/api/schedules/{self.past.pk}/').json()['is_overdue'])
+
+    def test_updates_answer_the_new_overdue_state(self):
+        url = f'/api/schedules/{self.future.pk}/'
+        moved = self.client.patch(url, {'due_date': '2025-01-01'}, content_type='application/json')
+        self.assertEqual(moved.status_code, 200)
+        self.assertTrue(moved.json()['is_overdue'])
+        completed = self.client.patch(url, {'status': 'completed'}, content_type='application/json')
+        self.assertFalse(completed.json()['is_overdue'])
+
+class LookupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def test_equipment_lookup_returns_tree_paths(self):
+        plant = Equipment.objects.create(name='Plant', model='M', serial='SN1')
+        line = Equipment.objects.create(name='Line', model='M', serial='SN2', parent=plant)
+        Equipment.objects.create(name='Pump A', model='M', serial='SN3', parent=line)
+        Equipment.objects.create(name='Pump B', model='M', serial='SN4', parent=plant)
+        Equipment.objects.create(name='Pump C', model='M', serial='SN5', is_active=False)
+        # Session, user, matches and their ancestors
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/lookups/equipment/', {'q': 'pu'})
+        self.assertEqual(
+            [(row['name'], row['path']) for row in response.json()],
+            [('Pump A', 'Plant / Line / Pump A'), ('Pump B', 'Plant / Pump B')],
+        )
+
+    def test_prefix_search_and_limit(self):
+        for name in ['Acme', 'acorn', 'Bolt Co', 'Ace', 'Axle']:
+            Vendor.objects.create(name=name)
+        Vendor.objects.create(name='Acme Old', is_active=False)
+        response = self.client.get('/api/lookups/vendors/', {'q': 'AC', 'limit': 2})
+        self.assertEqual([row['name'] for row in response.json()], ['Ace', 'Acme'])
+        self.assertEqual(self.client.get('/api/lookups/users/').json()[0]['name'], 'admin')
+        self.assertEqual(self.client.get('/api/lookups/vendors/', {'limit': 0}).status_code, 400)
+        self.assertEqual(self.client.get('/api/lookups/vendors/', {'limit': 101}).status_code, 400)
+
+class ForecastTests(TestCase):
+    START = datetime.date(2026, 3, 4)  # A Wednesday; the window opens Monday March 2
+
+    def setUp(self):
+        cache.clear()
+        self.plant = Equipment.objects.create(name='Plant', model='M', serial='SN1')
+        self.line = Equipment.objects.create(name='Line', model='M', serial='SN2', parent=self.plant)
+        self.pump = Equipment.objects.create(name='Pump', model='M', serial='SN3', parent=self.line)
+        self.annex = Equipment.objects.create(name='Annex', model='M', serial='SN4')
+        specs = [
+            ('weekly', datetime.date(2024, 5, 6), self.pump, 'high'),
+            ('monthly', datetime.date(2025, 1, 31), self.line, 'medium'),
+            ('daily', datetime.date(2026, 4, 1), self.plant, 'low'),
+            (None, datetime.date(2026, 3, 20), self.annex, 'high'),
+            (None, datetime.date(2025, 3, 20), self.annex, 'high'),
+        ]
+        self.tasks = [
+            Task.objects.create(
+                description='Task', frequency=frequency, start_date=start_date,
+                equipment=equipment, priority=priority, task_type='maintenance'
+            )
+            for frequency, start_date, equipment, priority in specs
+        ]
+
+    def expected(self, weeks, key):
+        """Step every task with calculate_next_due_date, one date at a time."""
+        window_start = datetime.date(2026, 3, 2)
+        window_end = window_start + datetime.timedelta(weeks=weeks, days=-1)
+        counts = {}
+        for task in self.tasks:
+            due = task.start_date
+            while due is not None and due <= window_end:
+                if due >= window_start:
+                    row = counts.setdefault(key(task), [0] * weeks)
+                    row[(due - window_start).days // 7] += 1
+                due = task.calculate_next_due_date(due)
+        return counts
+
+    def test_matches_stepping_each_task(self):
+        forecast = build_forecast(self.START, weeks=30)
+        self.assertEqual(forecast['week_starts'][:2], ['2026-03-02', '2026-03-09'])
+        self.assertEqual(
+            {bucket['key']: bucket['counts'] for bucket in forecast['buckets']},
+            self.expected(30, lambda task: task.priority),
+        )
+        self.assertEqual(forecast['total'], [sum(week) for week in zip(*self.expected(30, lambda task: 0).values())])
+
+    def test_subtree_buckets(self):
+        by_tree = build_forecast(self.START, weeks=8, group_by='subtree')
+        self.assertEqual([bucket['label'] for bucket in by_tree['buckets']], ['Plant', 'Annex'])
+        self.plant.refresh_from_db()
+        below_plant = build_forecast(self.START, weeks=8, group_by='subtree', subtree=self.plant, limit=1)
+        # Tasks on the node itself form their own bucket; "other" takes the rest
+        self.assertEqual([bucket['label'] for bucket in below_plant['buckets']], ['Plant', 'Other'])
+        below_line = self.expected(8, lambda task: task.equipment in (self.line, self.pump))[True]
+        self.assertEqual(below_plant['buckets'][1]['counts'], below_line)
+
+    def test_cached_until_a_task_changes(self):
+        first = get_forecast(self.START)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_forecast(self.START), first)
+        self.tasks[0].priority = 'low'
+        self.tasks[0].save()
+        self.assertNotEqual(get_forecast(self.START)['buckets'], first['buckets'])
+
+class SubtreeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.plant = Equipment.objects.create(name='Plant', model='M', serial='SN1')
+        self.line = Equipment.objects.create(name='Line', model='M', serial='SN2', parent=self.plant)
+        self.pump = Equipment.objects.create(name='Pump', model='M', serial='SN3', parent=self.line)
+        self.annex = Equipment.objects.create(name='Annex', model='M', serial='SN4')
+        self.tasks = {
+            equip.name: Task.objects.create(
+                description=equip.name, start_date=datetime.date(2025, 1, 1), equipment=equip, task_type='maintenance'
+            )
+            for equip in [self.plant, self.line, self.pump, self.annex]
+        }
+        for task in self.tasks.values():
+            Schedule.objects.create(task=task, due_date=datetime.date(2025, 1, 1))
+            Schedule.objects.create(task=task, due_date=datetime.date(2999, 1, 1))
+        # Fitted twice inside the line's subtree, once outside it
+        self.bearing = Part.objects.create(part_number='B-1', part_name='Bearing', status='available')
+        self.bearing.equipment.add(self.line, self.pump, self.annex)
+        self.seal = Part.objects.create(part_number='S-1', part_name='Seal', status='available')
+        self.seal.equipment.add(self.annex)
+        self.plant.refresh_from_db()
+        self.line.refresh_from_db()
+
+    def names(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_lists_filter_to_the_subtree(self):
+        tasks = self.names('/api/tasks/', subtree=self.line.pk)
+        self.assertEqual(sorted(task['description'] for task in tasks), ['Line', 'Pump'])
+        schedules = self.names('/api/schedules/', subtree=self.line.pk, overdue='true', expand='task')
+        self.assertEqual(sorted(row['task']['description'] for row in schedules), ['Line', 'Pump'])
+        parts = self.names('/api/parts/', subtree=self.line.pk)
+        self.assertEqual([part['part_number'] for part in parts], ['B-1'])
+        response = self.client.get('/api/tasks/', {'subtree': 999999})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('subtree', response.json())
+
+    def test_moves_change_cached_subtree_lists(self):
+        self.assertEqual(len(self.names('/api/tasks/', subtree=self.line.pk)), 2)
+        self.client.post('/api/equipment/move/', [{'id': self.annex.pk, 'parent': self.line.pk}], content_type='application/json')
+        self.assertEqual(len(self.names('/api/tasks/', subtree=self.line.pk)), 3)
+
+    def test_rollups_sum_whole_subtrees_in_three_queries(self):
+        with self.assertNumQueries(3):
+            rows = subtree_rollups(self.plant, depth=1)
+        self.assertEqual(
+            [(row['name'], row['task_count'], row['pending_count'], row['overdue_count'], row['part_count']) for row in rows],
+            [('Plant', 3, 6, 3, 1), ('Line', 2, 4, 2, 1)],
+        )
+        response = self.client.get('/api/equipment/rollup/', {'depth': 0})
+        self.assertEqual(
+            [(row['name'], row['task_count'], row['part_count']) for row in response.json()],
+            [('Annex', 1, 2), ('Plant', 3, 1)],
+        )
+
+class TreeMoveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.plant = Equipment.objects.create(name='Plant', model='M', serial='SN1')
+        self.line = Equipment.objects.create(name='Line', model='M', serial='SN2', parent=self.plant)
+        self.pump = Equipment.objects.create(name='Pump', model='M', serial='SN3', parent=self.line)
+        self.annex = Equipment.objects.create(name='Annex', model='M', serial='SN4')
+
+    def tree(self):
+        return {
+            name: (tree_id, lft, rght, level)
+            for name, tree_id, lft, rght, level in Equipment.objects.values_list('name', 'tree_id', 'lft', 'rght', 'level')
+        }
+
+    def test_move_renumbers_the_subtree(self):
+        self.assertTrue(move_equipment(self.line, self.annex))
+        self.assertFalse(move_equipment(self.line, self.annex))
+        tree = self.tree()
+        annex_tree = tree['Annex'][0]
+        self.assertEqual(tree['Annex'], (annex_tree, 1, 6, 0))
+        self.assertEqual(tree['Line'], (annex_tree, 2, 5, 1))
+        self.assertEqual(tree['Pump'], (annex_tree, 3, 4, 2))
+        self.assertEqual(tree['Plant'][1:], (1, 2, 0))
+        self.assertNotEqual(tree['Plant'][0], annex_tree)
+        self.assertEqual(check_tree_consistency(), [])
+
+    def test_a_batch_can_move_a_node_back(self):
+        stale = timezone.now() - datetime.timedelta(hours=1)
+        Equipment.objects.update(updated_at=stale)
+        before = self.tree()
+        response = self.client.post(
+            '/api/equipment/move/',
+            [{'id': self.line.pk, 'parent': self.annex.pk}, {'id': self.line.pk, 'parent': self.plant.pk}],
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Equipment.objects.get(pk=self.line.pk).parent_id, self.plant.pk)
+        self.assertEqual(self.tree()['Pump'][1:], before['Pump'][1:])
+        self.assertEqual(check_tree_consistency(), [])
+        self.assertGreater(Equipment.objects.get(pk=self.line.pk).updated_at, stale)
+
+    def test_moves_under_a_descendant_are_rejected(self):
+        before = self.tree()
+        response = self.client.post(
+            '/api/equipment/move/',
+            [{'id': self.annex.pk, 'parent': self.plant.pk}, {'id': self.plant.pk, 'parent': self.pump.pk}],
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(f'/api/equipment/{self.line.pk}/', {'parent': self.pump.pk}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        # The whole batch rolled back, including the valid first move
+        self.assertEqual(self.tree(), before)
+        self.assertEqual(check_tree_consistency(), [])
+
+    def test_checker_reports_and_rebuilds_corrupted_trees(self):
+        self.assertEqual(check_tree_consistency(), [])
+        Equipment.objects.filter(pk=self.pump.pk).update(lft=10, rght=11, level=1)
+        problems = check_tree_consistency()
+        self.assertIn(self.pump.pk, [pk for pk, problem in problems])
+        self.assertIn((self.pump.pk, 'level is 1, expected 0'), problems)
+        with self.assertRaises(CommandError):
+            call_command('check_equipment_tree', stdout=io.StringIO())
+        call_command('check_equipment_tree', rebuild=True, stdout=io.StringIO())
+        self.assertEqual(check_tree_consistency(), [])
+        self.assertEqual(self.tree()['Pump'][1:], (3, 4, 2))
+
+class ScheduleHistoryTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin)
+        self.pump = Equipment.objects.create(name='Pump', model='M', serial='SN1')
+        self.task = Task.objects.create(
+            description='Inspect', frequency='weekly', equipment=self.pump,
+            start_date=datetime.date(2026, 1, 1), task_type='maintenance'
+        )
+
+    def test_changes_are_recorded_and_paged_newest_first(self):
+        schedule = Schedule.objects.create(task=self.task, due_date=datetime.date(2026, 1, 1))
+        technician = User.objects.create_user('tech')
+        self.client.patch(f'/api/tasks/{self.task.pk}/', {'assigned_to': technician.pk}, content_type='application/json')
+        self.client.patch(f'/api/schedules/{schedule.pk}/', {'note': 'Seal worn'}, content_type='application/json')
+        self.client.post('/api/schedules/complete/', {'ids': [schedule.pk]}, content_type='application/json')
+        self.client.patch(f'/api/schedules/{schedule.pk}/', {'status': 'pending'}, content_type='application/json')
+
+        self.assertNotIn('note', self.client.get(f'/api/schedules/{schedule.pk}/').json())
+        page = self.client.get(f'/api/schedules/{schedule.pk}/history/', {'page_size': 3}).json()
+        self.assertEqual([event['kind'] for event in page['results']], ['status', 'completed', 'note'])
+        self.assertEqual(page['results'][0]['actor_name'], 'admin')
+        older = self.client.get(page['next']).json()['results']
+        self.assertEqual([(e['kind'], e['to_value']) for e in older], [('reassigned', 'tech')])
+        self.assertEqual(self.client.get('/api/schedules/999/history/').status_code, 404)
+
+    def one_off(self, due):
+        task = Task.objects.create(description='Repair', equipment=self.pump, start_date=due, task_type='maintenance')
+        return Schedule.objects.create(task=task, due_date=due)
+
+    def test_stats_aggregate_completion_events(self):
+        for due, late_days in [(1, 0), (8, 2), (15, 1)]:
+            schedule = self.one_off(datetime.date(2026, 3, due))
+            complete_schedules([schedule.pk], datetime.date(2026, 3, due + late_days))
+        stats = self.client.get('/api/schedules/stats/').json()
+        self.assertEqual((stats['completions'], stats['late_completions']), (3, 2))
+        self.assertEqual(stats['mean_latency_days'], 1.0)  # 0, 2 and 1 days late
+        self.assertEqual(stats['mtbf_days'], 7.5)  # Done March 1, 10 and 16: two gaps over 15 days
+        self.assertEqual(stats['equipment'], [{'equipment': self.pump.pk, 'name': 'Pump', 'completions': 3, 'mtbf_days': 7.5}])
+
+    def test_stats_use_the_recorded_completion_date(self):
+        # Both completions are entered today, long after the work was done
+        for due, done in [(1, 3), (8, 7)]:
+            schedule = self.one_off(datetime.date(2026, 3, due))
+            complete_schedules([schedule.pk], datetime.date(2026, 3, done))
+        stats = self.client.get('/api/schedules/stats/').json()
+        self.assertEqual((stats['late_completions'], stats['mean_latency_days'], stats['mtbf_days']), (1, 0.5, 4.0))
+        in_march = self.client.get('/api/schedules/stats/', {'start': '2026-03-01', 'end': '2026-03-31'}).json()
+        self.assertEqual(in_march['completions'], 2)
+
+class ReminderTests(TestCase):
+    TODAY = datetime.date(2026, 3, 4)
+
+    def setUp(self):
+        self.tech = User.objects.create_user('tech', 'tech@example.com')
+        self.other = User.objects.create_user('other', 'other@example.com')
+        pump = Equipment.objects.create(name='Pump', model='M', serial='SN1')
+        self.schedules = {}
+        for name, user, due in [
+            ('overdue', self.tech, datetime.date(2026, 3, 3)),
+            ('soon', self.tech, datetime.date(2026, 3, 6)),
+            ('later', self.tech, datetime.date(2026, 3, 20)),
+            ('stale', self.tech, datetime.date(2026, 1, 1)),
+            ('unassigned', None, datetime.date(2026, 3, 5)),
+            ('colleague', self.other, datetime.date(2026, 3, 5)),
+        ]:
+            task = Task.objects.create(
+                description=name, start_date=due, equipment=pump, task_type='maintenance', assigned_to=user
+            )
+            self.schedules[name] = Schedule.objects.create(task=task, due_date=due)
+
+    def test_digests_go_out_once_per_threshold(self):
+        result = send_reminders(self.TODAY, lead_days=3)
+        self.assertEqual(result, {'digests': 2, 'reminders': 3, 'failed': 0})
+        digest = next(message for message in mail.outbox if message.to == ['tech@example.com'])
+        self.assertIn('1 due soon, 1 overdue', digest.subject)
+        self.assertNotIn('stale', digest.body)
+
+        self.assertEqual(send_reminders(self.TODAY, lead_days=3)['reminders'], 0)
+        # Later runs add only what crossed a threshold in between
+        result = send_reminders(self.TODAY + datetime.timedelta(days=2), lead_days=3)
+        self.assertEqual(result, {'digests': 1, 'reminders': 1, 'failed': 0})
+        self.assertEqual(mail.outbox[-1].to, ['other@example.com'])
+        self.assertIn('colleague', mail.outbox[-1].body)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failed_digests_are_retried(self):
+        class FlakyBackend(EmailBackend):
+            async def send(self, digest):
+                if digest['username'] == 'tech':
+                    raise ConnectionError('SMTP down')
+                await super().send(digest)
+
+        with self.assertLogs('cmms.reminders', 'ERROR'):
+            self.assertEqual(send_reminders(self.TODAY, lead_days=3, backend=FlakyBackend())['failed'], 1)
+        self.assertEqual([message.to for message in mail.outbox], [['other@example.com']])
+        result = send_reminders(self.TODAY + datetime.timedelta(days=1), lead_days=3)
+        self.assertEqual(result, {'digests': 1, 'reminders': 2, 'failed': 0})
+        self.assertIn('overdue', mail.outbox[-1].body)
+
+    def test_late_additions_and_reassignments_are_reminded(self):
+        send_reminders(self.TODAY, lead_days=3)
+        task = self.schedules['soon'].task
+        Schedule.objects.create(task=task, due_date=datetime.date(2026, 3, 5))
+        Task.objects.filter(pk=self.schedules['colleague'].task_id).update(assigned_to=self.tech)
+        self.assertEqual(send_reminders(self.TODAY, lead_days=3), {'digests': 1, 'reminders': 2, 'failed': 0})
+        self.assertIn('colleague', mail.outbox[-1].body)
+
+    def test_overlapping_runs_are_refused(self):
+        with run_lock():
+            with self.assertRaises(RunInProgress):
+                send_reminders(self.TODAY, lead_days=3)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(send_reminders(self.TODAY, lead_days=3)['reminders'], 3)
+
+class EventStreamTests(TestCase):
+    def setUp(self):
+        self.broker = events.get_broker()
+        self.start = self.broker.last_id
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.pump = Equipment.objects.create(name='Pump', model='M', serial='SN1')
+        self.task = Task.objects.create(description='Oil', start_date=datetime.date(2025, 1, 1), equipment=self.pump, task_type='maintenance')
+        self.schedule = Schedule.objects.create(task=self.task, due_date=datetime.date(2025, 1, 1))
+
+    def published(self):
+        return [(event['type'], event['data']) for event in self.broker.recent if event['id'] > self.start]
+
+    def test_committed_changes_are_published(self):
+        tech = User.objects.create_user('tech')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/schedules/complete/', {'ids': [self.schedule.pk]}, content_type='application/json')
+            self.client.patch(f'/api/tasks/{self.task.pk}/', {'assigned_to': tech.pk}, content_type='application/json')
+            self.client.patch(f'/api/equipment/{self.pump.pk}/', {'description': 'Rebuilt'}, content_type='application/json')
+            self.client.patch(f'/api/equipment/{self.pump.pk}/', {'location_status': 'off-site'}, content_type='application/json')
+        self.assertEqual(self.published(), [
+            ('schedule.completed', {'ids': [self.schedule.pk], 'completion_date': timezone.now().date().isoformat()}),
+            ('task.assigned', {'task': self.task.pk, 'assigned_to': tech.pk, 'previous': None}),
+            ('equipment.location', {'equipment': self.pump.pk, 'location_status': 'off-site', 'expected_return_date': None}),
+        ])
+
+    def test_events_wait_for_the_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.client.post('/api/schedules/complete/', {'ids': [self.schedule.pk]}, content_type='application/json')
+        self.assertEqual(self.published(), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual([kind for kind, _ in self.published()], ['schedule.completed'])
+
+    async def test_stream_replays_then_follows_live_events(self):
+        self.broker.publish('task.assigned', {'task': 1})
+        client = AsyncClient()
+        await client.aforce_login(await User.objects.aget(username='admin'))
+        response = await client.get('/api/events/', headers={'Last-Event-ID': str(self.start)})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = []
+
+        async def read():
+            async for chunk in response:
+                chunks.append(chunk.decode())
+
+        reader = asyncio.ensure_future(read())
+        while len(chunks) < 2:
+            await asyncio.sleep(0)
+        self.broker.publish('schedule.completed', {'ids': [2]})
+        while len(chunks) < 3:
+            await asyncio.sleep(0)
+        # A client hanging up cancels the response, which unsubscribes it
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+        self.assertEqual(chunks[0], 'retry: 3000\n\n')
+        self.assertEqual(chunks[1], f'id: {self.start + 1}\nevent: task.assigned\ndata: {{"task": 1}}\n\n')
+        self.assertIn('event: schedule.completed', chunks[2])
+        self.assertEqual(self.broker.subscribers, set())
+
+    async def test_clients_behind_the_buffer_are_reset(self):
+        self.broker.publish('task.assigned', {'task': 1})
+        client = AsyncClient()
+        await client.aforce_login(await User.objects.aget(username='admin'))
+        response = await client.get('/api/events/', {'last_event_id': 1})
+        chunks = aiter(response)
+        await anext(chunks)
+        self.assertIn('event: reset', (await anext(chunks)).decode())
+        anonymous = await AsyncClient().get('/api/events/')
+        self.assertEqual(anonymous.status_code, 403)
+
+    async def test_streaming_is_offered_only_under_asgi(self):
+        client = AsyncClient()
+        self.assertEqual((await client.head('/api/events/')).status_code, 200)
+        # The test client goes through the WSGI handler
+        self.assertEqual((await sync_to_async(self.client.head)('/api/events/')).status_code, 501)
+        self.assertEqual((await sync_to_async(self.client.get)('/api/events/')).status_code, 501)
+
+class AsyncReadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        plant = Equipment.objects.create(name='Plant', model='M', serial='SN1')
+        pump = Equipment.objects.create(name='Pump', model='M', serial='SN2', parent=plant)
+        task = Task.objects.create(description='Oil', start_date=datetime.date(2025, 1, 1), equipment=pump, task_type='maintenance')
+        Schedule.objects.create(task=task, due_date=datetime.date(2025, 1, 1), status='completed', completion_date=datetime.date(2025, 1, 3))
+        for day in range(2, 6):
+            Schedule.objects.create(task=task, due_date=datetime.date(2025, 1, day))
+
+    def test_async_twins_answer_like_the_drf_views(self):
+        for path, params in [
+            ('schedules/', {'status': 'pending', 'page_size': 2, 'fields': 'id,due_date,is_overdue'}),
+            ('dashboard/summary/', {'start': '2025-01-02'}),
+            ('lookups/equipment/', {'q': 'pu'}),
+        ]:
+            expected = self.client.get(f'/api/{path}', params).content
+            response = self.client.get(f'/api/async/{path}', params)
+            self.assertEqual(response.status_code, 200)
+            # Page links point back at the route that served them
+            self.assertEqual(response.content.replace(b'/api/async/', b'/api/'), expected)
+        page = self.client.get('/api/async/schedules/', {'page_size': 3}).json()
+        self.assertEqual(len(self.client.get(page['next']).json()['results']), 2)
+
+    def test_errors_and_conditional_responses(self):
+        self.assertEqual(self.client.get('/api/async/schedules/', {'status': 'lost'}).json(), {'status': ['"lost" is not a valid choice.']})
+        self.assertEqual(self.client.get('/api/async/dashboard/summary/', {'subtree': 999}).status_code, 400)
+        self.assertEqual(self.client.get('/api/async/schedules/', {'cursor': 'bogus'}).status_code, 404)
+        first = self.client.get('/api/async/lookups/equipment/')
+        with self.assertNumQueries(2):
+            not_modified = self.client.get('/api/async/lookups/equipment/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/async/schedules/').status_code, 403)
+
+    async def test_async_orm_summary_matches(self):
+        subtree = await Equipment.objects.aget(name='Pump')
+        summary = await abuild_summary(subtree=subtree)
+        expected = await sync_to_async(build_summary)(subtree=subtree)
+        summary.pop('generated_at'), expected.pop('generated_at')
+        self.assertEqual(summary, expected)
+
+# 'lagging' is not a configured database, so a read routed to it raises
+# ConnectionDoesNotExist and shows where the router sent it
+@override_settings(CMMS_READ_REPLICA='lagging')
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin)
+        self.vendor = Vendor.objects.create(name='Acme')
+        # Writes older than the pin window
+        cache.clear()
+        cache.set_many({f'cmms:version:{resource}': 1 for resource in ['vendor', 'task', 'schedule']}, None)
+
+    def test_list_reads_use_the_replica_until_the_client_writes(self):
+        for path in ['/api/vendors/', '/api/tasks/', '/api/async/schedules/']:
+            with self.assertRaises(ConnectionDoesNotExist):
+                self.client.get(path)
+        self.assertEqual(self.client.get(f'/api/vendors/{self.vendor.pk}/').status_code, 200)
+        self.client.patch(f'/api/vendors/{self.vendor.pk}/', {'name': 'Acme Corp'}, content_type='application/json')
+        self.assertIn(PIN_COOKIE, self.client.cookies)
+        self.assertEqual(self.client.get('/api/tasks/').status_code, 200)
+        self.assertEqual(self.client.get('/api/async/schedules/').status_code, 200)
+
+    def test_fresh_writes_are_read_from_the_primary_by_everyone(self):
+        # A Basic-auth writer is pinned too
+        credentials = 'Basic ' + base64.b64encode(b'admin:password').decode()
+        writer = Client(HTTP_AUTHORIZATION=credentials)
+        writer.patch(f'/api/vendors/{self.vendor.pk}/', {'name': 'Acme Corp'}, content_type='application/json')
+        self.assertIn(PIN_COOKIE, writer.cookies)
+        # Other clients read the vendors just written, and cache, from the primary
+        User.objects.create_superuser('other', 'other@example.com', 'password')
+        reader = Client(HTTP_AUTHORIZATION='Basic ' + base64.b64encode(b'other:password').decode())
+        self.assertEqual(reader.get('/api/vendors/').json()['results'][0]['name'], 'Acme Corp')
+        with self.assertRaises(ConnectionDoesNotExist):
+            reader.get('/api/tasks/')
+
+    def test_router(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Vendor), 'default')
+        self.assertFalse(router.allow_migrate('lagging', 'cmms'))
+        request = RequestFactory().get('/')
+        request.user = self.admin
+        with replica_reads(request):
+            self.assertEqual(router.db_for_read(Vendor), 'lagging')
+            self.assertEqual(router.db_for_write(Vendor), 'default')
+        # A replica that is the primary under another name, like a test mirror
+        with override_settings(CMMS_READ_REPLICA='default'):
+            self.assertIsNone(replica_alias())
+            with replica_reads(request):
+                self.assertEqual(router.db_for_read(Vendor), 'default')
+
+class SyncTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.vendor = Vendor.objects.create(name='Acme')
+        Vendor.objects.create(name='Bolt Co')
+        self.pump = Equipment.objects.create(name='Pump', model='M', serial='SN1')
+        self.part = Part.objects.create(part_number='B-1', part_name='Bearing', status='available')
+        self.task = Task.objects.create(
+            description='Inspect', equipment=self.pump, start_date=datetime.date(2026, 1, 1), task_type='maintenance'
+        )
+        self.schedule = Schedule.objects.create(task=self.task, due_date=datetime.date(2026, 1, 1))
+        # Age everything past the overlap window a fresh token still re-sends
+        hour_ago = timezone.now() - datetime.timedelta(hours=1)
+        for model in (Vendor, Equipment, Task, Schedule):
+            model.objects.update(updated_at=hour_ago)
+        Part.objects.update(last_updated=hour_ago)
+
+    def sync(self, **params):
+        response = self.client.get('/api/sync/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_only_changes_since_the_token_are_returned(self):
+        first = self.sync()
+        self.assertEqual(len(first['changes']['vendors']), 2)
+        self.assertFalse(first['more'])
+
+        self.vendor.name = 'Acme Corp'
+        self.vendor.save()
+        self.pump.parts.add(self.part)
+        task_pk, schedule_pk = self.task.pk, self.schedule.pk
+        self.task.delete()
+        second = self.sync(since=first['token'])
+        self.assertEqual([row['name'] for row in second['changes']['vendors']], ['Acme Corp'])
+        self.assertEqual(second['changes']['parts'][0]['equipment'], [self.pump.pk])
+        self.assertEqual(second['changes']['equipment'], [])
+        self.assertEqual(second['deleted']['tasks'], [task_pk])
+        self.assertEqual(second['deleted']['schedules'], [schedule_pk])
+
+    def test_pages_follow_the_token(self):
+        vendors, page = [], {'more': True, 'token': None}
+        while page['more']:
+            page = self.sync(limit=1, **({'since': page['token']} if page['token'] else {}))
+            vendors += [row['id'] for row in page['changes']['vendors']]
+        self.assertEqual(sorted(vendors), sorted(Vendor.objects.values_list('pk', flat=True)))
+        self.assertEqual(self.client.get('/api/sync/', {'since': 'garbage'}).status_code, 400)
+
+    def test_cascaded_tombstones_are_inserted_together(self):
+        Schedule.objects.bulk_create(
+            Schedule(task=self.task, due_date=datetime.date(2026, 2, day)) for day in range(1, 6)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.delete(f'/api/tasks/{self.task.pk}/').status_code, 204)
+        table = DeletedRecord._meta.db_table
+        self.assertEqual(sum(f'INSERT INTO "{table}"' in query['sql'] for query in queries), 1)
+        deleted = self.sync()['deleted']
+        self.assertEqual(deleted['tasks'], [self.task.pk])
+        self.assertEqual(len(deleted['schedules']), 6)
+
+class TransferTests(TestCase):
+    EQUIPMENT_CSV = (
+        "name,model,serial,parent,manufacturer\n"
+        "Pump,P-1,SN-2,SN-1,Acme\n"  # Children may precede their parents
+        "Skid,S-1,SN-1,,\n"
+        "Seal,X-1,SN-3,SN-2,\n"
+    )
+
+    def setUp(self):
+        Vendor.objects.create(name='Acme')
+
+    def test_equipment_round_trip(self):
+        created = import_rows('equipment', io.StringIO(self.EQUIPMENT_CSV), 'csv', batch_size=2)
+        self.assertEqual(created, 3)
+        self.assertEqual(check_tree_consistency(), [])
+        seal = Equipment.objects.get(serial='SN-3')
+        self.assertEqual((seal.parent.serial, seal.level), ('SN-2', 2))
+        self.assertEqual(seal.parent.manufacturer.name, 'Acme')
+
+        exported = ''.join(render_rows('equipment', 'jsonl', export_rows('equipment')))
+        Equipment.objects.all().delete()
+        import_rows('equipment', io.StringIO(exported), 'jsonl')
+        self.assertEqual(Equipment.objects.get(serial='SN-3').get_root().serial, 'SN-1')
+
+    def test_only_touched_trees_are_renumbered(self):
+        zed = Equipment.objects.create(name='Zed', model='M', serial='SN-Z')
+        alpha = Equipment.objects.create(name='Alpha', model='M', serial='SN-A')
+        zed_child = Equipment.objects.create(name='Zed child', model='M', serial='SN-ZC', parent=zed)
+        rows = "name,model,serial,parent\nValve,V-1,SN-V,SN-ZC\nBelt,B-1,SN-B,SN-Z\nNew,N-1,SN-N,\nLeaf,L-1,SN-L,SN-N\n"
+        import_rows('equipment', io.StringIO(rows), 'csv', batch_size=2)
+        self.assertEqual(check_tree_consistency(), [])
+        trees = dict(Equipment.objects.values_list('serial', 'tree_id'))
+        # A full rebuild would renumber the roots by name
+        self.assertEqual((trees['SN-Z'], trees['SN-A']), (zed.tree_id, alpha.tree_id))
+        self.assertEqual({trees[serial] for serial in ('SN-ZC', 'SN-V', 'SN-B')}, {zed.tree_id})
+        self.assertEqual(trees['SN-N'], trees['SN-L'])
+        self.assertGreater(trees['SN-N'], alpha.tree_id)
+        self.assertEqual(
+            list(Equipment.objects.filter(tree_id=zed.tree_id).order_by('lft').values_list('name', 'level')),
+            [('Zed', 0), ('Belt', 1), ('Zed child', 1), ('Valve', 2)],
+        )
+        self.assertEqual(Equipment.objects.get(pk=zed_child.pk).get_root(), zed)
+
+    def test_bad_rows_roll_back(self):
+        bad = self.EQUIPMENT_CSV + ",V-1,SN-4,,\nFilter,F-1,SN-5,,Nobody\n"
+        with self.assertRaises(ImportFailed) as failure:
+            import_rows('equipment', io.StringIO(bad), 'csv')
+        self.assertEqual([error['line'] for error in failure.exception.errors], [5, 6])
+        self.assertFalse(Equipment.objects.exists())
+
+    def test_parts_resolve_natural_keys(self):
+        import_rows('equipment', io.StringIO(self.EQUIPMENT_CSV), 'csv')
+        rows = "part_number,part_name,status,equipment,suppliers\nB-1,Bearing,available,SN-1|SN-2,Acme\n"
+        import_rows('parts', io.StringIO(rows), 'csv')
+        part = Part.objects.get(part_number='B-1')
+        self.assertEqual(sorted(part.equipment.values_list('serial', flat=True)), ['SN-1', 'SN-2'])
+        self.assertEqual(list(part.suppliers.values_list('name', flat=True)), ['Acme'])
+
+class SeedDataTests(TestCase):
+    OPTIONS = {
+        'vendors': 5, 'equipment': 40, 'depth': 3, 'fan_out': 3,
+        'parts': 60, 'tasks': 25, 'schedules': 200, 'seed': 7, 'chunk_size': 16,
+    }
+
+    def snapshot(self):
+        return (
+            list(Equipment.objects.order_by('tree_id', 'lft').values_list('name', 'level', 'parent__name')),
+            list(Schedule.objects.order_by('task__description', 'due_date').values_list('task__description', 'due_date', 'status')),
+        )
+
+    def test_scaled_seed_is_consistent_and_reproducible(self):
+        call_command('seed_data', stdout=io.StringIO(), **self.OPTIONS)
+        self.assertEqual(check_tree_consistency(), [])
+        self.assertEqual(Equipment.objects.filter(level=2).count(), 27)
+        self.assertEqual(
+            [model.objects.count() for model in (Vendor, Equipment, Part, Task, Schedule)],
+            [5, 40, 60, 25, 200]
+        )
+        first = self.snapshot()
+        seeded = {name: set(model.objects.values_list('pk', flat=True)) for model, name in RESOURCE_NAMES.items()}
+        call_command('seed_data', stdout=io.StringIO(), **self.OPTIONS)
+        self.assertEqual(self.snapshot(), first)
+        # Sync clients are told about every row the reseed removed
+        for name, pks in seeded.items():
+            self.assertEqual(set(DeletedRecord.objects.filter(resource=name).values_list('object_id', flat=True)), pks)
+
+@override_settings(CMMS_PROFILING={'SAMPLE_RATE': 1.0, 'DUPLICATE_THRESHOLD': 2})
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        reset_metrics()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        root = Equipment.objects.create(name='Root', model='M', serial='SN0')
+        for i in range(3):
+            Equipment.objects.create(name=f'Child {i}', model='M', serial=f'SN{i + 1}', parent=root)
+
+    def test_sampled_requests_are_timed_and_aggregated(self):
+        response = self.client.get('/api/equipment/')
+        self.assertRegex(response['Server-Timing'], r'total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", serialize;dur=')
+
+        metrics = self.client.get('/api/metrics/').json()
+        stats = metrics['views']['equipment-list']
+        self.assertEqual(stats['requests'], 1)
+        self.assertEqual(sum(bucket['count'] for bucket in stats['histogram']), 1)
+        self.assertGreater(stats['mean_serializer_ms'], 0)
+
+    async def test_async_requests_are_profiled(self):
+        client = AsyncClient()
+        await client.aforce_login(await User.objects.aget(username='admin'))
+        response = await client.get('/api/async/lookups/equipment/', {'q': 'Ch'})
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    def test_repeated_queries_are_reported(self):
+        profile = RequestProfile()
+        with connection.execute_wrapper(profile):
+            for equipment in Equipment.objects.all():
+                equipment.parts.count()
+        duplicates = profile.duplicates(2)
+        self.assertEqual(list(duplicates.values()), [4])
+
+        stats = ViewStats([10, 100])
+        stats.add(12.0, profile, 100, duplicates, max_patterns=5)
+        report = stats.as_dict()
+        self.assertEqual([bucket['count'] for bucket in report['histogram']], [0, 1, 0])
+        self.assertEqual(report['duplicate_queries'][0]['max_per_request'], 4)
+
+class ScheduleGenerationTests(TestCase):
+    def setUp(self):
+        pump = Equipment.objects.create(name='Pump', model='M', serial='SN1')
+        for n, frequency in enumerate(['weekly', 'monthly', 'weekly']):
+            Task.objects.create(
+                description=f'T{n}', frequency=frequency, start_date=datetime.date(2025, 1, 1), equipment=pump, task_type='maintenance'
+            )
+        self.horizon = timezone.now().date() + datetime.timedelta(weeks=8)
+
+    def rows(self):
+        return sorted(Schedule.objects.values_list('task', 'due_date'))
+
+    def test_reruns_add_nothing(self):
+        self.assertGreater(generate_schedules(self.horizon), 0)
+        first = self.rows()
+        self.assertEqual(generate_schedules(self.horizon), 0)
+        self.assertEqual(self.rows(), first)
+
+    def test_an_interrupted_run_resumes(self):
+        generate_schedules(self.horizon)
+        expected = self.rows()
+        Schedule.objects.all().delete()
+        insert = Schedule.objects.bulk_create
+        calls = []
+
+        def fail_second_chunk(objs, **kwargs):
+            calls.append(objs)
+            if len(calls) == 2:
+                raise DatabaseError('connection lost')
+            return insert(objs, **kwargs)
+
+        with mock.patch.object(Schedule.objects, 'bulk_create', side_effect=fail_second_chunk):
+            with self.assertRaises(DatabaseError):
+                generate_schedules(self.horizon, chunk_size=1)
+        self.assertEqual(self.rows(), sorted((s.task_id, s.due_date) for s in calls[0]))
+        generate_schedules(self.horizon)
+        self.assertEqual(self.rows(), expected)
+
+    def test_overlapping_runs_insert_each_occurrence_once(self):
+        insert = Schedule.objects.bulk_create
+
+        def race(objs, **kwargs):
+            # Another run inserts the same occurrences after this one planned them
+            insert([Schedule(task_id=s.task_id, due_date=s.due_date, status='pending') for s in objs])
+            return insert(objs, **kwargs)
+
+        with mock.patch.object(Schedule.objects, 'bulk_create', side_effect=race):
+            submitted = generate_schedules(self.horizon)
+        self.assertEqual(len(set(self.rows())), submitted)
+        self.assertEqual(Schedule.objects.count(), submitted)
+
+class CompletionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin)
+        pump = Equipment.objects.create(name='Pump', model='M', serial='SN1')
+        self.task = Task.objects.create(description='Oil', frequency='weekly', start_date=datetime.date(2025, 1, 1), equipment=pump, task_type='maintenance')
+
+    def follow_ups(self):
+        return Schedule.objects.filter(task=self.task, due_date__gt=datetime.date(2025, 1, 1))
+
+    def test_repeated_completion_creates_one_follow_up(self):
+        schedule = Schedule.objects.create(task=self.task, due_date=datetime.date(2025, 1, 1))
+        self.assertEqual(complete_schedules([schedule.pk]), [schedule.pk])
+        self.assertEqual(complete_schedules([schedule.pk]), [])
+        self.assertEqual(complete_schedules([schedule.pk, schedule.pk]), [])
+        self.assertEqual(list(self.follow_ups().values_list('due_date', 'status')), [(datetime.date(2025, 1, 8), 'pending')])
+
+    def test_bulk_complete_reports_mixed_ids(self):
+        pending = Schedule.objects.create(task=self.task, due_date=datetime.date(2025, 1, 1))
+        done = Schedule.objects.create(task=self.task, due_date=datetime.date(2024, 12, 25), status='completed')
+        unknown = pending.pk + done.pk + 100
+        response = self.client.post(
+            '/api/schedules/complete/', {'ids': [pending.pk, done.pk, unknown]}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'completed': [pending.pk], 'skipped': sorted([done.pk, unknown])})
+        self.assertEqual(self.follow_ups().count(), 1)
+
+    def test_admin_creates_follow_up_for_completed_schedule(self):
+        model_admin = site._registry[Schedule]
+        request = RequestFactory().post('/admin/')
+        request.user = self.admin
+        form = model_admin.get_form(request)({
+            'task': self.task.pk, 'due_date': '2025-01-01', 'status': 'completed', 'completion_date': '2025-01-02',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        schedule = form.save(commit=False)
+        model_admin.save_model(request, schedule, form, False)
+        self.assertEqual((schedule.status, schedule.completion_date), ('completed', datetime.date(2025, 1, 2)))
+        self.assertEqual(list(self.follow_ups().values_list('due_date', flat=True)), [datetime.date(2025, 1, 8)])
+
+@unittest.skipUnless(connection.features.has_select_for_update, 'needs row locks')
+class ConcurrentCompletionTests(TransactionTestCase):
+    def test_concurrent_completions_create_one_follow_up(self):
+        pump = Equipment.objects.create(name='Pump', model='M', serial='SN1')
+        task = Task.objects.create(description='Oil', frequency='weekly', start_date=datetime.date(2025, 1, 1), equipment=pump, task_type='maintenance')
+        schedule = Schedule.objects.create(task=task, due_date=datetime.date(2025, 1, 1))
+        barrier = threading.Barrier(4)
+        results = []
+
+        def complete():
+            barrier.wait()
+            try:
+                results.append(complete_schedules([schedule.pk]))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=complete) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(results), [[], [], [], [schedule.pk]])
+        self.assertEqual(Schedule.objects.filter(task=task).count(), 2)
+
+class AdminTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.vendor = Vendor.objects.create(name='Acme')
+        self.pump = Equipment.objects.create(name='Pump', model='M', serial='SN1')
+
+    def request(self):
+        request = RequestFactory().get('/admin/')
+        request.user = self.admin
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        return request
+
+    def add_parts(self, count):
+        for number in range(Part.objects.count(), Part.objects.count() + count):
+            part = Part.objects.create(part_number=f'P{number}', part_name='Seal', status='in stock')
+            part.equipment.add(self.pump)
+            part.suppliers.add(self.vendor)
+
+    def part_rows(self):
+        model_admin = site._registry[Part]
+        changelist = model_admin.get_changelist_instance(self.request())
+        return [(model_admin.get_equipment(part), model_admin.get_suppliers(part)) for part in changelist.result_list]
+
+    def test_part_changelist_queries_do_not_grow_with_rows(self):
+        self.add_parts(2)
+        with CaptureQueriesContext(connection) as few:
+            self.part_rows()
+        self.add_parts(5)
+        with CaptureQueriesContext(connection) as more:
+            rows = self.part_rows()
+        self.assertEqual(len(more), len(few))
+        self.assertEqual(rows[0], ('Pump', 'Acme'))
+
+    def test_schedule_search(self):
+        model_admin = site._registry[Schedule]
+        fan = Equipment.objects.create(name='Fan', model='M', serial='SN2')
+        for equipment, description in [(self.pump, 'Oil seals'), (fan, 'Check belts'), (fan, 'Oil bearing')]:
+            task = Task.objects.create(description=description, start_date=datetime.date(2025, 1, 1), equipment=equipment, task_type='maintenance')
+            Schedule.objects.create(task=task, due_date=datetime.date(2025, 1, 1))
+
+        def search(q):
+            request = RequestFactory().get('/admin/', {'q': q})
+            request.user = self.admin
+            return sorted(schedule.task.description for schedule in model_admin.get_changelist_instance(request).result_list)
+
+        self.assertEqual(search('oil'), ['Oil bearing', 'Oil seals'])
+        self.assertEqual(search('fan'), ['Check belts', 'Oil bearing'])
+        # Prefixes only, so the pattern indexes can serve the search
+        self.assertEqual(search('seals'), [])
+
+    def test_bulk_actions(self):
+        self.add_parts(3)
+        before = Part.objects.get(part_number='P0').last_updated
+        site._registry[Part].deactivate(self.request(), Part.objects.filter(part_number__in=['P0', 'P1']))
+        self.assertEqual(list(Part.objects.filter(is_active=False).order_by('part_number').values_list('part_number', flat=True)), ['P0', 'P1'])
+        self.assertGreater(Part.objects.get(part_number='P0').last_updated, before)
+
+        task = Task.objects.create(description='Oil', frequency='weekly', start_date=datetime.date(2025, 1, 1), equipment=self.pump, task_type='maintenance')
+        for day in (1, 2):
+            Schedule.objects.create(task=task, due_date=datetime.date(2025, 1, day))
+        site._registry[Schedule].complete(self.request(), Schedule.objects.all())
+        self.assertEqual(Schedule.objects.filter(status='completed').count(), 2)
+        self.assertEqual(Schedule.objects.filter(status='pending').count(), 2)  # Follow-ups
@@ -0,0 +1,401 @@
+"""
+Streaming bulk import and export of vendors, equipment and parts.
+
+Files are CSV with a header row or JSON Lines. Relations use natural keys
+rather than database IDs, so an export from one install loads into another:
+equipment names its parent by serial and its vendors by name, and parts list
+equipment serials and supplier names (``|``-separated in CSV). Rows are
+validated and written a batch at a time inside one transaction, so a file
+with a bad row changes nothing.
+"""
+import csv
+import json
+from abc import ABCMeta, abstractmethod
+from django.db import transaction
+from django.db.models import F, Max, Prefetch
+from .caching import invalidate_after_bulk
+from .models import Vendor, Equipment, Part
+from .serializers import VendorImportSerializer, EquipmentImportSerializer, PartImportSerializer
+from .trees import rebuild_trees
+from .utils import chunks
+
+FORMATS = {'csv': 'csv', 'jsonl': 'jsonl', 'ndjson': 'jsonl'}
+CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+DEFAULT_BATCH_SIZE = 1000
+MAX_ERRORS = 100  # Stop validating once this many rows have failed
+LIST_SEPARATOR = '|'
+
+class ImportFailed(Exception):
+    """Raised with per-line errors when any row of an import is rejected."""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} rows failed to import")
+        self.errors = errors
+
+def guess_format(filename):
+    """Import/export format implied by a file name, or ``None``."""
+    return FORMATS.get(filename.rsplit('.', 1)[-1].lower()) if '.' in filename else None
+
+def read_rows(stream, file_format):
+    """Yield ``(line_number, row)`` pairs from a text stream, skipping empty values."""
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if key and value != ''}
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            raise ImportFailed([{'line': number, 'errors': {'non_field_errors': [f"Invalid JSON: {exc}"]}}])
+        if isinstance(row, dict):
+            row = {key: value for key, value in row.items() if value not in ('', None)}
+        yield number, row
+
+class Importer(metaclass=ABCMeta):
+    """
+    Validates rows with ``serializer_class`` and bulk-creates them in batches.
+
+    Subclasses build model instances in ``write_batch`` and can link rows to
+    each other once everything is inserted in ``finish``.
+    """
+    serializer_class = None
+    list_fields = ()
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.errors = []
+        self.created = 0
+        self.vendors = {}
+
+    def run(self, rows):
+        for batch in chunks(rows, self.batch_size):
+            valid = self.validate(batch)
+            if len(self.errors) >= MAX_ERRORS:
+                break
+            if not self.errors:
+                self.write_batch(valid)
+        if not self.errors:
+            self.finish()
+        if self.errors:
+            raise ImportFailed(sorted(self.errors, key=lambda error: error["line"])[:MAX_ERRORS])
+        return self.created
+
+    def validate(self, batch):
+        valid = []
+        for line, row in batch:
+            if isinstance(row, dict):
+                for name in self.list_fields:
+                    if isinstance(row.get(name), str):
+                        row[name] = [value.strip() for value in row[name].split(LIST_SEPARATOR) if value.strip()]
+            serializer = self.serializer_class(data=row)
+            if serializer.is_valid():
+                valid.append((line, serializer.validated_data))
+            else:
+                self.errors.append({'line': line, 'errors': serializer.errors})
+        return self.resolve(valid)
+
+    def resolve(self, rows):
+        """Look up referenced rows for a batch; drop and report unresolvable ones."""
+        return rows
+
+    def error(self, line, field, message):
+        self.errors.append({'line': line, 'errors': {field: [message]}})
+
+    def resolve_vendors(self, rows, fields):
+        """Map vendor names in ``fields`` to primary keys with one query per batch."""
+        names = {name for _, data in rows for field in fields for name in _as_list(data.get(field))}
+        missing = names - self.vendors.keys()
+        if missing:
+            # Vendor names are not unique; the oldest vendor wins
+            for name, pk in Vendor.objects.filter(name__in=missing).order_by('-pk').values_list('name', 'pk'):
+                self.vendors[name] = pk
+        resolved = []
+        for line, data in rows:
+            unknown = [
+                (field, name) for field in fields
+                for name in _as_list(data.get(field)) if name not in self.vendors
+            ]
+            for field, name in unknown:
+                self.error(line, field, f"Unknown vendor '{name}'.")
+            if not unknown:
+                resolved.append((line, data))
+        return resolved
+
+    @abstractmethod
+    def write_batch(self, rows):
+        """Insert a batch of validated ``(line, data)`` rows."""
+
+    def finish(self):
+        pass
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+class VendorImporter(Importer):
+    serializer_class = VendorImportSerializer
+
+    def write_batch(self, rows):
+        Vendor.objects.bulk_create([Vendor(**data) for _, data in rows], batch_size=self.batch_size)
+        self.created += len(rows)
+
+class EquipmentImporter(Importer):
+    """
+    Inserts equipment with the MPTT bookkeeping switched off.
+
+    Rows go in as placeholder roots, parents are linked by serial once the
+    whole file is in (so a child may come before its parent), and at the
+    end only the trees the file added to are renumbered: new trees are
+    appended after the existing ones, and existing trees that gained
+    children keep their ``tree_id``.
+    """
+    serializer_class = EquipmentImportSerializer
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        super().__init__(batch_size)
+        self.serials = {}
+        self.duplicate_serials = set()
+        self.parent_links = []
+        self.pks = []
+
+    def resolve(self, rows):
+        return self.resolve_vendors(rows, ('manufacturer', 'vendor'))
+
+    def write_batch(self, rows):
+        nodes = []
+        for _, data in rows:
+            data = dict(data)
+            data.pop('parent', None)
+            manufacturer = data.pop('manufacturer', None)
+            vendor = data.pop('vendor', None)
+            nodes.append(Equipment(
+                **data,
+                manufacturer_id=self.vendors.get(manufacturer),
+                vendor_id=self.vendors.get(vendor),
+                tree_id=0, lft=0, rght=0, level=0,
+            ))
+        with Equipment.objects.disable_mptt_updates():
+            Equipment.objects.bulk_create(nodes, batch_size=self.batch_size)
+        for (line, data), node in zip(rows, nodes):
+            self.pks.append(node.pk)
+            if node.serial in self.serials:
+                self.duplicate_serials.add(node.serial)
+            self.serials[node.serial] = node.pk
+            if data.get('parent'):
+                self.parent_links.append((line, node.pk, data['parent']))
+        self.created += len(nodes)
+
+    def finish(self):
+        # Serials in the file take precedence over rows already in the database
+        wanted = {serial for _, _, serial in self.parent_links if serial not in self.serials}
+        existing = {}
+        ambiguous = set(self.duplicate_serials)
+        for chunk in chunks(wanted, self.batch_size):
+            for serial, pk in Equipment.objects.filter(serial__in=chunk).values_list('serial', 'pk'):
+                if serial in existing:
+                    ambiguous.add(serial)
+                existing[serial] = pk
+
+        parents = {}
+        for line, pk, serial in self.parent_links:
+            if serial in ambiguous:
+                self.error(line, 'parent', f"Serial '{serial}' matches more than one equipment.")
+            elif serial in self.serials or serial in existing:
+                parents[pk] = self.serials.get(serial) or existing[serial]
+            else:
+                self.error(line, 'parent', f"Unknown parent serial '{serial}'.")
+        if self.errors:
+            return
+        lines = {pk: line for line, pk, _ in self.parent_links}
+        for pk in _cycles(parents):
+            self.error(lines[pk], 'parent', "Parent links form a cycle.")
+        if self.errors:
+            return
+
+        # Every new node joins the tree of its topmost ancestor
+        next_tree_id = (Equipment.objects.aggregate(Max('tree_id'))['tree_id__max'] or 0) + 1
+        tree_ids = {pk: next_tree_id + index for index, pk in enumerate(pk for pk in self.pks if pk not in parents)}
+        imported = set(self.pks)
+        for chunk in chunks({parent for parent in parents.values() if parent not in imported}, self.batch_size):
+            tree_ids.update(Equipment.objects.filter(pk__in=chunk).values_list('pk', 'tree_id'))
+        for pk in self.pks:
+            path = []
+            node = pk
+            while node not in tree_ids:
+                path.append(node)
+                node = parents[node]
+            for step in path:
+                tree_ids[step] = tree_ids[node]
+
+        with Equipment.objects.disable_mptt_updates():
+            Equipment.objects.bulk_update(
+                [Equipment(pk=pk, parent_id=parents.get(pk), tree_id=tree_ids[pk]) for pk in self.pks],
+                ['parent', 'tree_id'], batch_size=self.batch_size
+            )
+        rebuild_trees({tree_ids[pk] for pk in self.pks}, batch_size=self.batch_size)
+
+def _cycles(parents):
+    """Nodes whose ``child -> parent`` chain in ``parents`` loops back on itself."""
+    state = {}
+    looped = []
+    for start in parents:
+        path = []
+        node = start
+        while node in parents and node not in state:
+            state[node] = start
+            path.append(node)
+            node = parents[node]
+        if state.get(node) == start:
+            looped.extend(path[path.index(node):])
+    return looped
+
+class PartImporter(Importer):
+    serializer_class = PartImportSerializer
+    list_fields = ('equipment', 'suppliers')
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        super().__init__(batch_size)
+        self.equipment = {}
+
+    def resolve(self, rows):
+        rows = self.resolve_vendors(rows, ('suppliers', 'vendor'))
+        serials = {serial for _, data in rows for serial in data.get('equipment', ())} - self.equipment.keys()
+        ambiguous = set()
+        for serial, pk in Equipment.objects.filter(serial__in=serials).values_list('serial', 'pk'):
+            if serial in self.equipment:
+                ambiguous.add(serial)
+            self.equipment[serial] = pk
+        for serial in ambiguous:
+            self.equipment[serial] = None
+
+        resolved = []
+        for line, data in rows:
+            problems = [serial for serial in data.get('equipment', ()) if self.equipment.get(serial) is None]
+            for serial in problems:
+                if serial in self.equipment:
+                    self.error(line, 'equipment', f"Serial '{serial}' matches more than one equipment.")
+                else:
+                    self.error(line, 'equipment', f"Unknown equipment serial '{serial}'.")
+            if not problems:
+                resolved.append((line, data))
+        return resolved
+
+    def write_batch(self, rows):
+        parts = []
+        for _, data in rows:
+            data = dict(data)
+            data.pop('equipment', None)
+            data.pop('suppliers', None)
+            vendor = data.pop('vendor', None)
+            parts.append(Part(**data, vendor_id=self.vendors.get(vendor)))
+        Part.objects.bulk_create(parts, batch_size=self.batch_size)
+
+        PartEquipment = Part.equipment.through
+        PartSupplier = Part.suppliers.through
+        PartEquipment.objects.bulk_create([
+            PartEquipment(part_id=part.pk, equipment_id=self.equipment[serial])
+            for (_, data), part in zip(rows, parts) for serial in dict.fromkeys(data.get('equipment', ()))
+        ], batch_size=self.batch_size)
+        PartSupplier.objects.bulk_create([
+            PartSupplier(part_id=part.pk, vendor_id=self.vendors[name])
+            for (_, data), part in zip(rows, parts) for name in dict.fromkeys(data.get('suppliers', ()))
+        ], batch_size=self.batch_size)
+        self.created += len(parts)
+
+IMPORTERS = {'vendors': VendorImporter, 'equipment': EquipmentImporter, 'parts': PartImporter}
+MODELS = {'vendors': Vendor, 'equipment': Equipment, 'parts': Part}
+
+def import_rows(resource, stream, file_format, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """
+    Import ``resource`` rows from a text stream in ``file_format``.
+
+    Returns the number of rows created. Raises ``ImportFailed`` with the
+    offending line numbers, in which case nothing is written; ``dry_run``
+    validates everything and then rolls back as well.
+    """
+    importer = IMPORTERS[resource](batch_size)
+    with transaction.atomic():
+        created = importer.run(read_rows(stream, file_format))
+        if dry_run:
+            transaction.set_rollback(True)
+        else:
+            invalidate_after_bulk(MODELS[resource]._meta.model_name)
+    return created
+
+EXPORT_COLUMNS = {
+    'vendors': ['name', 'contact_info', 'address', 'is_active'],
+    'equipment': [
+        'name', 'model', 'serial', 'description', 'location_status', 'expected_return_date',
+        'parent', 'manufacturer', 'vendor', 'is_active',
+    ],
+    'parts': ['part_number', 'part_name', 'description', 'status', 'equipment', 'suppliers', 'vendor', 'is_active'],
+}
+
+def export_rows(resource, chunk_size=DEFAULT_BATCH_SIZE):
+    """
+    Yield ``resource`` rows as dicts keyed by ``EXPORT_COLUMNS``.
+
+    Rows are read with server-side iteration (or keyset batches for parts,
+    whose many-to-many columns need a prefetch), so memory stays flat no
+    matter how large the table is. Equipment comes out in tree order, so
+    every parent precedes its children.
+    """
+    if resource == 'vendors':
+        yield from Vendor.objects.order_by('pk').values(*EXPORT_COLUMNS['vendors']).iterator(chunk_size=chunk_size)
+    elif resource == 'equipment':
+        rows = Equipment.objects.order_by('tree_id', 'lft').values(
+            'name', 'model', 'serial', 'description', 'location_status', 'expected_return_date', 'is_active',
+            parent_serial=F('parent__serial'), manufacturer_name=F('manufacturer__name'), vendor_name=F('vendor__name'),
+        )
+        for row in rows.iterator(chunk_size=chunk_size):
+            row['parent'] = row.pop('parent_serial')
+            row['manufacturer'] = row.pop('manufacturer_name')
+            row['vendor'] = row.pop('vendor_name')
+            yield row
+    else:
+        parts = Part.objects.select_related('vendor').prefetch_related(
+            Prefetch('equipment', queryset=Equipment.objects.only('serial')),
+            Prefetch('suppliers', queryset=Vendor.objects.only('name')),
+        ).order_by('pk')
+        last = 0
+        while True:
+            batch = list(parts.filter(pk__gt=last)[:chunk_size])
+            if not batch:
+                return
+            for part in batch:
+                yield {
+                    'part_number': part.part_number,
+                    'part_name': part.part_name,
+                    'description': part.description,
+                    'status': part.status,
+                    'equipment': [equipment.serial for equipment in part.equipment.all()],
+                    'suppliers': [vendor.name for vendor in part.suppliers.all()],
+                    'vendor': part.vendor.name if part.vendor else None,
+                    'is_active': part.is_active,
+                }
+            last = batch[-1].pk
+
+class _Echo:
+    """File-like object whose ``write`` hands back the line for streaming."""
+
+    def write(self, value):
+        return value
+
+def render_rows(resource, file_format, rows):
+    """Yield ``rows`` serialized as CSV or JSON Lines text, one line per chunk."""
+    columns = EXPORT_COLUMNS[resource]
+    if file_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow([
+                LIST_SEPARATOR.join(value) if isinstance(value, list) else value
+                for value in (row[column] for column in columns)
+            ])
+    else:
+        for row in rows:
+            yield json.dumps({column: row[column] for column in columns}, default=str) + '\n'
@@ -0,0 +1,247 @@
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .caching import invalidate_after_bulk
+from .models import Equipment, Part, Schedule, Task
+
+DEFAULT_ROLLUP_DEPTH = 1
+MAX_ROLLUP_DEPTH = 10
+
+
+def equipment_tree_queryset():
+    """Equipment queryset carrying every relation EquipmentSerializer renders."""
+    return Equipment.objects.select_related('vendor', 'manufacturer').prefetch_related(
+        'parts', 'parts__equipment', 'parts__suppliers'
+    )
+
+
+def assemble_trees(nodes):
+    """
+    Link nodes ordered by (tree_id, lft) into nested trees in memory.
+
+    Each node gets the ``_cached_children`` list django-mptt reads in
+    ``get_children()``, so walking the result never hits the database.
+    Returns the nodes whose parent is not part of ``nodes``.
+    """
+    by_id = {}
+    top_nodes = []
+    for node in nodes:
+        node._cached_children = []
+        by_id[node.pk] = node
+        parent = by_id.get(node.parent_id)
+        if parent is None:
+            top_nodes.append(node)
+        else:
+            node.parent = parent
+            parent._cached_children.append(node)
+    return top_nodes
+
+
+def fetch_subtrees(roots):
+    """
+    Load the complete subtrees below ``roots`` with one ranged query.
+
+    Nodes of a subtree share the root's ``tree_id`` and have ``lft``/``rght``
+    inside the root's bounds, so the query cost does not depend on depth or
+    fan-out of the tree.
+    """
+    roots = list(roots)
+    if not roots:
+        return []
+    if all(root.is_root_node() for root in roots):
+        nodes = equipment_tree_queryset().filter(
+            tree_id__in=[root.tree_id for root in roots]
+        )
+    else:
+        ranges = Q()
+        for root in roots:
+            ranges |= Q(tree_id=root.tree_id, lft__gte=root.lft, rght__lte=root.rght)
+        nodes = equipment_tree_queryset().filter(ranges)
+    nodes = list(nodes.order_by('tree_id', 'lft'))
+    assemble_trees(nodes)
+    # A requested root may sit inside another one's range; it is returned
+    # both on its own and nested in that subtree
+    by_id = {node.pk: node for node in nodes}
+    return [by_id[root.pk] for root in roots if root.pk in by_id]
+
+
+def _range_lookups(path, tree_id, lft, rght):
+    return {f'{path}__tree_id': tree_id, f'{path}__lft__gte': lft, f'{path}__lft__lte': rght}
+
+
+def subtree_filter(node, path='equipment'):
+    """
+    Lookups keeping rows whose equipment at ``path`` lies in ``node``'s subtree.
+
+    These are the bounds ``node.get_descendants(include_self=True)`` selects,
+    applied to the joined equipment row, so the database walks one range of
+    the (tree_id, lft) index instead of matching a list of descendant ids.
+    """
+    return _range_lookups(path, node.tree_id, node.lft, node.rght)
+
+
+def subtree_rollups(node=None, depth=DEFAULT_ROLLUP_DEPTH):
+    """
+    Work counts summed over each subtree, for ``node`` and the ``depth``
+    levels below it (every tree's root and the levels below when ``node``
+    is ``None``).
+
+    Three grouped reads over the range, whatever its size: the nodes in
+    (tree_id, lft) order, the task and schedule counts per equipment, and
+    the part links. Counts are added into every reported ancestor while
+    walking the nodes, so a plant-wide breakdown never issues a query per
+    node. A part fitted to several machines in a subtree counts once.
+    """
+    today = timezone.now().date()
+    nodes = Equipment.objects.all()
+    tasks = Task.objects.all()
+    links = Part.equipment.through.objects.filter(part__is_active=True)
+    last_level = depth
+    if node is not None:
+        nodes = node.get_descendants(include_self=True)
+        tasks = tasks.filter(**subtree_filter(node))
+        links = links.filter(**subtree_filter(node))
+        last_level += node.level
+    direct = {
+        row[0]: row[1:]
+        for row in tasks.order_by().values('equipment').annotate(
+            tasks=Count('pk', distinct=True),
+            pending=Count('schedules', filter=Q(schedules__status='pending')),
+            overdue=Count('schedules', filter=Q(schedules__status='pending', schedules__due_date__lt=today)),
+        ).values_list('equipment', 'tasks', 'pending', 'overdue')
+    }
+    rows = nodes.order_by('tree_id', 'lft').values_list('pk', 'name', 'parent', 'level', 'tree_id', 'lft', 'rght')
+
+    rollups = []
+    reported_above = {}  # node id -> rollups of the reported nodes on its path
+    path = []  # (tree_id, rght, rollup) of the reported nodes enclosing the current row
+    for pk, name, parent, level, tree_id, lft, rght in rows.iterator():
+        while path and (path[-1][0] != tree_id or path[-1][1] < lft):
+            path.pop()
+        if level <= last_level:
+            rollup = {
+                'id': pk, 'name': name, 'parent': parent, 'level': level,
+                'task_count': 0, 'pending_count': 0, 'overdue_count': 0, 'part_count': set(),
+            }
+            rollups.append(rollup)
+            path.append((tree_id, rght, rollup))
+        task_count, pending, overdue = direct.get(pk, (0, 0, 0))
+        for _, _, rollup in path:
+            rollup['task_count'] += task_count
+            rollup['pending_count'] += pending
+            rollup['overdue_count'] += overdue
+        reported_above[pk] = [rollup for _, _, rollup in path]
+
+    for equipment_id, part_id in links.values_list('equipment_id', 'part_id').iterator():
+        for rollup in reported_above.get(equipment_id, ()):
+            rollup['part_count'].add(part_id)
+    for rollup in rollups:
+        rollup['part_count'] = len(rollup['part_count'])
+    return rollups
+
+
+def move_equipment(node, parent):
+    """
+    Re-parent ``node`` under ``parent`` (``None`` makes it a root).
+
+    Uses django-mptt's targeted ``move_to`` so only the moved subtree and the
+    gap it leaves/fills are renumbered, while still placing the node among its
+    new siblings by ``MPTTMeta.order_insertion_by``. Returns ``False`` when the
+    parent is unchanged and nothing was written.
+    """
+    # Earlier moves in the same transaction may have re-parented the node and
+    # shifted both ranges
+    tree_fields = ['tree_id', 'lft', 'rght', 'level']
+    node.refresh_from_db(fields=['parent', *tree_fields])
+    if node.parent_id == (parent.pk if parent is not None else None):
+        return False
+    if parent is not None:
+        parent.refresh_from_db(fields=tree_fields)
+    right_sibling = Equipment._mptt_meta.get_ordered_insertion_target(node, parent)
+    if right_sibling is not None:
+        node.move_to(right_sibling, 'left')
+    else:
+        node.move_to(parent, 'last-child')
+    invalidate_after_bulk('equipment')
+    return True
+
+
+def rebuild_trees(tree_ids, batch_size=1000):
+    """
+    Renumber ``lft``/``rght``/``level`` of the trees in ``tree_ids`` from
+    their parent links, leaving every other tree alone.
+
+    This is ``Equipment.objects.partial_rebuild`` for many trees at once:
+    one read of their nodes and one batched ``bulk_update``. Each tree keeps
+    its ``tree_id`` and children are laid out in ``order_insertion_by``
+    order, as a full rebuild would.
+    """
+    order = [*Equipment._mptt_meta.order_insertion_by, 'pk']
+    nodes = list(
+        Equipment.objects.filter(tree_id__in=tree_ids).order_by(*order).only('pk', 'parent', 'tree_id', 'lft', 'rght', 'level')
+    )
+    children = {}
+    roots = []
+    for node in nodes:
+        if node.parent_id is None:
+            roots.append(node)
+        else:
+            children.setdefault(node.parent_id, []).append(node)
+    for root in roots:
+        counter = 0
+        stack = [(root, 0, False)]
+        while stack:
+            node, level, done = stack.pop()
+            counter += 1
+            if done:
+                node.rght = counter
+                continue
+            node.lft, node.level = counter, level
+            stack.append((node, level, True))
+            stack.extend((child, level + 1, False) for child in reversed(children.get(node.pk, ())))
+    with Equipment.objects.disable_mptt_updates():
+        Equipment.objects.bulk_update(nodes, ['lft', 'rght', 'level'], batch_size=batch_size)
+
+
+def check_tree_consistency():
+    """
+    Verify the MPTT columns of every equipment row against ``parent``.
+
+    Streams rows in (tree_id, lft) order keeping only the current path in
+    memory, and returns a list of ``(pk, problem)`` tuples; an empty list
+    means the stored tree is consistent and no rebuild is needed.
+    """
+    problems = []
+    rows = Equipment.objects.order_by('tree_id', 'lft').values_list(
+        'pk', 'parent_id', 'tree_id', 'lft', 'rght', 'level'
+    )
+    current_tree = None
+    stack = []  # (pk, rght) of the open ancestors of the current row
+    cursor = 0  # last lft/rght value seen in the current tree
+
+    def close(until):
+        nonlocal cursor
+        while stack and stack[-1][1] < until:
+            pk, rght = stack.pop()
+            if rght != cursor + 1:
+                problems.append((pk, f'rght is {rght}, expected {cursor + 1}'))
+            cursor = rght
+
+    for pk, parent_id, tree_id, lft, rght, level in rows.iterator():
+        if tree_id != current_tree:
+            close(float('inf'))
+            current_tree, stack, cursor = tree_id, [], 0
+        close(lft)
+        expected_parent = stack[-1][0] if stack else None
+        if parent_id != expected_parent:
+            problems.append((pk, f'parent is {parent_id}, range says {expected_parent}'))
+        if level != len(stack):
+            problems.append((pk, f'level is {level}, expected {len(stack)}'))
+        if lft != cursor + 1:
+            problems.append((pk, f'lft is {lft}, expected {cursor + 1}'))
+        if rght <= lft or (stack and rght >= stack[-1][1]):
+            problems.append((pk, f'range {lft}-{rght} is not nested in its parent'))
+        cursor = lft
+        stack.append((pk, rght))
+    close(float('inf'))
+    return problems
@@ -1,23 +1,45 @@
 from django.urls import path
 from .views import (
     VendorListCreateView, VendorDetailView,
-    EquipmentListCreateView, EquipmentDetailView,
+    EquipmentListCreateView, EquipmentDetailView, EquipmentMoveView, EquipmentRollupView,
     PartListCreateView, PartDetailView,
     TaskListCreateView, TaskDetailView,
-    ScheduleListCreateView, ScheduleDetailView,
-    UserListView
+    ScheduleListCreateView, ScheduleDetailView, ScheduleCompleteView, ScheduleHistoryView, ScheduleStatsView,
+    UserListView, DashboardSummaryView, ForecastView,
+    EquipmentLookupView, VendorLookupView, UserLookupView, SyncView,
+    ImportView, ExportView, ProfilingMetricsView, EventStreamView,
+    AsyncScheduleListView, AsyncDashboardSummaryView, AsyncEquipmentLookupView
 )
 
 urlpatterns = [
     path('vendors/', VendorListCreateView.as_view(), name='vendor-list'),
     path('vendors/<int:pk>/', VendorDetailView.as_view(), name='vendor-detail'),
     path('equipment/', EquipmentListCreateView.as_view(), name='equipment-list'),
+    path('equipment/move/', EquipmentMoveView.as_view(), name='equipment-move'),
+    path('equipment/rollup/', EquipmentRollupView.as_view(), name='equipment-rollup'),
     path('equipment/<int:pk>/', EquipmentDetailView.as_view(), name='equipment-detail'),
     path('parts/', PartListCreateView.as_view(), name='part-list'),
     path('parts/<int:pk>/', PartDetailView.as_view(), name='part-detail'),
     path('tasks/', TaskListCreateView.as_view(), name='task-list'),
     path('tasks/<int:pk>/', TaskDetailView.as_view(), name='task-detail'),
     path('schedules/', ScheduleListCreateView.as_view(), name='schedule-list'),
+    path('schedules/complete/', ScheduleCompleteView.as_view(), name='schedule-complete'),
+    path('schedules/stats/', ScheduleStatsView.as_view(), name='schedule-stats'),
     path('schedules/<int:pk>/', ScheduleDetailView.as_view(), name='schedule-detail'),
+    path('schedules/<int:pk>/history/', ScheduleHistoryView.as_view(), name='schedule-history'),
     path('users/', UserListView.as_view(), name='user-list'),
+    path('dashboard/summary/', DashboardSummaryView.as_view(), name='dashboard-summary'),
+    path('forecast/', ForecastView.as_view(), name='forecast'),
+    path('lookups/equipment/', EquipmentLookupView.as_view(), name='equipment-lookup'),
+    path('lookups/vendors/', VendorLookupView.as_view(), name='vendor-lookup'),
+    path('lookups/users/', UserLookupView.as_view(), name='user-lookup'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('events/', EventStreamView.as_view(), name='events'),
+    # Async twins of the hottest reads, for ASGI deployments
+    path('async/schedules/', AsyncScheduleListView.as_view(), name='async-schedule-list'),
+    path('async/dashboard/summary/', AsyncDashboardSummaryView.as_view(), name='async-dashboard-summary'),
+    path('async/lookups/equipment/', AsyncEquipmentLookupView.as_view(), name='async-equipment-lookup'),
+    path('import/<str:resource>/', ImportView.as_view(), name='import'),
+    path('export/<str:resource>/', ExportView.as_view(), name='export'),
+    path('metrics/', ProfilingMetricsView.as_view(), name='profiling-metrics'),
 ]
\ No newline at end of file
@@ -0,0 +1,12 @@
+"""Small helpers shared by the batch-processing modules."""
+
+def chunks(iterable, size):
+    """Yield lists of up to ``size`` items from ``iterable`` without materialising it."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
\ No newline at end of file
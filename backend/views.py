@@ -1,37 +1,120 @@
+import io
+from abc import ABCMeta, abstractmethod
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
-from rest_framework import generics, permissions
-from rest_framework.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.db.models import Exists, OuterRef, prefetch_related_objects
+from django.views import View
+from rest_framework import generics, permissions, serializers, status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import exception_handler
 from mptt.exceptions import InvalidMove
-from .models import Vendor, Equipment, Part, Task, Schedule
+from .models import (
+    Vendor, Equipment, Part, Task, Schedule, ScheduleEvent,
+    PRIORITY_CHOICES, FREQUENCY_CHOICES, TASK_TYPE_CHOICES,
+    EQUIPMENT_LOCATION_STATUS, SCHEDULE_STATUS_CHOICES
+)
 from .serializers import (
     VendorSerializer, EquipmentSerializer, PartSerializer,
-    TaskSerializer, ScheduleSerializer, UserSerializer
+    TaskSerializer, ScheduleSerializer, UserSerializer, EquipmentMoveSerializer,
+    DashboardSummaryQuerySerializer, LookupQuerySerializer, ScheduleCompleteSerializer,
+    ScheduleEventSerializer, SyncQuerySerializer, ForecastQuerySerializer, SubtreeRollupQuerySerializer
+)
+from .caching import AsyncVersionedResponseMixin, VersionedResponseMixin, request_resources
+from .dashboard import aget_summary, get_summary
+from .events import stream_events
+from .filters import QueryParamFilterMixin
+from .forecast import get_forecast
+from .history import actor_of, completion_stats, record_reassignment
+from .lookups import aequipment_lookup, equipment_lookup, user_lookup, vendor_lookup
+from .profiling import metrics_snapshot, reset_metrics
+from .routers import ReplicaReadMixin, replica_reads
+from .scheduling import complete_schedules
+from .sync import batched_deletions, collect_changes
+from .transfer import (
+    CONTENT_TYPES, FORMATS, MODELS, ImportFailed, export_rows, guess_format, import_rows, render_rows
 )
+from .trees import fetch_subtrees, move_equipment, subtree_filter, subtree_rollups
+
+class DjangoModelChangePermissions(permissions.DjangoModelPermissions):
+    """Model permissions for POST endpoints that modify existing rows."""
+    perms_map = {
+        **permissions.DjangoModelPermissions.perms_map,
+        'POST': ['%(app_label)s.change_%(model_name)s'],
+    }
 
-class UserListView(generics.ListAPIView):
+class UserListView(ReplicaReadMixin, generics.ListAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.DjangoModelPermissions]
+    pagination_ordering = ('username',)
 
-class VendorListCreateView(generics.ListCreateAPIView):
+class VendorListCreateView(VersionedResponseMixin, ReplicaReadMixin, generics.ListCreateAPIView):
     queryset = Vendor.objects.filter(is_active=True)
     serializer_class = VendorSerializer
     permission_classes = [permissions.DjangoModelPermissions]
+    cache_resources = ('vendor',)
+    pagination_ordering = ('name', 'id')
 
-class VendorDetailView(generics.RetrieveUpdateDestroyAPIView):
+class VendorDetailView(VersionedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Vendor.objects.all()
     serializer_class = VendorSerializer
     permission_classes = [permissions.DjangoModelPermissions]
+    cache_resources = ('vendor',)
 
-class EquipmentListCreateView(generics.ListCreateAPIView):
-    queryset = Equipment.objects.filter(parent__isnull=True)
+class EquipmentListCreateView(VersionedResponseMixin, ReplicaReadMixin, QueryParamFilterMixin, generics.ListCreateAPIView):
+    queryset = Equipment.objects.select_related('vendor', 'manufacturer')
     serializer_class = EquipmentSerializer
     permission_classes = [permissions.DjangoModelPermissions]
+    cache_resources = ('equipment', 'vendor', 'part')
+    pagination_ordering = ('tree_id', 'lft')
+    filter_params = {
+        'search': ('name__icontains', serializers.CharField()),
+        'location_status': ('location_status', serializers.ChoiceField(EQUIPMENT_LOCATION_STATUS)),
+        'manufacturer': ('manufacturer', serializers.IntegerField()),
+        'is_active': ('is_active', serializers.BooleanField()),
+    }
 
-class EquipmentDetailView(generics.RetrieveUpdateDestroyAPIView):
+    def filter_queryset(self, queryset):
+        # Unfiltered requests list whole trees; filters match nodes at any level
+        filters = self.get_query_filters()
+        if not filters:
+            filters = {'parent__isnull': True}
+        return queryset.filter(**filters)
+
+    def list(self, request, *args, **kwargs):
+        roots = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        fields = self.get_serializer().fields
+        if 'children' in fields:
+            # Whole trees come back in one ranged query and are nested in memory
+            roots = fetch_subtrees(roots)
+        elif 'parts' in fields:
+            prefetch_related_objects(roots, 'parts__equipment', 'parts__suppliers')
+        serializer = self.get_serializer(roots, many=True)
+        return self.get_paginated_response(serializer.data)
+
+class EquipmentDetailView(VersionedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Equipment.objects.filter(is_active=True)
     serializer_class = EquipmentSerializer
     permission_classes = [permissions.DjangoModelPermissions]
+    cache_resources = ('equipment', 'vendor', 'part')
+
+    def retrieve(self, request, *args, **kwargs):
+        instance, = fetch_subtrees([self.get_object()])
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+    def perform_destroy(self, instance):
+        # The delete cascades to the subtree and its tasks and schedules
+        with batched_deletions():
+            instance.delete()
 
     def update(self, request, *args, **kwargs):
         try:
@@ -40,35 +123,436 @@ class EquipmentDetailView(generics.RetrieveUpdateDestroyAPIView):
             raise ValidationError({"detail": "Cannot set this equipment as a child of its own descendant."})
 
     def perform_update(self, serializer):
-        instance = serializer.save()
-        Equipment.objects.rebuild()  # Correctly rebuild the MPTT tree
+        # Only a parent change touches the tree, and then only the moved range
+        moving = 'parent' in serializer.validated_data
+        parent = serializer.validated_data.pop('parent', None)
+        with transaction.atomic():
+            instance = serializer.save()
+            if moving:
+                move_equipment(instance, parent)
+        # Render the response from the same ranged fetch as retrieve()
+        serializer.instance, = fetch_subtrees([instance])
+
+class EquipmentRollupView(VersionedResponseMixin, generics.ListAPIView):
+    """Task, schedule and part counts summed over each subtree, down to ``?depth=`` levels."""
+    queryset = Equipment.objects.all()
+    permission_classes = [permissions.DjangoModelPermissions]
+    cache_resources = ('equipment', 'task', 'schedule', 'part')
+    date_dependent = True  # Overdue counts change at midnight
+
+    def list(self, request, *args, **kwargs):
+        params = SubtreeRollupQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(subtree_rollups(params.validated_data.get('subtree'), params.validated_data['depth']))
 
-class PartListCreateView(generics.ListCreateAPIView):
-    queryset = Part.objects.filter(is_active=True)
+class EquipmentMoveView(generics.GenericAPIView):
+    """Apply a batch of re-parent operations in a single transaction."""
+    queryset = Equipment.objects.all()
+    serializer_class = EquipmentMoveSerializer
+    permission_classes = [DjangoModelChangePermissions]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        moved = []
+        try:
+            with transaction.atomic():
+                for move in serializer.validated_data:
+                    if move_equipment(move['id'], move['parent']):
+                        moved.append(move['id'].pk)
+        except InvalidMove:
+            raise ValidationError({"detail": f"Cannot set equipment {move['id'].pk} as a child of its own descendant."})
+        return Response({"moved": moved})
+
+class PartListCreateView(VersionedResponseMixin, ReplicaReadMixin, QueryParamFilterMixin, generics.ListCreateAPIView):
+    queryset = Part.objects.filter(is_active=True).prefetch_related('equipment', 'suppliers')
     serializer_class = PartSerializer
     permission_classes = [permissions.DjangoModelPermissions]
+    cache_resources = ('part', 'vendor', 'equipment')
+    pagination_ordering = ('part_number', 'id')
+    filter_params = {
+        'part_number': ('part_number__istartswith', serializers.CharField()),
+        'status': ('status', serializers.CharField()),
+        'supplier': ('suppliers', serializers.IntegerField()),
+        'equipment': ('equipment', serializers.IntegerField()),
+    }
+    subtree_path = 'equipment'
+
+    def perform_create(self, serializer):
+        # One query per relation for the response instead of one per field reading it
+        prefetch_related_objects([serializer.save()], 'equipment', 'suppliers')
+
+    def subtree_lookups(self, node):
+        # Semi-join so a part fitted to several machines in the subtree is listed once
+        links = Part.equipment.through.objects.filter(**subtree_filter(node))
+        return {'pk__in': links.values('part_id')}
 
-class PartDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Part.objects.all()
+class PartDetailView(VersionedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Part.objects.prefetch_related('equipment', 'suppliers')
     serializer_class = PartSerializer
     permission_classes = [permissions.DjangoModelPermissions]
+    cache_resources = ('part', 'vendor', 'equipment')
 
-class TaskListCreateView(generics.ListCreateAPIView):
+    def perform_update(self, serializer):
+        instance = serializer.save()
+        # DRF drops the prefetched relations after an update, which would cost
+        # a query per field reading them; re-read the part with them instead
+        serializer.instance = self.get_queryset().get(pk=instance.pk)
+
+class TaskListCreateView(VersionedResponseMixin, ReplicaReadMixin, QueryParamFilterMixin, generics.ListCreateAPIView):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
     permission_classes = [permissions.DjangoModelPermissions]
+    cache_resources = ('task', 'schedule')  # ?has_completed= reads schedules
+    pagination_ordering = ('start_date', 'id')
+    filter_params = {
+        'priority': ('priority', serializers.ChoiceField(PRIORITY_CHOICES)),
+        'task_type': ('task_type', serializers.ChoiceField(TASK_TYPE_CHOICES)),
+        'frequency': ('frequency', serializers.ChoiceField(FREQUENCY_CHOICES)),
+        'assigned_to': ('assigned_to', serializers.IntegerField()),
+        'equipment': ('equipment', serializers.IntegerField()),
+        'start_after': ('start_date__gte', serializers.DateField()),
+        'start_before': ('start_date__lte', serializers.DateField()),
+    }
+    subtree_path = 'equipment'
 
-class TaskDetailView(generics.RetrieveUpdateDestroyAPIView):
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        has_completed = self.request.query_params.get('has_completed')
+        if has_completed:
+            completed = Schedule.objects.filter(task=OuterRef('pk'), status='completed')
+            if serializers.BooleanField().run_validation(has_completed):
+                queryset = queryset.filter(Exists(completed))
+            else:
+                queryset = queryset.exclude(Exists(completed))
+        return queryset
+
+class TaskDetailView(VersionedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
     permission_classes = [permissions.DjangoModelPermissions]
+    cache_resources = ('task',)
 
-class ScheduleListCreateView(generics.ListCreateAPIView):
-    queryset = Schedule.objects.all()
+    def perform_update(self, serializer):
+        previous = serializer.instance.assigned_to
+        with transaction.atomic():
+            task = serializer.save()
+            if task.assigned_to_id != (previous.pk if previous else None):
+                record_reassignment(task, previous, actor_of(self.request))
+
+    def perform_destroy(self, instance):
+        # The delete cascades to every schedule of the task
+        with batched_deletions():
+            instance.delete()
+
+class ScheduleListCreateView(VersionedResponseMixin, ReplicaReadMixin, QueryParamFilterMixin, generics.ListCreateAPIView):
+    queryset = Schedule.objects.with_overdue().select_related('task')
     serializer_class = ScheduleSerializer
     permission_classes = [permissions.DjangoModelPermissions]
+    cache_resources = ('schedule', 'task')
+    date_dependent = True  # is_overdue flips at midnight
+    pagination_ordering = ('due_date', 'id')
+    filter_params = {
+        'status': ('status', serializers.ChoiceField(SCHEDULE_STATUS_CHOICES)),
+        'due_after': ('due_date__gte', serializers.DateField()),
+        'due_before': ('due_date__lte', serializers.DateField()),
+        'completed_after': ('completion_date__gte', serializers.DateField()),
+        'completed_before': ('completion_date__lte', serializers.DateField()),
+        'priority': ('task__priority', serializers.ChoiceField(PRIORITY_CHOICES)),
+        'task_type': ('task__task_type', serializers.ChoiceField(TASK_TYPE_CHOICES)),
+        'assigned_to': ('task__assigned_to', serializers.IntegerField()),
+        'equipment': ('task__equipment', serializers.IntegerField()),
+        'task': ('task', serializers.IntegerField()),
+    }
+    subtree_path = 'task__equipment'
 
-class ScheduleDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Schedule.objects.all()
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        overdue = self.request.query_params.get('overdue')
+        if overdue:
+            # Filter on the columns rather than the annotation so the partial index applies
+            if serializers.BooleanField().run_validation(overdue):
+                queryset = queryset.overdue()
+            else:
+                queryset = queryset.exclude(status='pending', due_date__lt=timezone.now().date())
+        return queryset
+
+class ScheduleDetailView(VersionedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Schedule.objects.with_overdue().select_related('task')
     serializer_class = ScheduleSerializer
-    permission_classes = [permissions.DjangoModelPermissions]
\ No newline at end of file
+    permission_classes = [permissions.DjangoModelPermissions]
+    cache_resources = ('schedule', 'task')
+    date_dependent = True  # is_overdue flips at midnight
+
+    def perform_update(self, serializer):
+        completing = serializer.validated_data.get('status') == 'completed'
+        if not completing:
+            instance = serializer.save()
+        else:
+            # Completion always goes through the locking service
+            serializer.validated_data.pop('status')
+            completion_date = serializer.validated_data.pop('completion_date', None)
+            with transaction.atomic():
+                instance = serializer.save()
+                complete_schedules([instance.pk], completion_date, actor_of(self.request))
+        # Re-read for the response, since is_overdue is annotated in SQL
+        serializer.instance = self.get_queryset().get(pk=instance.pk)
+
+class ScheduleCompleteView(generics.GenericAPIView):
+    """Complete many schedules in one request and one transaction."""
+    queryset = Schedule.objects.all()
+    serializer_class = ScheduleCompleteSerializer
+    permission_classes = [DjangoModelChangePermissions]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        completed = complete_schedules(ids, serializer.validated_data.get('completion_date'), actor_of(request))
+        skipped = sorted(set(ids) - set(completed))
+        return Response({"completed": completed, "skipped": skipped})
+
+class ScheduleHistoryView(VersionedResponseMixin, ReplicaReadMixin, generics.ListAPIView):
+    """A schedule's events, newest first."""
+    queryset = ScheduleEvent.objects.select_related('actor')
+    serializer_class = ScheduleEventSerializer
+    permission_classes = [permissions.DjangoModelPermissions]
+    # Reassignments are written with task saves; actor names come from users
+    cache_resources = ('schedule', 'task', 'user')
+    pagination_ordering = ('-created_at', '-id')
+
+    def get_queryset(self):
+        if not Schedule.objects.filter(pk=self.kwargs['pk']).exists():
+            raise Http404
+        return super().get_queryset().filter(schedule=self.kwargs['pk'])
+
+class ScheduleStatsView(VersionedResponseMixin, generics.ListAPIView):
+    """Completion latency and MTBF aggregated from the schedule event log."""
+    queryset = ScheduleEvent.objects.all()
+    permission_classes = [permissions.DjangoModelPermissions]
+    cache_resources = ('schedule', 'task', 'equipment')  # Grouped by each task's equipment
+
+    def list(self, request, *args, **kwargs):
+        params = DashboardSummaryQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(completion_stats(**params.validated_data))
+
+class DashboardSummaryView(generics.GenericAPIView):
+    """Grouped schedule counts for the dashboard, computed in SQL and cached."""
+    queryset = Schedule.objects.all()
+    permission_classes = [permissions.DjangoModelPermissions]
+
+    def get(self, request, *args, **kwargs):
+        params = DashboardSummaryQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(get_summary(**params.validated_data))
+
+class LookupView(generics.GenericAPIView):
+    """Base for the id/name endpoints that fill dropdowns and autocomplete; ``?q=`` is a name prefix."""
+    permission_classes = [permissions.DjangoModelPermissions]
+    lookup_rows = None
+
+    def get(self, request, *args, **kwargs):
+        params = LookupQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(self.lookup_rows(**params.validated_data))
+
+class EquipmentLookupView(VersionedResponseMixin, LookupView):
+    queryset = Equipment.objects.all()
+    cache_resources = ('equipment',)
+    lookup_rows = staticmethod(equipment_lookup)
+
+class VendorLookupView(VersionedResponseMixin, LookupView):
+    queryset = Vendor.objects.all()
+    cache_resources = ('vendor',)
+    lookup_rows = staticmethod(vendor_lookup)
+
+class UserLookupView(LookupView):
+    queryset = User.objects.all()
+    lookup_rows = staticmethod(user_lookup)
+
+class SyncView(generics.GenericAPIView):
+    """Rows changed since ``?since=<token>`` for clients that keep a local copy; see cmms.sync."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        params = SyncQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(collect_changes(**params.validated_data))
+
+class ForecastView(generics.GenericAPIView):
+    """Upcoming occurrences per week by priority, task type or subtree, expanded without writing schedules."""
+    queryset = Task.objects.all()
+    permission_classes = [permissions.DjangoModelPermissions]
+
+    def get(self, request, *args, **kwargs):
+        params = ForecastQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(get_forecast(**params.validated_data))
+
+class TransferView(generics.GenericAPIView):
+    """Base for the bulk import/export endpoints; permissions follow the resource's model."""
+    permission_classes = [permissions.DjangoModelPermissions]
+
+    def get_queryset(self):
+        model = MODELS.get(self.kwargs['resource'])
+        if model is None:
+            raise Http404
+        return model.objects.all()
+
+    def get_file_format(self, filename=None):
+        # ``format`` is taken by DRF's content negotiation, hence ``type``
+        requested = self.request.query_params.get('type')
+        file_format = FORMATS.get(requested) if requested else guess_format(filename or '')
+        if file_format is None:
+            raise ValidationError({"type": f"Expected one of: {', '.join(FORMATS)}."})
+        return file_format
+
+class ImportView(TransferView):
+    """Create vendors, equipment or parts in bulk from an uploaded CSV or JSON Lines file."""
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, resource):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({"file": "No file was submitted."})
+        file_format = self.get_file_format(upload.name)
+        dry_run = serializers.BooleanField().run_validation(request.query_params.get('dry_run', 'false'))
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            created = import_rows(resource, stream, file_format, dry_run=dry_run)
+        except ImportFailed as exc:
+            raise ValidationError({"errors": exc.errors})
+        return Response({"created": created, "dry_run": dry_run})
+
+class ExportView(TransferView):
+    """Stream every vendor, equipment or part row as CSV or JSON Lines."""
+
+    def get(self, request, resource):
+        file_format = self.get_file_format('export.csv')
+        response = StreamingHttpResponse(
+            render_rows(resource, file_format, export_rows(resource)),
+            content_type=CONTENT_TYPES[file_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="{resource}.{file_format}"'
+        return response
+
+class EventStreamView(View):
+    """
+    Server-Sent Events for schedule completions, task reassignments and
+    equipment location changes.
+
+    Only served under ASGI. A WSGI worker would be held by the never-ending
+    stream for as long as the tab stays open, so there the endpoint answers
+    501; clients send a HEAD first and subscribe only after a 200.
+    """
+    http_method_names = ['get', 'head', 'options']
+
+    def unavailable(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({"detail": "Event streaming needs the ASGI server."}, status=501)
+        return None
+
+    async def head(self, request, *args, **kwargs):
+        return self.unavailable(request) or HttpResponse()
+
+    async def get(self, request, *args, **kwargs):
+        unavailable = self.unavailable(request)
+        if unavailable:
+            return unavailable
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=403)
+        # EventSource resends the last id it saw when it reconnects
+        last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        try:
+            last_id = int(last_id) if last_id else None
+        except ValueError:
+            return JsonResponse({"last_event_id": ["A valid integer is required."]}, status=400)
+        response = StreamingHttpResponse(stream_events(last_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Keeps nginx from holding events back
+        return response
+
+class AsyncReadView(View, metaclass=ABCMeta):
+    """
+    Base for the async twins of the busiest read endpoints, served under
+    ``/api/async/``. Behind an ASGI server a request waiting on the database
+    holds a thread but not the worker, which keeps answering other clients;
+    under WSGI they work too, at the price of an event loop per request.
+
+    Subclasses return the payload from ``get_data``. As with the event
+    stream only session authentication is accepted; any signed-in user may
+    read, as DjangoModelPermissions allows for GET. API errors are answered
+    in DRF's format.
+    """
+    http_method_names = ['get', 'head', 'options']
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=403)
+        request.user = user
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            data = await self.get_data(request, *args, **kwargs)
+        except (APIException, Http404) as exc:
+            response = exception_handler(exc, {'view': self, 'request': request})
+            return JsonResponse(response.data, status=response.status_code)
+        # DRF's renderer, so bodies match the synchronous views byte for byte
+        return HttpResponse(JSONRenderer().render(data), content_type='application/json')
+
+    @abstractmethod
+    async def get_data(self, request, *args, **kwargs):
+        """The response payload; raise an APIException or Http404 for errors."""
+
+class AsyncScheduleListView(AsyncVersionedResponseMixin, AsyncReadView):
+    """
+    ``GET /api/schedules/`` for ASGI deployments.
+
+    Filters, the keyset page and the serializer are ScheduleListCreateView's,
+    so cursors, links and errors are interchangeable. They run on the
+    request's thread in one call: the async ORM would hand each query there
+    anyway, and the page needs DRF's paginator.
+    """
+    cache_resources = ScheduleListCreateView.cache_resources
+    date_dependent = True
+
+    def read_page(self, request):
+        view = ScheduleListCreateView(request=Request(request), args=(), kwargs={}, format_kwarg=None)
+        with replica_reads(request, request_resources(self.cache_resources, request)):
+            page = view.paginate_queryset(view.filter_queryset(view.get_queryset()))
+            return view.get_paginated_response(view.get_serializer(page, many=True).data).data
+
+    async def get_data(self, request, *args, **kwargs):
+        return await sync_to_async(self.read_page)(request)
+
+class AsyncDashboardSummaryView(AsyncReadView):
+    """``GET /api/dashboard/summary/`` for ASGI deployments; shares its cache entries."""
+    async def get_data(self, request, *args, **kwargs):
+        params = DashboardSummaryQuerySerializer(data=request.GET)
+        # ?subtree= is looked up while validating
+        await sync_to_async(params.is_valid)(raise_exception=True)
+        return await aget_summary(**params.validated_data)
+
+class AsyncEquipmentLookupView(AsyncVersionedResponseMixin, AsyncReadView):
+    """``GET /api/lookups/equipment/`` for ASGI deployments."""
+    cache_resources = EquipmentLookupView.cache_resources
+
+    async def get_data(self, request, *args, **kwargs):
+        params = LookupQuerySerializer(data=request.GET)
+        params.is_valid(raise_exception=True)
+        return await aequipment_lookup(**params.validated_data)
+
+class ProfilingMetricsView(generics.GenericAPIView):
+    """Per-view request histograms from the profiling middleware, for this worker process."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(metrics_snapshot())
+
+    def delete(self, request, *args, **kwargs):
+        reset_metrics()
+        return Response(status=status.HTTP_204_NO_CONTENT)
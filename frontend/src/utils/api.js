@@ -1,8 +1,11 @@
 import axios from 'axios'
 
+// Set VUE_APP_API_BASE=/api when the app is served from the API's origin
+export const API_BASE = process.env.VUE_APP_API_BASE || 'http://localhost:8000/api'
+
 export async function fetchCsrfToken() {
   try {
-    await axios.get('http://localhost:8000/api/equipment/', { withCredentials: true })
+    await axios.get(`${API_BASE}/equipment/`, { withCredentials: true })
     return getCsrfToken()
   } catch (error) {
     console.error('Error fetching CSRF token:', error)
@@ -26,25 +29,65 @@ export function getCsrfToken() {
   return cookieValue
 }
 
-export async function fetchData(endpoint, csrfToken) {
+export async function fetchPage(endpointOrUrl, csrfToken, params = {}) {
+  // Accepts an endpoint name or a `next` link returned by a previous page
+  const isUrl = endpointOrUrl.startsWith('http')
+  const url = isUrl ? endpointOrUrl : `${API_BASE}/${endpointOrUrl}/`
   try {
-    const response = await axios.get(`http://localhost:8000/api/${endpoint}/`, {
+    const response = await axios.get(url, {
       withCredentials: true,
-      headers: { 'X-CSRFToken': csrfToken }
+      headers: { 'X-CSRFToken': csrfToken },
+      params: isUrl ? {} : params
     })
     return response.data
   } catch (error) {
-    console.error(`Error fetching ${endpoint}:`, error)
+    console.error(`Error fetching ${endpointOrUrl}:`, error)
     throw error
   }
 }
 
+export function subscribeEvents(handlers) {
+  // Server-sent change events; the browser reconnects and resumes on its own.
+  // `reset` means events were missed and the caller should refetch. Only
+  // ASGI servers stream: the HEAD probe gets a 501 elsewhere and the page
+  // goes without live updates.
+  let source = null
+  let closed = false
+  axios.head(`${API_BASE}/events/`, { withCredentials: true })
+    .then(() => {
+      if (closed) return
+      source = new EventSource(`${API_BASE}/events/`, { withCredentials: true })
+      Object.entries(handlers).forEach(([type, handler]) => {
+        source.addEventListener(type, event => handler(JSON.parse(event.data)))
+      })
+    })
+    .catch(() => {
+      // Streaming unavailable
+    })
+  return () => {
+    closed = true
+    if (source) source.close()
+  }
+}
+
+export async function fetchData(endpoint, csrfToken, params = {}) {
+  // Follows cursor pages until the whole list is loaded
+  let page = await fetchPage(endpoint, csrfToken, params)
+  if (!Array.isArray(page.results)) return page
+  let results = page.results
+  while (page.next) {
+    page = await fetchPage(page.next, csrfToken)
+    results = results.concat(page.results)
+  }
+  return results
+}
+
 export async function saveData(endpoint, data, csrfToken, isEdit = false) {
   try {
     const method = isEdit ? 'put' : 'post'
     const url = isEdit && data.id ? `${endpoint}/${data.id}/` : `${endpoint}/` // Added slash before id
-    console.log(`Saving to ${method.toUpperCase()} http://localhost:8000/api/${url}`)
-    const response = await axios[method](`http://localhost:8000/api/${url}`, data, {
+    console.log(`Saving to ${method.toUpperCase()} ${API_BASE}/${url}`)
+    const response = await axios[method](`${API_BASE}/${url}`, data, {
       withCredentials: true,
       headers: { 'X-CSRFToken': csrfToken }
     })
@@ -57,7 +100,7 @@ export async function saveData(endpoint, data, csrfToken, isEdit = false) {
 
 export async function deleteData(endpoint, id, csrfToken) {
   try {
-    await axios.delete(`http://localhost:8000/api/${endpoint}/${id}/`, { // Added slash before id
+    await axios.delete(`${API_BASE}/${endpoint}/${id}/`, { // Added slash before id
       withCredentials: true,
       headers: { 'X-CSRFToken': csrfToken }
     })